@@ -0,0 +1,106 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_LAYERS = 200000
+LAYER_TYPES = ("Linear", "Conv2d", "BatchNorm2d", "LayerNorm", "ReLU", "Dropout", "Embedding", "GELU")
+BLOCK_SIZE = 8
+
+
+def synthetic_fields(num_layers):
+    # What a loader sees per module: fresh strings for names and dtypes (str(tensor.dtype) builds
+    # a new one every call) and a new shape list, as get_module_info produced them
+    for i in range(num_layers):
+        layer_type = LAYER_TYPES[i % len(LAYER_TYPES)]
+        has_weight = layer_type not in ("ReLU", "Dropout", "GELU")
+        shape = [64 + i % 7, 64 + i % 5] if has_weight else None
+        params = shape[0] * shape[1] if has_weight else 0
+        yield {
+            "name": f"blocks.{i // BLOCK_SIZE}.{layer_type.lower()}{i % BLOCK_SIZE}",
+            "type": layer_type,
+            "shape": shape,
+            "dtype": "torch.float32".replace("torch.", "") if has_weight else None,
+            "activation": "ReLU" if layer_type == "ReLU" else None,
+            "weight_stats": None,
+            "weight_ref": None,
+            "params": params,
+            "trainable_params": params,
+            "param_bytes": params * 4,
+            "buffer_bytes": 0,
+        }
+
+
+def build_dicts(num_layers):
+    return list(synthetic_fields(num_layers))
+
+
+def build_records(num_layers):
+    from core.model_info import LayerRecord
+    return [LayerRecord(**fields) for fields in synthetic_fields(num_layers)]
+
+
+def measure(build, num_layers):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    layers = build(num_layers)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return layers, current, elapsed_ms
+
+
+def params_by_type_loop(layers):
+    totals = {}
+    for layer in layers:
+        if layer.params:
+            totals[layer.type] = totals.get(layer.type, 0) + layer.params
+    return totals
+
+
+def best_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare memory of per-layer dicts and slotted layer records")
+    parser.add_argument("-n", "--layers", type=int, default=DEFAULT_LAYERS, help="Synthetic layers to build")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Timed runs for the aggregate queries")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, PROJECT_ROOT)
+    from core.layer_index import LayerIndex
+
+    dicts, dict_bytes, dict_ms = measure(build_dicts, args.layers)
+    del dicts
+    records, record_bytes, record_ms = measure(build_records, args.layers)
+
+    print(f"{args.layers} layers")
+    print(f"  dicts      {dict_bytes / 2 ** 20:8.1f} MiB  {dict_bytes / args.layers:6.0f} B/layer  "
+          f"built in {dict_ms:.0f} ms")
+    print(f"  records    {record_bytes / 2 ** 20:8.1f} MiB  {record_bytes / args.layers:6.0f} B/layer  "
+          f"built in {record_ms:.0f} ms")
+    print(f"  saving     {(1 - record_bytes / dict_bytes):8.1%}")
+
+    index = LayerIndex(records)
+    looped, loop_ms = best_ms(lambda: params_by_type_loop(records), args.repeat)
+    vectorized, vector_ms = best_ms(index.params_by_type, args.repeat)
+    if looped != vectorized:
+        print("FAIL: params_by_type disagrees with the per-record loop")
+        return 1
+    print(f"Params by type: per-record loop {loop_ms:.1f} ms, LayerIndex.params_by_type {vector_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Machine-specific, so not checked in; create it with --save-baseline before comparing
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipeline_baseline.json")
+
+# WIDTHxDEPTHxHIDDEN: every internal module has WIDTH children, leaves sit DEPTH levels down
+# and are HIDDEN x HIDDEN Linear layers
+DEFAULT_CASES = ("8x2x64", "100x2x16", "10x4x8", "2x12x8", "4x3x512")
+STAGES = ("load_pytorch_model", "get_module_info", "layer_index", "tree_populate", "graph_render", "expand_collapse")
+EXPAND_GROUPS = 50
+VIEW_SIZE = (1200, 800)
+
+# Stages faster than this are mostly timer and scheduler noise, so they are never flagged
+NOISE_FLOOR_MS = 10.0
+CALIBRATION_RUNS = 9
+
+
+def parse_case(text):
+    try:
+        width, depth, hidden = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxDEPTHxHIDDEN, got {text!r}")
+    return width, depth, hidden
+
+
+def build_model(width, depth, hidden):
+    import torch.nn as nn
+
+    def build(level):
+        if level == depth:
+            return nn.Linear(hidden, hidden)
+        return nn.Sequential(*[build(level + 1) for _ in range(width)])
+
+    return build(0)
+
+
+def calibrate(runs=CALIBRATION_RUNS):
+    # A fixed pure-Python workload timed before each pipeline run. Stages are compared as
+    # multiples of it, so a busy or slower machine does not read as a regression everywhere.
+    # Like the stages it is timed many times and the fastest kept: interference only adds time
+    def workload():
+        table = {}
+        for i in range(50000):
+            table[f"module.{i % 997}.{i}"] = (i, [i] * 3)
+        return sorted(table)[:10]
+
+    # Collections would walk whatever the case has allocated so far, so the collector is paused
+    # to keep the workload the same size in every case
+    gc.disable()
+    try:
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            workload()
+            times.append((time.perf_counter() - start) * 1000)
+    finally:
+        gc.enable()
+    return min(times)
+
+
+def _rss_kb():
+    if resource is None:
+        # No getrusage on Windows; RSS growth then reads as 0
+        return 0
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_pipeline(model, app, trace_memory):
+    from PyQt5.QtCore import QThreadPool
+    from core.model_loader import load_pytorch_model, get_module_info
+    from core.param_accounting import account_model, iter_named_modules
+    from core.layer_index import LayerIndex
+    from ui.dashboard.tree_view import TreeView
+    from ui.dashboard.graph_view import GraphView
+
+    results = {}
+    state = {}
+
+    def stage(name, fn):
+        if trace_memory:
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+        rss_before = _rss_kb()
+        start = time.perf_counter()
+        fn()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        result = {"ms": elapsed_ms, "rss_growth_kb": _rss_kb() - rss_before}
+        if trace_memory:
+            result["py_peak_kb"] = (tracemalloc.get_traced_memory()[1] - traced_before) // 1024
+        results[name] = result
+
+    def load():
+        state["info"] = load_pytorch_model(model)
+
+    def module_info():
+        subtree, _ = account_model(model)
+        state["infos"] = [get_module_info(name, module, totals=subtree[name])
+                          for name, module in iter_named_modules(model) if name]
+
+    def index():
+        state["index"] = LayerIndex(state["info"].layers)
+
+    def tree_populate():
+        tree = state["tree"] = TreeView()
+        tree.resize(*VIEW_SIZE)
+        tree.show()
+        tree.populate(state["info"].layers)
+        app.processEvents()
+
+    def graph_render():
+        graph = state["graph"] = GraphView()
+        graph.resize(*VIEW_SIZE)
+        graph.show()
+        graph.render_layers(state["info"].layers)
+        app.processEvents()
+
+    def expand_collapse():
+        tree, graph = state["tree"], state["graph"]
+        rows = [tree.layer_model.index(row, 0) for row in range(min(EXPAND_GROUPS, tree.layer_model.rowCount()))]
+        for expanded in (True, False):
+            for row in rows:
+                tree.setExpanded(row, expanded)
+            app.processEvents()
+
+        groups = [node for node in graph.index.children() if graph.index.child_counts[node]][:EXPAND_GROUPS]
+        for _ in range(2):
+            for node in groups:
+                graph.toggle_group(node)
+            graph.relayout_timer.stop()
+            app.processEvents()
+
+    for name, fn in zip(STAGES, (load, module_info, index, tree_populate, graph_render, expand_collapse)):
+        stage(name, fn)
+
+    for view in (state["tree"], state["graph"]):
+        view.close()
+        view.deleteLater()
+    app.processEvents()
+    QThreadPool.globalInstance().waitForDone()
+    return results
+
+
+def run_case(width, depth, hidden, repeat):
+    sys.path.insert(0, PROJECT_ROOT)
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication(sys.argv)
+    model = build_model(width, depth, hidden)
+    num_modules = sum(1 for _ in model.modules())
+    num_params = sum(p.numel() for p in model.parameters())
+
+    # Timing runs go without tracemalloc, which slows allocation-heavy stages several times over.
+    # Stages are normalised by calibrations interleaved with the same runs, never by another run's
+    calibrations = []
+    runs = []
+    for _ in range(repeat):
+        calibrations.append(calibrate())
+        runs.append(run_pipeline(model, app, trace_memory=False))
+    tracemalloc.start()
+    memory = run_pipeline(model, app, trace_memory=True)
+    tracemalloc.stop()
+
+    stages = {}
+    for name in STAGES:
+        stages[name] = {
+            "ms": min(run[name]["ms"] for run in runs),
+            "relative": min(run[name]["ms"] for run in runs) / min(calibrations),
+            "rss_growth_kb": max(run[name]["rss_growth_kb"] for run in runs + [memory]),
+            "py_peak_kb": memory[name]["py_peak_kb"],
+        }
+    return {"modules": num_modules, "params": num_params, "calibration_ms": min(calibrations), "stages": stages}
+
+
+def measure_case(case, repeat):
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    # Each case gets a fresh interpreter so peak RSS and caches do not carry over between cases
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", case, "--repeat", str(repeat)],
+        capture_output=True, text=True, env=env, cwd=PROJECT_ROOT, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def merge_measurements(first, second):
+    # Best of both, as if the timed runs had been one longer series
+    calibration_ms = min(first["calibration_ms"], second["calibration_ms"])
+    stages = {}
+    for name, stage in first["stages"].items():
+        ms = min(stage["ms"], second["stages"][name]["ms"])
+        stages[name] = dict(stage, ms=ms, relative=ms / calibration_ms)
+    return dict(first, calibration_ms=calibration_ms, stages=stages)
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for case, result in results["cases"].items():
+        base_case = baseline.get("cases", {}).get(case)
+        if base_case is None:
+            continue
+        for stage, measured in result["stages"].items():
+            base = base_case["stages"].get(stage)
+            if base is None or "relative" not in base or measured["ms"] < NOISE_FLOOR_MS:
+                continue
+            ratio = measured["relative"] / max(base["relative"], 1e-9)
+            if ratio > 1 + tolerance:
+                regressions.append((case, stage, base["ms"], measured["ms"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and measure memory for each stage of load, index and render")
+    parser.add_argument("cases", nargs="*", type=parse_case, metavar="WIDTHxDEPTHxHIDDEN",
+                        help=f"Synthetic model shapes (default: {' '.join(DEFAULT_CASES)})")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Timed runs per case; the fastest is reported")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with these results")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed slowdown per stage (0.3 = 30%%)")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(*parse_case(args.run_case), args.repeat)))
+        return 0
+
+    cases = ["x".join(map(str, case)) for case in args.cases] or list(DEFAULT_CASES)
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": {},
+    }
+    for case in cases:
+        result = results["cases"][case] = measure_case(case, args.repeat)
+        print(f"{case}: {result['modules']} modules, {result['params']} params, "
+              f"calibration {result['calibration_ms']:.1f} ms")
+        for stage, measured in result["stages"].items():
+            print(f"  {stage:<20} {measured['ms']:9.1f} ms  py peak {measured['py_peak_kb']:8d} KiB  "
+                  f"rss +{measured['rss_growth_kb']} KiB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance)
+    # A slow stage is only reported if a fresh measurement of its case is slow as well
+    for case in sorted({case for case, *_ in regressions}):
+        print(f"{case}: re-measuring to confirm")
+        results["cases"][case] = merge_measurements(results["cases"][case], measure_case(case, args.repeat))
+    if regressions:
+        regressions = compare(results, baseline, args.tolerance)
+    for case, stage, base_ms, measured_ms, ratio in regressions:
+        print(f"FAIL: {case} {stage} took {measured_ms:.1f} ms, baseline {base_ms:.1f} ms "
+              f"({ratio:.2f}x after calibration)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Runs in a fresh interpreter so every sample pays the full import cost, like a real launch
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from PyQt5.QtCore import QThreadPool
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+from ui.main_window import MainWindow
+window = MainWindow()
+window.show()
+# Checked before the event loop runs, since that is when the background preload kicks off
+heavy = [name for name in ("torch", "numpy", "torchvision", "graphviz") if name in sys.modules]
+app.processEvents()
+elapsed_ms = (time.perf_counter() - start) * 1000
+window.close()
+QThreadPool.globalInstance().waitForDone()
+print(json.dumps({{"ms": elapsed_ms, "heavy": heavy}}))
+"""
+
+
+def measure_once():
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(root=PROJECT_ROOT)],
+        capture_output=True, text=True, env=env, cwd=PROJECT_ROOT, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure time until the landing page is shown")
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=300.0)
+    args = parser.parse_args(argv)
+
+    samples = [measure_once() for _ in range(args.runs)]
+    times = [sample["ms"] for sample in samples]
+    median = statistics.median(times)
+    print(f"startup: median {median:.0f} ms, min {min(times):.0f} ms, max {max(times):.0f} ms over {args.runs} runs")
+
+    heavy = sorted({name for sample in samples for name in sample["heavy"]})
+    if heavy:
+        print(f"FAIL: imported before the window was shown: {', '.join(heavy)}")
+        return 1
+    if median > args.budget_ms:
+        print(f"FAIL: median startup exceeds {args.budget_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import argparse
+import sys
+from core.batch_summary import expand_paths, summarize_many, diff_consecutive, summary_rows, diff_rows, write_output
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Summarize model checkpoints without launching the dashboard")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (
+        ("summarize", "Write layer lists, parameter counts and weight stats for each checkpoint"),
+        ("diff", "Report per-layer weight-stat drift between consecutive checkpoints"),
+    ):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("paths", nargs="+", help="Checkpoint paths or glob patterns")
+        sub.add_argument("-o", "--output", help="Output file (.json, .csv or .parquet); JSON to stdout if omitted")
+        sub.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+        sub.add_argument("--structure-only", action="store_true", help="Read memory-mapped tensor headers only")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    paths = expand_paths(args.paths)
+    if not paths:
+        print("No checkpoints matched", file=sys.stderr)
+        return 1
+
+    summaries = summarize_many(paths, workers=args.workers, structure_only=args.structure_only)
+    for summary in summaries:
+        if "error" in summary:
+            print(f"[skip] {summary['path']}: {summary['error']}", file=sys.stderr)
+
+    if args.command == "summarize":
+        write_output(summaries, summary_rows(summaries), args.output)
+    else:
+        diffs = diff_consecutive(summaries)
+        write_output(diffs, diff_rows(diffs), args.output)
+
+    return 0 if all("error" not in summary for summary in summaries) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
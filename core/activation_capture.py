@@ -0,0 +1,192 @@
+import numpy as np
+import torch
+from core.model_loader import ensure_model
+from core.model_inputs import iter_input_batches, count_input_samples, output_tensors
+from core.activation_store import ActivationStore
+from core.weight_stats import merge_moments
+
+DEFAULT_BINS = 64
+
+
+class RunningStats:
+    def __init__(self, bins=DEFAULT_BINS, hist_range=None):
+        self.bins = bins
+        self.hist_range = hist_range
+        self.histogram = np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.zeros = 0
+
+    def update(self, tensor):
+        values = tensor.detach().reshape(-1)
+        if values.dtype != torch.float64:
+            values = values.float()
+        n = values.numel()
+        if n == 0:
+            return
+
+        batch_var, batch_mean = torch.var_mean(values, unbiased=False)
+        batch_min, batch_max = torch.aminmax(values)
+        batch_min, batch_max = batch_min.item(), batch_max.item()
+
+        self.count, self.mean, self.m2 = merge_moments(
+            self.count, self.mean, self.m2, n, batch_mean.item(), batch_var.item()
+        )
+        self.min = min(self.min, batch_min)
+        self.max = max(self.max, batch_max)
+        self.zeros += int((values == 0).sum().item())
+
+        if self.hist_range is None:
+            # Bin edges are fixed by the first batch so every later batch adds into the same bins
+            low, high = batch_min, batch_max
+            if low == high:
+                low, high = low - 0.5, high + 0.5
+            pad = (high - low) * 0.1
+            self.hist_range = (low - pad, high + pad)
+
+        low, high = self.hist_range
+        self.histogram += torch.histc(values, bins=self.bins, min=low, max=high).to(torch.int64).numpy()
+        self.underflow += int((values < low).sum().item())
+        self.overflow += int((values > high).sum().item())
+
+    def summary(self):
+        if self.count == 0:
+            return None
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": (self.m2 / self.count) ** 0.5,
+            "min": self.min,
+            "max": self.max,
+            "sparsity": self.zeros / self.count,
+            "histogram": self.histogram.tolist(),
+            "hist_range": list(self.hist_range),
+            "underflow": self.underflow,
+            "overflow": self.overflow,
+        }
+
+
+class ActivationCapture:
+    def __init__(self, model, module_names=None, bins=DEFAULT_BINS, hist_range=None, store=None):
+        self.model = model
+        self.store = store
+        self.samples_seen = 0
+        self._batch_size = 0
+        # Without a local model (captures run by the inference server) there is nothing to hook
+        modules = dict(model.named_modules()) if model is not None else {}
+        if module_names is None:
+            # Leaf modules by default; containers would just repeat their last child's output
+            module_names = [name for name, module in modules.items() if name and not list(module.children())]
+        self.modules = {name: modules[name] for name in module_names if name in modules}
+        self.stats = {name: RunningStats(bins, hist_range) for name in module_names}
+        self.batches = 0
+        self._handles = []
+
+    def attach(self):
+        for name, module in self.modules.items():
+            self._handles.append(module.register_forward_hook(self._hook(name)))
+        return self
+
+    def detach(self):
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+
+    def __enter__(self):
+        return self.attach()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.detach()
+
+    def _hook(self, name):
+        def hook(module, inputs, output):
+            tensors = output_tensors(output)
+            if tensors:
+                self.record(name, tensors[0])
+        return hook
+
+    def record(self, name, tensor):
+        # Folded into running stats straight away; the activation itself is never kept
+        self.stats[name].update(tensor)
+        if self.store is not None and tensor.dim() > 0 and tensor.shape[0] == self._batch_size:
+            values = tensor.detach().cpu().numpy()
+            self.store.write(name, self.samples_seen, values)
+
+    def run(self, batches, should_cancel=None, on_progress=None):
+        was_training = self.model.training
+        self.model.eval()
+        try:
+            with torch.no_grad(), self:
+                for batch in batches:
+                    if should_cancel is not None and should_cancel():
+                        break
+                    if self.store is not None:
+                        self._batch_size = min(batch.shape[0], self.store.num_samples - self.samples_seen)
+                        if self._batch_size <= 0:
+                            break
+                        batch = batch[:self._batch_size]
+                    self.model(batch)
+                    self.batches += 1
+                    self.samples_seen += batch.shape[0]
+                    if self.store is not None:
+                        self.store.mark_written(self.samples_seen)
+                    if on_progress is not None:
+                        on_progress(self.batches)
+        finally:
+            self.model.train(was_training)
+            if self.store is not None:
+                self.store.flush()
+        return self.summaries()
+
+    def run_remote(self, server, input_spec, num_batches, batch_size=None, should_cancel=None, on_progress=None):
+        # The forward passes happen in the server process; only the stats folding happens here
+        max_samples = self.store.num_samples if self.store is not None else None
+        try:
+            for batch in server.infer(input_spec, list(self.stats), num_batches=num_batches, batch_size=batch_size,
+                                      max_samples=max_samples, should_cancel=should_cancel):
+                self._batch_size = batch.samples
+                for name, values in batch.activations.items():
+                    self.record(name, torch.from_numpy(values))
+                self.batches += 1
+                self.samples_seen += batch.samples
+                if self.store is not None:
+                    self.store.mark_written(self.samples_seen)
+                if on_progress is not None:
+                    on_progress(self.batches)
+        finally:
+            if self.store is not None:
+                self.store.flush()
+        return self.summaries()
+
+    def summaries(self):
+        return {name: stats.summary() for name, stats in self.stats.items() if stats.count}
+
+
+def run_capture(model_info, input_spec, num_batches=8, batch_size=32, module_names=None, store_path=None,
+                server=None, should_cancel=None, on_progress=None):
+    if server is not None:
+        leaves = server.load(model_info)
+        model = None
+        module_names = leaves if module_names is None else module_names
+    else:
+        model = ensure_model(model_info)
+
+    store = None
+    if store_path:
+        store = ActivationStore.create(store_path, count_input_samples(input_spec, num_batches, batch_size))
+
+    capture = ActivationCapture(model, module_names, store=store)
+    try:
+        if server is not None:
+            return capture.run_remote(server, input_spec, num_batches, batch_size,
+                                      should_cancel=should_cancel, on_progress=on_progress)
+        batches = iter_input_batches(model, input_spec, num_batches, batch_size)
+        return capture.run(batches, should_cancel=should_cancel, on_progress=on_progress)
+    finally:
+        if store is not None:
+            store.close()
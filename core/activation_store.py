@@ -0,0 +1,101 @@
+import json
+import os
+import numpy as np
+
+INDEX_FILE = "index.json"
+STORE_VERSION = 1
+
+
+class ActivationStore:
+    def __init__(self, root, index, writable):
+        self.root = root
+        self.index = index
+        self.writable = writable
+        self._arrays = {}
+
+    @classmethod
+    def create(cls, root, num_samples, dtype="float32"):
+        os.makedirs(root, exist_ok=True)
+        index = {"version": STORE_VERSION, "num_samples": num_samples, "dtype": dtype, "written": 0, "layers": {}}
+        store = cls(root, index, writable=True)
+        store.flush()
+        return store
+
+    @classmethod
+    def open(cls, root):
+        with open(os.path.join(root, INDEX_FILE)) as f:
+            index = json.load(f)
+        if index.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported activation store version: {index.get('version')}")
+        # Arrays are mapped on first access, so reopening a large run only reads the index
+        return cls(root, index, writable=False)
+
+    @property
+    def num_samples(self):
+        return self.index["num_samples"]
+
+    @property
+    def written(self):
+        return self.index["written"]
+
+    @property
+    def layers(self):
+        return list(self.index["layers"])
+
+    def has_layer(self, name):
+        return name in self.index["layers"]
+
+    def shape(self, name):
+        return (self.num_samples, *self.index["layers"][name]["shape"])
+
+    def ensure_layer(self, name, sample_shape):
+        if name in self.index["layers"]:
+            return self._array(name)
+
+        filename = f"layer_{len(self.index['layers']):05d}.npy"
+        self.index["layers"][name] = {"file": filename, "shape": list(sample_shape)}
+        array = np.lib.format.open_memmap(
+            os.path.join(self.root, filename), mode="w+",
+            dtype=self.index["dtype"], shape=(self.num_samples, *sample_shape)
+        )
+        self._arrays[name] = array
+        return array
+
+    def write(self, name, start, values):
+        array = self.ensure_layer(name, values.shape[1:])
+        array[start:start + values.shape[0]] = values
+
+    def mark_written(self, count):
+        self.index["written"] = max(self.index["written"], count)
+
+    def _array(self, name):
+        array = self._arrays.get(name)
+        if array is None:
+            entry = self.index["layers"][name]
+            array = np.load(os.path.join(self.root, entry["file"]), mmap_mode="r+" if self.writable else "r")
+            self._arrays[name] = array
+        return array
+
+    def read(self, name, samples=slice(None), channel=None):
+        # Basic slicing of the memmap returns views, so nothing is copied until the caller touches it
+        array = self._array(name)
+        if isinstance(samples, slice):
+            start, stop, step = samples.indices(self.written)
+            samples = slice(start, stop, step)
+        view = array[samples]
+        if channel is not None:
+            view = view[channel] if isinstance(samples, int) else view[:, channel]
+        return view
+
+    def flush(self):
+        for array in self._arrays.values():
+            array.flush()
+        tmp_path = os.path.join(self.root, INDEX_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, os.path.join(self.root, INDEX_FILE))
+
+    def close(self):
+        if self.writable:
+            self.flush()
+        self._arrays.clear()
@@ -0,0 +1,154 @@
+import csv
+import glob
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from core.model_formats import load_model
+from core.weight_stats import get_weight_stats
+
+STAT_KEYS = ("mean", "std", "min", "max")
+
+
+def natural_key(path):
+    # ckpt_2.pt sorts before ckpt_10.pt
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path)]
+
+
+def expand_paths(patterns):
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern), key=natural_key) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            path = os.path.abspath(path)
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def summarize_checkpoint(path, structure_only=False):
+    try:
+        model_info = load_model(path, structure_only=structure_only)
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
+    layers = []
+    for layer in model_info.layers:
+        layers.append({
+            "name": layer.name,
+            "type": layer.type,
+            "shape": list(layer.shape) if layer.shape is not None else None,
+            "dtype": layer.dtype,
+            "params": layer.params,
+            "trainable_params": layer.trainable_params,
+            "param_bytes": layer.param_bytes,
+            "buffer_bytes": layer.buffer_bytes,
+            "weight_stats": get_weight_stats(layer),
+        })
+
+    return {
+        "path": path,
+        "model": model_info.name,
+        "num_layers": len(layers),
+        "total_params": model_info.accounting["params"],
+        "accounting": model_info.accounting,
+        "layers": layers,
+    }
+
+
+def summarize_many(paths, workers=None, structure_only=False):
+    if workers == 1 or len(paths) <= 1:
+        return [summarize_checkpoint(path, structure_only) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(summarize_checkpoint, paths, [structure_only] * len(paths)))
+
+
+def diff_summaries(before, after):
+    before_layers = {layer["name"]: layer for layer in before.get("layers", [])}
+    after_layers = {layer["name"]: layer for layer in after.get("layers", [])}
+
+    drift = []
+    for name, new in after_layers.items():
+        old = before_layers.get(name)
+        if old is None or not old["weight_stats"] or not new["weight_stats"]:
+            continue
+        entry = {"name": name, "type": new["type"], "shape_changed": old.get("shape") != new.get("shape")}
+        for key in STAT_KEYS:
+            entry[f"{key}_delta"] = new["weight_stats"][key] - old["weight_stats"][key]
+        old_std = old["weight_stats"]["std"]
+        entry["std_rel_change"] = entry["std_delta"] / old_std if old_std else None
+        drift.append(entry)
+
+    drift.sort(key=lambda entry: abs(entry["mean_delta"]) + abs(entry["std_delta"]), reverse=True)
+    return {
+        "before": before["path"],
+        "after": after["path"],
+        "added": [name for name in after_layers if name not in before_layers],
+        "removed": [name for name in before_layers if name not in after_layers],
+        "drift": drift,
+    }
+
+
+def diff_consecutive(summaries):
+    valid = [summary for summary in summaries if "error" not in summary]
+    return [diff_summaries(before, after) for before, after in zip(valid, valid[1:])]
+
+
+def summary_rows(summaries):
+    for summary in summaries:
+        if "error" in summary:
+            yield {"path": summary["path"], "error": summary["error"]}
+            continue
+        for layer in summary["layers"]:
+            stats = layer["weight_stats"] or {}
+            row = {
+                "path": summary["path"],
+                "model": summary["model"],
+                "name": layer["name"],
+                "type": layer["type"],
+                "shape": "x".join(str(d) for d in layer["shape"]) if layer["shape"] else "",
+                "dtype": layer["dtype"] or "",
+                "params": layer["params"],
+                "trainable_params": layer["trainable_params"],
+                "param_bytes": layer["param_bytes"],
+                "buffer_bytes": layer["buffer_bytes"],
+            }
+            row.update({key: stats.get(key) for key in STAT_KEYS})
+            yield row
+
+
+def diff_rows(diffs):
+    for diff in diffs:
+        for entry in diff["drift"]:
+            row = {"before": diff["before"], "after": diff["after"]}
+            row.update(entry)
+            yield row
+
+
+def write_output(records, rows, output):
+    if output is None or output == "-":
+        print(json.dumps(records, indent=2))
+        return
+
+    ext = os.path.splitext(output)[1].lower()
+    if ext == ".json":
+        with open(output, "w") as f:
+            json.dump(records, f, indent=2)
+    elif ext == ".csv":
+        rows = list(rows)
+        fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+        with open(output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    elif ext == ".parquet":
+        try:
+            import pyarrow
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow: pip install pyarrow")
+        pq.write_table(pyarrow.Table.from_pylist(list(rows)), output)
+    else:
+        raise ValueError(f"Unsupported output format: {ext or output}")
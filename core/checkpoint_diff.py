@@ -0,0 +1,155 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+import torch
+from core.checkpoint_reader import open_checkpoint_tensors
+from core.instrumentation import traced
+
+# float64 chunks of this many elements keep each worker's temporaries around 24 MB
+DIFF_CHUNK_SIZE = 1 << 20
+MOMENT_KEYS = ("numel", "changed", "diff_sq", "norm_a_sq", "norm_b_sq", "dot")
+WRAPPER_PREFIX = "module."
+
+
+def _strip_wrapper_prefix(tensors):
+    # DataParallel/DDP checkpoints prefix every key, which would otherwise align nothing
+    if tensors and all(name.startswith(WRAPPER_PREFIX) for name in tensors):
+        return {name[len(WRAPPER_PREFIX):]: tensor for name, tensor in tensors.items()}
+    return tensors
+
+
+def align_tensors(tensors_a, tensors_b):
+    tensors_a = _strip_wrapper_prefix(tensors_a)
+    tensors_b = _strip_wrapper_prefix(tensors_b)
+
+    pairs = []
+    mismatched = []
+    for name, tensor in tensors_a.items():
+        other = tensors_b.get(name)
+        if other is None:
+            continue
+        if tuple(tensor.shape) == tuple(other.shape):
+            pairs.append((name, tensor, other))
+        else:
+            mismatched.append(name)
+
+    return {
+        "pairs": pairs,
+        "mismatched": mismatched,
+        "only_a": [name for name in tensors_a if name not in tensors_b],
+        "only_b": [name for name in tensors_b if name not in tensors_a],
+    }
+
+
+@traced("diff.tensor_moments")
+def tensor_moments(a, b, chunk_size=DIFF_CHUNK_SIZE, should_cancel=None):
+    # Sums of squares and the dot product are all that L2, cosine and relative change need,
+    # and they add up across chunks, so neither tensor is ever converted as a whole
+    flat_a = a.detach().reshape(-1)
+    flat_b = b.detach().reshape(-1)
+    moments = dict.fromkeys(MOMENT_KEYS, 0)
+    moments["numel"] = flat_a.numel()
+
+    with torch.no_grad():
+        for start in range(0, flat_a.numel(), chunk_size):
+            if should_cancel is not None and should_cancel():
+                return None
+            chunk_a = flat_a[start:start + chunk_size].to(torch.float64)
+            chunk_b = flat_b[start:start + chunk_size].to(torch.float64)
+            delta = chunk_a - chunk_b
+
+            moments["changed"] += int(torch.count_nonzero(delta))
+            moments["diff_sq"] += float(torch.dot(delta, delta))
+            moments["norm_a_sq"] += float(torch.dot(chunk_a, chunk_a))
+            moments["norm_b_sq"] += float(torch.dot(chunk_b, chunk_b))
+            moments["dot"] += float(torch.dot(chunk_a, chunk_b))
+
+    return moments
+
+
+def finish_moments(moments):
+    l2 = math.sqrt(moments["diff_sq"])
+    norm_a = math.sqrt(moments["norm_a_sq"])
+    norm_b = math.sqrt(moments["norm_b_sq"])
+
+    if norm_a > 0 and norm_b > 0:
+        cosine = moments["dot"] / (norm_a * norm_b)
+    else:
+        cosine = 1.0 if norm_a == norm_b else 0.0
+    # A tensor that starts at zero has no scale to compare against; any change counts as 100%
+    if norm_a > 0:
+        relative = l2 / norm_a
+    else:
+        relative = 0.0 if l2 == 0 else 1.0
+
+    return {
+        "l2": l2,
+        "cosine": cosine,
+        "relative_change": relative,
+        "changed_fraction": moments["changed"] / moments["numel"] if moments["numel"] else 0.0,
+        "numel": moments["numel"],
+    }
+
+
+def _accumulate(totals, name, moments):
+    entry = totals.get(name)
+    if entry is None:
+        totals[name] = dict(moments)
+        return
+    for key in MOMENT_KEYS:
+        entry[key] += moments[key]
+
+
+def diff_tensors(tensors_a, tensors_b, workers=None, should_cancel=None, on_progress=None):
+    aligned = align_tensors(tensors_a, tensors_b)
+    # Largest first so one big embedding doesn't start last and leave the other threads idle
+    pairs = sorted(aligned["pairs"], key=lambda pair: -pair[1].numel())
+    workers = workers or min(8, os.cpu_count() or 1)
+
+    tensor_moments_by_name = {}
+    # torch releases the GIL inside its kernels, so threads overlap both compute and mmap reads
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(name, pool.submit(tensor_moments, a, b, should_cancel=should_cancel)) for name, a, b in pairs]
+        for done, (name, future) in enumerate(futures, 1):
+            moments = future.result()
+            if moments is None:
+                break
+            tensor_moments_by_name[name] = moments
+            if on_progress is not None:
+                on_progress(done)
+
+    # Each tensor counts toward its module and every ancestor, so collapsed groups get a value too
+    layer_moments = {}
+    for name, moments in tensor_moments_by_name.items():
+        module_name = name.rpartition(".")[0]
+        while module_name:
+            _accumulate(layer_moments, module_name, moments)
+            module_name = module_name.rpartition(".")[0]
+        _accumulate(layer_moments, "", moments)
+
+    overall = layer_moments.pop("", None)
+    return {
+        "tensors": {name: finish_moments(moments) for name, moments in tensor_moments_by_name.items()},
+        "layers": {name: finish_moments(moments) for name, moments in layer_moments.items()},
+        "overall": finish_moments(overall) if overall is not None else None,
+        "mismatched": aligned["mismatched"],
+        "only_a": aligned["only_a"],
+        "only_b": aligned["only_b"],
+    }
+
+
+def diff_checkpoints(path_a, path_b, workers=None, should_cancel=None, on_progress=None):
+    # Both sides are memory-mapped; only the chunks being compared are paged in
+    return diff_tensors(open_checkpoint_tensors(path_a), open_checkpoint_tensors(path_b),
+                        workers=workers, should_cancel=should_cancel, on_progress=on_progress)
+
+
+def diff_model_info(model_info, other_path, workers=None, should_cancel=None, on_progress=None):
+    if model_info.model is not None:
+        tensors = dict(model_info.model.state_dict())
+    elif model_info.source_path is not None and model_info.source_format == "pytorch":
+        tensors = open_checkpoint_tensors(model_info.source_path)
+    else:
+        raise ValueError(f"{model_info.name} has no PyTorch weights to compare")
+    return diff_tensors(tensors, open_checkpoint_tensors(other_path),
+                        workers=workers, should_cancel=should_cancel, on_progress=on_progress)
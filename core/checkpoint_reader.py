@@ -0,0 +1,150 @@
+import functools
+import os
+import torch
+import torch.nn as nn
+from core.model_info import LayerRecord
+from core.weight_stats import WeightRef
+from core.param_accounting import account_tensors, layer_totals, storage_key
+from core.instrumentation import span
+
+BUFFER_NAMES = ("running_mean", "running_var", "num_batches_tracked")
+
+
+def read_checkpoint(path):
+    try:
+        # mmap keeps tensor storages on disk until something actually reads them
+        with span("torch.load", path=str(path), mmap=True):
+            return torch.load(path, map_location=torch.device('cpu'), mmap=True, weights_only=False)
+    except RuntimeError:
+        # Legacy (non-zip) checkpoints cannot be memory-mapped
+        with span("torch.load", path=str(path), mmap=False):
+            return torch.load(path, map_location=torch.device('cpu'), weights_only=False)
+
+
+def unwrap_checkpoint(obj):
+    if isinstance(obj, dict):
+        for key in ("model", "state_dict", "model_state_dict"):
+            if key in obj and isinstance(obj[key], (dict, nn.Module)):
+                return obj[key]
+    return obj
+
+
+def flatten_tensors(obj, prefix=""):
+    tensors = {}
+    for key, value in obj.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, torch.Tensor):
+            tensors[name] = value
+        elif isinstance(value, dict):
+            tensors.update(flatten_tensors(value, name))
+    return tensors
+
+
+def open_checkpoint_tensors(path):
+    stat = os.stat(path)
+    return _open_checkpoint_tensors(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=4)
+def _open_checkpoint_tensors(path, size, mtime_ns):
+    obj = unwrap_checkpoint(read_checkpoint(path))
+    if isinstance(obj, nn.Module):
+        obj = obj.state_dict()
+    if not isinstance(obj, dict):
+        raise TypeError("Checkpoint contains neither an nn.Module nor a state_dict")
+    return flatten_tensors(obj)
+
+
+def tensor_header(name, tensor):
+    return {
+        "name": name,
+        "dtype": str(tensor.dtype).replace("torch.", ""),
+        "shape": list(tensor.shape),
+        "offset": tensor.storage_offset() * tensor.element_size(),
+        "nbytes": tensor.numel() * tensor.element_size(),
+    }
+
+
+def read_tensor_headers(path):
+    return [tensor_header(name, tensor) for name, tensor in open_checkpoint_tensors(path).items()]
+
+
+def _infer_module_type(name, entry):
+    tensors = entry["tensors"]
+    weight = tensors.get("weight")
+
+    if not tensors:
+        children = [child.rpartition(".")[2] for child in entry["children"]]
+        return "Sequential" if children and all(c.isdigit() for c in children) else "Module"
+    if "running_mean" in tensors:
+        return "BatchNorm"
+    if weight is None:
+        return "Module"
+
+    ndim = len(weight["shape"])
+    if ndim in (3, 4, 5):
+        return f"Conv{ndim - 2}d"
+    if ndim == 2:
+        if "bias" not in tensors and "embed" in name.lower():
+            return "Embedding"
+        return "Linear"
+    if ndim == 1 and "bias" in tensors:
+        return "LayerNorm"
+    return "Module"
+
+
+def build_layers_from_headers(headers, tensors=None):
+    modules = {"": {"tensors": {}, "children": []}}
+
+    def ensure(module_name):
+        if module_name in modules:
+            return modules[module_name]
+        parent, _, _ = module_name.rpartition(".")
+        ensure(parent)["children"].append(module_name)
+        entry = {"tensors": {}, "children": []}
+        modules[module_name] = entry
+        return entry
+
+    entries = []
+    for header in headers:
+        module_name, _, attr = header["name"].rpartition(".")
+        ensure(module_name)["tensors"][attr] = header
+        is_buffer = attr in BUFFER_NAMES
+        # Tied weights load as tensors sharing a storage; without tensors only names can tell them apart
+        key = storage_key(tensors[header["name"]]) if tensors is not None else header["name"]
+        # A state_dict has no requires_grad, so every non-buffer tensor counts as trainable
+        entries.append((module_name, key, _numel(header["shape"]), header["nbytes"], header["dtype"],
+                        is_buffer, not is_buffer))
+
+    subtree, accounting = account_tensors(list(modules), entries)
+
+    layers = []
+    for module_name, entry in modules.items():
+        if not module_name:
+            continue
+        weight = entry["tensors"].get("weight")
+        weight_ref = None
+        if weight is not None and tensors is not None:
+            weight_ref = WeightRef(_tensor_resolver(tensors, weight["name"]))
+
+        layers.append(LayerRecord(
+            module_name,
+            _infer_module_type(module_name, entry),
+            shape=weight["shape"] if weight is not None else None,
+            dtype=weight["dtype"] if weight is not None else None,
+            weight_ref=weight_ref,
+            **layer_totals(subtree[module_name]),
+        ))
+
+    return layers, accounting
+
+
+def _tensor_resolver(tensors, name):
+    return lambda: tensors[name]
+
+
+def _numel(shape):
+    count = 1
+    for dim in shape:
+        count *= dim
+    return count
@@ -0,0 +1,92 @@
+from collections import deque
+
+DEFAULT_SWEEPS = 4
+
+
+def _layering(num_nodes, preds, succs):
+    # Longest path from the sources, in Kahn order; anything left on a cycle is stacked below
+    indegree = [len(p) for p in preds]
+    queue = deque(v for v in range(num_nodes) if indegree[v] == 0)
+    layer = [0] * num_nodes
+    order = []
+    while queue:
+        v = queue.popleft()
+        order.append(v)
+        for w in succs[v]:
+            layer[w] = max(layer[w], layer[v] + 1)
+            indegree[w] -= 1
+            if indegree[w] == 0:
+                queue.append(w)
+
+    if len(order) < num_nodes:
+        placed = set(order)
+        next_layer = max((layer[v] + 1 for v in order), default=0)
+        for v in range(num_nodes):
+            if v not in placed:
+                layer[v] = next_layer
+                next_layer += 1
+                order.append(v)
+    return layer, order
+
+
+def _barycenter_sweep(layers, neighbours, position):
+    for nodes in layers:
+        def key(v):
+            linked = neighbours[v]
+            if not linked:
+                return position[v]
+            return sum(position[u] for u in linked) / len(linked)
+
+        nodes.sort(key=key)
+        for i, v in enumerate(nodes):
+            position[v] = i
+
+
+def _assign_x(layers, preds, position):
+    # Each node aims for the mean x of its parents; pushing overlaps apart left to right and
+    # then shifting the whole layer back by the mean push keeps unit spacing around the targets
+    x = [0.0] * len(position)
+    for nodes in layers:
+        desired = []
+        for v in nodes:
+            parents = preds[v]
+            desired.append(sum(x[u] for u in parents) / len(parents) if parents else float(position[v]))
+
+        placed = list(desired)
+        for i in range(1, len(placed)):
+            placed[i] = max(placed[i], placed[i - 1] + 1)
+        shift = sum(p - d for p, d in zip(placed, desired)) / len(placed) if placed else 0.0
+        for v, value in zip(nodes, placed):
+            x[v] = value - shift
+
+    offset = min(x, default=0.0)
+    return [value - offset for value in x]
+
+
+def layered_layout(num_nodes, edges, sweeps=DEFAULT_SWEEPS):
+    preds = [[] for _ in range(num_nodes)]
+    succs = [[] for _ in range(num_nodes)]
+    for src, dst in edges:
+        if src != dst:
+            preds[dst].append(src)
+            succs[src].append(dst)
+
+    layer, order = _layering(num_nodes, preds, succs)
+
+    layers = [[] for _ in range(max(layer, default=-1) + 1)]
+    for v in order:
+        layers[layer[v]].append(v)
+    position = [0] * num_nodes
+    for nodes in layers:
+        for i, v in enumerate(nodes):
+            position[v] = i
+
+    # Only edges that point forward in the layering guide the ordering
+    down = [[u for u in preds[v] if layer[u] < layer[v]] for v in range(num_nodes)]
+    up = [[w for w in succs[v] if layer[w] > layer[v]] for v in range(num_nodes)]
+    for _ in range(sweeps):
+        _barycenter_sweep(layers[1:], down, position)
+        _barycenter_sweep(reversed(layers[:-1]), up, position)
+
+    x = _assign_x(layers, down, position)
+    return {"x": x, "layer": layer, "num_layers": len(layers), "width": max(x, default=0.0) + 1}
@@ -0,0 +1,164 @@
+import torch
+import torch.fx
+from torch.fx.passes.shape_prop import ShapeProp
+from torch.overrides import TorchFunctionMode
+from torch.utils._pytree import tree_flatten
+from core.model_info import DataflowGraph
+from core.model_loader import ensure_model
+from core.model_inputs import make_input, output_tensors
+from core.dag_layout import layered_layout
+from core.instrumentation import span
+
+
+def _describe(tensor):
+    return list(tensor.shape), str(tensor.dtype).replace("torch.", "")
+
+
+def _first_tensor_meta(meta):
+    if meta is None:
+        return None
+    if hasattr(meta, "shape") and hasattr(meta, "dtype"):
+        return meta
+    values = meta.values() if isinstance(meta, dict) else meta if isinstance(meta, (list, tuple)) else ()
+    for value in values:
+        found = _first_tensor_meta(value)
+        if found is not None:
+            return found
+    return None
+
+
+def _target_name(node):
+    if node.op in ("call_module", "get_attr", "call_method"):
+        return str(node.target)
+    return getattr(node.target, "__name__", str(node.target))
+
+
+def trace_fx(model, example_input=None):
+    traced = torch.fx.symbolic_trace(model)
+    if example_input is not None:
+        was_training = model.training
+        model.eval()
+        try:
+            with torch.no_grad():
+                ShapeProp(traced).propagate(example_input)
+        except Exception:
+            # Shapes are a bonus; the traced structure is still valid without them
+            pass
+        finally:
+            model.train(was_training)
+
+    modules = dict(traced.named_modules())
+    graph = DataflowGraph("fx")
+    ids = {}
+    for node in traced.graph.nodes:
+        meta = _first_tensor_meta(node.meta.get("tensor_meta"))
+        shape, dtype = (list(meta.shape), str(meta.dtype).replace("torch.", "")) if meta is not None else (None, None)
+        module = node.target if node.op == "call_module" else None
+        target = type(modules[module]).__name__ if module in modules else _target_name(node)
+        inputs = [ids[arg] for arg in node.all_input_nodes if arg in ids]
+        ids[node] = graph.add_node(node.name, node.op, target, module, inputs, shape, dtype)
+    return graph
+
+
+class _FunctionRecorder(TorchFunctionMode):
+    def __init__(self, tracer):
+        super().__init__()
+        self.tracer = tracer
+
+    def __torch_function__(self, func, types, args=(), kwargs=None):
+        result = func(*args, **(kwargs or {}))
+        # Ops inside a leaf module belong to that module's node
+        if self.tracer.depth == 0:
+            self.tracer.record("call_function", getattr(func, "__name__", str(func)), None, (args, kwargs), result)
+        return result
+
+
+class _HookTracer:
+    def __init__(self, graph):
+        self.graph = graph
+        self.depth = 0
+        self.producers = {}
+        # Tensors are held until tracing ends so their ids cannot be reused by new tensors
+        self.alive = []
+        self.counts = {}
+
+    def record(self, op, target, module, inputs, outputs):
+        flat_inputs, _ = tree_flatten(inputs)
+        flat_outputs = output_tensors(outputs)
+        if not flat_outputs:
+            return None
+
+        sources = [self.producers[id(t)] for t in flat_inputs if isinstance(t, torch.Tensor) and id(t) in self.producers]
+        if module is None:
+            count = self.counts[target] = self.counts.get(target, 0) + 1
+            name = target if count == 1 else f"{target}_{count - 1}"
+        else:
+            name = module
+        shape, dtype = _describe(flat_outputs[0])
+        node = self.graph.add_node(name, op, target, module, sources, shape, dtype)
+        for tensor in flat_outputs:
+            self.producers[id(tensor)] = node
+            self.alive.append(tensor)
+        return node
+
+
+def trace_hooks(model, example_input):
+    graph = DataflowGraph("hooks")
+    tracer = _HookTracer(graph)
+    tracer.record("placeholder", "input", None, (), example_input)
+
+    def pre_hook(module, inputs):
+        tracer.depth += 1
+
+    def post_hook(name):
+        def hook(module, inputs, output):
+            tracer.depth -= 1
+            if tracer.depth == 0:
+                tracer.record("call_module", type(module).__name__, name, inputs, output)
+        return hook
+
+    handles = []
+    for name, module in model.named_modules():
+        if name and not list(module.children()):
+            handles.append(module.register_forward_pre_hook(pre_hook))
+            handles.append(module.register_forward_hook(post_hook(name)))
+
+    was_training = model.training
+    model.eval()
+    try:
+        with torch.no_grad(), _FunctionRecorder(tracer):
+            output = model(example_input)
+    finally:
+        model.train(was_training)
+        for handle in handles:
+            handle.remove()
+
+    sources = [tracer.producers[id(t)] for t in output_tensors(output) if id(t) in tracer.producers]
+    graph.add_node("output", "output", "output", inputs=sources)
+    return graph
+
+
+def extract_dataflow(model, example_input=None):
+    try:
+        return trace_fx(model, example_input)
+    except Exception as e:
+        # Data-dependent control flow defeats symbolic tracing; running the model still works
+        if example_input is None:
+            raise ValueError(f"Symbolic tracing failed ({e}); give an example input to trace with hooks") from e
+        return trace_hooks(model, example_input)
+
+
+def build_dataflow(model_info, input_spec=None):
+    key = (input_spec or "").strip()
+    cached = model_info.dataflow.get(key)
+    if cached is not None:
+        return cached
+
+    model = ensure_model(model_info)
+    example_input = make_input(model, key) if key else None
+    with span("dataflow.trace"):
+        graph = extract_dataflow(model, example_input)
+    with span("dataflow.layout", nodes=len(graph.nodes)):
+        layout = layered_layout(len(graph.nodes), graph.edges)
+    model_info.dataflow[key] = (graph, layout)
+    return graph, layout
@@ -0,0 +1,104 @@
+import numpy as np
+
+# Coarser levels stop once tiles are this small; below that a tile is just a colored square
+MIN_LEVEL_SIZE = 4
+# Viridis control points; the lookup table interpolates between them
+VIRIDIS_STOPS = (
+    (0.0, (68, 1, 84)),
+    (0.13, (71, 44, 122)),
+    (0.25, (59, 81, 139)),
+    (0.38, (44, 113, 142)),
+    (0.5, (33, 144, 141)),
+    (0.63, (39, 173, 129)),
+    (0.75, (92, 200, 99)),
+    (0.88, (170, 220, 50)),
+    (1.0, (253, 231, 37)),
+)
+
+
+def colormap_lut(stops=VIRIDIS_STOPS):
+    # 256 entries laid out as BGRA, which is what QImage.Format_RGB32 reads on little-endian machines
+    positions = np.array([position for position, _ in stops])
+    colors = np.array([color for _, color in stops], dtype=np.float64)
+    steps = np.linspace(0.0, 1.0, 256)
+    lut = np.empty((256, 4), dtype=np.uint8)
+    for channel, target in ((0, 2), (1, 1), (2, 0)):
+        lut[:, target] = np.round(np.interp(steps, positions, colors[:, channel]))
+    lut[:, 3] = 255
+    return lut
+
+
+def downsample(maps):
+    # 2x2 mean over (C, H, W); an odd trailing row or column is dropped
+    channels, height, width = maps.shape
+    height, width = height // 2 * 2, width // 2 * 2
+    blocks = maps[:, :height, :width].reshape(channels, height // 2, 2, width // 2, 2)
+    return blocks.mean(axis=(2, 4), dtype=np.float32)
+
+
+class FeatureMapPyramid:
+    # levels[0] is full resolution; each later level halves both sides. Every level is one
+    # contiguous (C, h, w, 4) uint8 array, so each channel tile is a contiguous BGRA image
+    def __init__(self, levels, channel_min, channel_max):
+        self.levels = levels
+        self.channel_min = channel_min
+        self.channel_max = channel_max
+
+    @property
+    def channels(self):
+        return self.levels[0].shape[0]
+
+    @property
+    def tile_shape(self):
+        return self.levels[0].shape[1:3]
+
+    def level_for(self, size):
+        # The coarsest level that still has at least `size` pixels along its longer side
+        chosen = 0
+        for index, level in enumerate(self.levels):
+            if max(level.shape[1:3]) < size:
+                break
+            chosen = index
+        return chosen
+
+    def tile(self, level, channel):
+        return self.levels[level][channel]
+
+
+def build_pyramid(maps, per_channel=True, lut=None, should_cancel=None):
+    # maps is (C, H, W), e.g. one sample of a conv activation read from the activation store
+    maps = np.array(maps, dtype=np.float32)
+    if maps.ndim != 3:
+        raise ValueError(f"Feature maps need a (channels, height, width) activation, got shape {maps.shape}")
+    np.nan_to_num(maps, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    lut = colormap_lut() if lut is None else lut
+
+    channel_min = maps.min(axis=(1, 2))
+    channel_max = maps.max(axis=(1, 2))
+    if per_channel:
+        low, high = channel_min[:, None, None], channel_max[:, None, None]
+    else:
+        low, high = channel_min.min(), channel_max.max()
+    # Constant channels map to the bottom of the colormap instead of dividing by zero
+    scale = 255.0 / np.maximum(high - low, 1e-12)
+
+    levels = []
+    while True:
+        if should_cancel is not None and should_cancel():
+            return None
+        indices = np.clip((maps - low) * scale, 0, 255).astype(np.uint8)
+        levels.append(lut[indices])
+        if min(maps.shape[1:]) < 2 * MIN_LEVEL_SIZE:
+            break
+        maps = downsample(maps)
+    return FeatureMapPyramid(levels, channel_min, channel_max)
+
+
+def load_pyramid(store, layer_name, sample=0, per_channel=True, should_cancel=None):
+    shape = store.shape(layer_name)
+    if len(shape) != 4:
+        raise ValueError(f"{layer_name} stores {len(shape) - 1}-D samples; feature maps need (C, H, W)")
+    if not 0 <= sample < store.written:
+        raise ValueError(f"Sample {sample} is outside the {store.written} stored samples")
+    return build_pyramid(store.read(layer_name, samples=sample), per_channel=per_channel,
+                         should_cancel=should_cancel)
@@ -0,0 +1,351 @@
+import os
+import threading
+
+# MainWindow imports this module while the window opens, so multiprocessing, numpy and torch
+# are imported where they are used: in the server process, at start() or on the first request
+
+# One core stays free for the GUI process while the server saturates the rest
+DEFAULT_THREADS = max(1, (os.cpu_count() or 2) - 1)
+DEFAULT_BATCH_SIZE = 32
+# Each layer gets this many shared buffers, so the server runs the next batch while the
+# client is still reading the previous one
+SLOTS = 2
+STOP_TIMEOUT = 5.0
+
+
+class InferenceError(RuntimeError):
+    pass
+
+
+class ActivationBatch:
+    # Arrays are views onto the server's shared memory and are only valid until the client
+    # asks for the next batch; copy anything that has to outlive the loop body
+    def __init__(self, index, start, samples, activations):
+        self.index = index
+        self.start = start
+        self.samples = samples
+        self.activations = activations
+
+
+def _numpy_dtype(torch_dtype):
+    import numpy as np
+    return np.dtype(str(torch_dtype).replace("torch.", ""))
+
+
+def _micro_batches(model, input_spec, num_batches, batch_size):
+    from core.model_inputs import iter_input_batches
+    # Synthetic batches larger than batch_size are split too, which bounds the shared buffers
+    for inputs in iter_input_batches(model, input_spec, num_batches, batch_size):
+        for start in range(0, inputs.shape[0], batch_size):
+            yield inputs[start:start + batch_size]
+
+
+class _Worker:
+    # Lives in the server process: owns the model and the shared buffers it writes into
+    def __init__(self, conn):
+        self.conn = conn
+        self.model = None
+        self.segments = {}
+        self.request = 0
+        self.slot = 0
+        self.acked = -1
+        self.cancelled = False
+
+    def handle(self, message):
+        command = message[0]
+        if command == "configure":
+            import torch
+            torch.set_num_threads(message[1])
+            self.conn.send(("ok", torch.get_num_threads()))
+        elif command == "load":
+            self.load(*message[1:])
+        elif command == "infer":
+            self.infer(*message[1:])
+        elif command in ("ack", "cancel"):
+            # Stragglers from a request that already finished
+            pass
+        else:
+            raise ValueError(f"Unknown inference command {command!r}")
+
+    def load(self, key, source):
+        from core.model_loader import resolve_model
+        self.model = None
+        self.model = resolve_model(source)
+        self.model.eval()
+        leaves = [name for name, module in self.model.named_modules() if name and not list(module.children())]
+        self.conn.send(("loaded", key, leaves))
+
+    def _receive(self, block):
+        while block or self.conn.poll():
+            message = self.conn.recv()
+            block = False
+            if message[0] == "ack" and message[1] == self.request:
+                self.acked = max(self.acked, message[2])
+            elif message[0] == "cancel" and message[1] == self.request:
+                self.cancelled = True
+
+    def _segment(self, name, slot, nbytes):
+        from multiprocessing import shared_memory
+        key = (name, slot)
+        segment = self.segments.get(key)
+        if segment is None or segment.size < nbytes:
+            if segment is not None:
+                self._release(key)
+            segment = self.segments[key] = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        return segment
+
+    def _release(self, key):
+        segment = self.segments.pop(key)
+        segment.close()
+        segment.unlink()
+
+    def release_all(self):
+        for key in list(self.segments):
+            self._release(key)
+
+    def _hook(self, name, outputs):
+        import numpy as np
+        import torch
+        from core.model_inputs import output_tensors
+
+        def hook(module, inputs, output):
+            tensors = output_tensors(output)
+            if not tensors:
+                return
+            tensor = tensors[0].detach()
+            if tensor.dtype == torch.bfloat16:
+                tensor = tensor.float()
+            dtype = _numpy_dtype(tensor.dtype)
+            nbytes = tensor.numel() * dtype.itemsize
+            segment = self._segment(name, self.slot, nbytes)
+            # Copied once, straight from the output into the shared buffer
+            target = np.ndarray(tuple(tensor.shape), dtype=dtype, buffer=segment.buf)
+            torch.from_numpy(target).copy_(tensor)
+            del target
+            outputs[name] = (segment.name, tuple(tensor.shape), dtype.str)
+        return hook
+
+    def infer(self, request, input_spec, layer_names, num_batches, batch_size, max_samples):
+        import torch
+
+        if self.model is None:
+            raise ValueError("No model loaded in the inference server")
+        self.request = request
+        self.acked = -1
+        self.cancelled = False
+
+        modules = dict(self.model.named_modules())
+        missing = [name for name in layer_names if name not in modules]
+        if missing:
+            raise ValueError(f"Unknown layers: {', '.join(missing[:5])}")
+
+        outputs = {}
+        handles = [modules[name].register_forward_hook(self._hook(name, outputs)) for name in layer_names]
+        index = 0
+        seen = 0
+        try:
+            with torch.no_grad():
+                for batch in _micro_batches(self.model, input_spec, num_batches, batch_size):
+                    self._receive(block=False)
+                    while not self.cancelled and self.acked < index - SLOTS:
+                        self._receive(block=True)
+                    if self.cancelled or (max_samples is not None and seen >= max_samples):
+                        break
+                    if max_samples is not None:
+                        batch = batch[:max_samples - seen]
+                    self.slot = index % SLOTS
+                    outputs.clear()
+                    self.model(batch)
+                    self.conn.send(("batch", request, index, seen, batch.shape[0], dict(outputs)))
+                    index += 1
+                    seen += batch.shape[0]
+
+            # Buffers are freed only once the client is done with every batch
+            while not self.cancelled and self.acked < index - 1:
+                self._receive(block=True)
+        finally:
+            for handle in handles:
+                handle.remove()
+            self.release_all()
+        self.conn.send(("done", request, index))
+
+
+def _serve(conn, threads):
+    import torch
+    torch.set_num_threads(threads)
+    worker = _Worker(conn)
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message[0] == "stop":
+                break
+            try:
+                worker.handle(message)
+            except Exception as e:
+                worker.release_all()
+                conn.send(("error", str(e)))
+    finally:
+        worker.release_all()
+        conn.close()
+
+
+class InferenceServer:
+    # Client for a separate process that owns a copy of the model and runs forward passes, so
+    # torch never competes with the GUI for the GIL. Requests are serialized; call from a
+    # worker thread, since infer() blocks while the server computes
+    def __init__(self, threads=DEFAULT_THREADS, batch_size=DEFAULT_BATCH_SIZE):
+        self.threads = threads
+        self.batch_size = batch_size
+        self.process = None
+        self.conn = None
+        self._lock = threading.Lock()
+        self._request = 0
+        self._loaded = None
+        self._leaves = []
+
+    def start(self):
+        if self.is_running():
+            return
+        import multiprocessing
+        # spawn rather than fork: forking a process that already runs Qt and torch threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_conn, self.threads), daemon=True,
+                                       name="deeplens-inference")
+        self.process.start()
+        child_conn.close()
+        self._loaded = None
+
+    def is_running(self):
+        return self.process is not None and self.process.is_alive()
+
+    def stop(self):
+        if self.process is None:
+            return
+        # A request still in flight holds the lock; terminating makes its recv fail instead of hang
+        if self._lock.acquire(blocking=False):
+            try:
+                self.conn.send(("stop",))
+            except (OSError, ValueError):
+                pass
+            finally:
+                self._lock.release()
+            self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+        self._loaded = None
+
+    def _recv(self):
+        try:
+            message = self.conn.recv()
+        except (EOFError, OSError):
+            self.process.join(0.1)
+            raise InferenceError(f"Inference server exited (code {self.process.exitcode})")
+        if message[0] == "error":
+            raise InferenceError(message[1])
+        return message
+
+    def _ensure_running(self):
+        if not self.is_running():
+            if self.process is not None:
+                self.stop()
+            self.start()
+
+    def set_threads(self, threads):
+        self.threads = threads
+        with self._lock:
+            if self.is_running():
+                self.conn.send(("configure", threads))
+                self._recv()
+
+    def load(self, model_info):
+        # Checkpoints are re-read from disk by the server; in-memory models are pickled over once
+        if model_info.source_path is not None and model_info.source_format == "pytorch":
+            key = ("path", model_info.source_path)
+            source = model_info.source_path
+        elif model_info.model is not None:
+            key = ("model", id(model_info.model))
+            source = model_info.model
+        elif model_info.source_path is not None:
+            raise ValueError(f"{model_info.name} was read from {model_info.source_format} metadata and cannot be run")
+        else:
+            raise ValueError(f"{model_info.name} has no loaded model to run")
+
+        with self._lock:
+            self._ensure_running()
+            if self._loaded != key:
+                self.conn.send(("load", key, source))
+                _, _, self._leaves = self._recv()
+                self._loaded = key
+            return list(self._leaves)
+
+    def infer(self, input_spec, layer_names=None, num_batches=1, batch_size=None, max_samples=None,
+              should_cancel=None):
+        # Yields an ActivationBatch per forward pass; layer_names defaults to every leaf module
+        import numpy as np
+        with self._lock:
+            if not self.is_running():
+                raise InferenceError("Inference server is not running")
+            if self._loaded is None:
+                raise InferenceError("Load a model into the inference server first")
+            self._request += 1
+            request = self._request
+            layer_names = list(self._leaves if layer_names is None else layer_names)
+            self.conn.send(("infer", request, input_spec, layer_names, num_batches,
+                            batch_size or self.batch_size, max_samples))
+
+            attached = {}
+            cancelled = False
+            try:
+                while True:
+                    message = self._recv()
+                    if message[0] == "done":
+                        break
+                    _, _, index, start, samples, outputs = message
+                    if cancelled:
+                        continue
+                    if should_cancel is not None and should_cancel():
+                        self.conn.send(("cancel", request))
+                        cancelled = True
+                        continue
+
+                    activations = {}
+                    for name, (segment_name, shape, dtype) in outputs.items():
+                        segment = attached.get(segment_name)
+                        if segment is None:
+                            segment = attached[segment_name] = _attach(segment_name)
+                        activations[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+                    batch = ActivationBatch(index, start, samples, activations)
+                    del activations
+                    try:
+                        yield batch
+                    finally:
+                        del batch
+                    self.conn.send(("ack", request, index))
+            except GeneratorExit:
+                # The caller stopped early; let the server wind down so the next request starts clean
+                self.conn.send(("cancel", request))
+                while self._recv()[0] != "done":
+                    pass
+                raise
+            finally:
+                for segment in attached.values():
+                    try:
+                        segment.close()
+                    except BufferError:
+                        # A view escaped the loop body; the mapping goes when it is collected
+                        pass
+
+
+def _attach(name):
+    from multiprocessing import shared_memory
+    # Spawned children share the client's resource tracker, so segments the server leaks by
+    # crashing are still unlinked when this process exits
+    return shared_memory.SharedMemory(name=name)
@@ -0,0 +1,166 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # Windows has no getrusage; peak RSS is then left out
+    resource = None
+
+ENV_FLAG = "DEEPLENS_TRACE"
+# Paint and scroll spans fire continuously; past this many events only the per-name totals grow
+MAX_EVENTS = 500000
+
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "args", "start")
+
+    def __init__(self, recorder, name, args):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.recorder._finish(self.name, self.start, end, self.args)
+        return False
+
+
+class Instrumentation:
+    # Nested timing spans and counters, recorded only while enabled. Disabled, span() hands back
+    # one shared no-op context manager, so instrumented code pays a call and an attribute check
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.clear()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def clear(self):
+        with self._lock:
+            self.origin = time.perf_counter()
+            self.events = []
+            self.counters = {}
+            self.totals = {}
+            self.dropped = 0
+            self.peak_rss_kb = _peak_rss_kb()
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+            self._append(("C", name, now, total, threading.get_ident()))
+
+    def _finish(self, name, start, end, args):
+        peak = _peak_rss_kb()
+        with self._lock:
+            self._append(("X", name, start, end - start, threading.get_ident(), args))
+            calls, total, longest = self.totals.get(name, (0, 0.0, 0.0))
+            self.totals[name] = (calls + 1, total + end - start, max(longest, end - start))
+            if peak is not None and peak > self.peak_rss_kb:
+                self.peak_rss_kb = peak
+                self._append(("C", "peak_rss_mb", end, peak / 1024, threading.get_ident()))
+
+    def _append(self, event):
+        if len(self.events) < MAX_EVENTS:
+            self.events.append(event)
+        else:
+            self.dropped += 1
+
+    def summary(self):
+        with self._lock:
+            spans = [
+                {"name": name, "calls": calls, "total_ms": total * 1000, "mean_ms": total * 1000 / calls,
+                 "max_ms": longest * 1000}
+                for name, (calls, total, longest) in self.totals.items()
+            ]
+            counters = dict(self.counters)
+            peak = self.peak_rss_kb
+            dropped = self.dropped
+        spans.sort(key=lambda span: -span["total_ms"])
+        return {"spans": spans, "counters": counters, "peak_rss_kb": peak, "dropped_events": dropped}
+
+    def chrome_trace(self):
+        # Trace Event Format: complete ("X") events nest by time on each thread, counters ("C")
+        # become line charts; load the file in chrome://tracing or ui.perfetto.dev
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+            origin = self.origin
+
+        trace = []
+        for event in events:
+            if event[0] == "X":
+                _, name, start, duration, tid, args = event
+                trace.append({"name": name, "ph": "X", "ts": (start - origin) * 1e6, "dur": duration * 1e6,
+                              "pid": pid, "tid": tid, "args": args})
+            else:
+                _, name, timestamp, value, tid = event
+                trace.append({"name": name, "ph": "C", "ts": (timestamp - origin) * 1e6,
+                              "pid": pid, "tid": tid, "args": {name: value}})
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f, default=str)
+        return path
+
+
+instrumentation = Instrumentation(enabled=os.environ.get(ENV_FLAG, "") not in ("", "0"))
+
+
+def span(name, **args):
+    return instrumentation.span(name, **args)
+
+
+def count(name, value=1):
+    instrumentation.count(name, value)
+
+
+def traced(name):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return fn(*args, **kwargs)
+            with _Span(instrumentation, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
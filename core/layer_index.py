@@ -0,0 +1,214 @@
+from array import array
+import bisect
+
+ROOT = 0
+NONE = -1
+# Per-node array columns, as export_state() returns them
+COLUMNS = ("parents", "rows", "first_child", "last_child", "next_sibling", "child_counts", "type_codes", "params",
+           "shape_starts", "shape_lens")
+
+
+class LayerIndex:
+    # Node 0 is an unnamed root; every dotted module name gets one node, with implicit
+    # nodes created for path segments that have no layer of their own
+    def __init__(self, layers=()):
+        self.names = [""]
+        self.layers = [None]
+        self.types = []
+        self.parents = array("i", [NONE])
+        self.rows = array("i", [0])
+        self.first_child = array("i", [NONE])
+        self.last_child = array("i", [NONE])
+        self.next_sibling = array("i", [NONE])
+        self.child_counts = array("i", [0])
+        self.type_codes = array("i", [NONE])
+        self.params = array("q", [0])
+        self.shape_starts = array("q", [0])
+        self.shape_lens = array("i", [NONE])
+        self.shape_dims = array("q")
+        self._ids = {"": ROOT}
+        self._type_ids = {}
+        self._type_members = {}
+        self._sorted_names = None
+        self._sorted_ids = None
+        self.extend(layers)
+
+    def __len__(self):
+        return len(self.names) - 1
+
+    def export_state(self):
+        # Enough to rebuild the index without replaying extend(); from_state derives the lookup
+        # tables again
+        columns = {name: getattr(self, name) for name in COLUMNS}
+        columns["shape_dims"] = self.shape_dims
+        return self.names, self.types, columns
+
+    @classmethod
+    def from_state(cls, names, types, columns, layers):
+        # layers lines up with names: the record for each node, or None for implicit groups
+        index = cls()
+        index.names = names
+        index.layers = layers
+        index.types = types
+        for name, values in columns.items():
+            setattr(index, name, values)
+        index._ids = dict(zip(names, range(len(names))))
+        index._type_ids = {type_name: code for code, type_name in enumerate(types)}
+        index._type_members = {code: array("i") for code in range(len(types))}
+        for node, code in enumerate(index.type_codes):
+            if code != NONE:
+                index._type_members[code].append(node)
+        return index
+
+    def extend(self, layers):
+        # Returns the new nodes in creation order (parents first), followed by existing
+        # implicit nodes whose layer only arrived now
+        start = len(self.names)
+        filled = []
+        for layer in layers:
+            node = self._ids.get(layer.name)
+            if node is None:
+                self._add(layer.name, layer)
+            elif self.layers[node] is None:
+                self._set_layer(node, layer)
+                filled.append(node)
+        return list(range(start, len(self.names))) + filled
+
+    def _add(self, name, layer=None):
+        parent_name, _, _ = name.rpartition(".")
+        parent = self._ids.get(parent_name)
+        if parent is None:
+            parent = self._add(parent_name)
+
+        node = len(self.names)
+        self.names.append(name)
+        self.layers.append(None)
+        self._ids[name] = node
+        self._sorted_names = None
+
+        self.parents.append(parent)
+        self.first_child.append(NONE)
+        self.last_child.append(NONE)
+        self.next_sibling.append(NONE)
+        self.child_counts.append(0)
+        self.type_codes.append(NONE)
+        self.params.append(0)
+        self.shape_starts.append(0)
+        self.shape_lens.append(NONE)
+
+        self.rows.append(self.child_counts[parent])
+        if self.last_child[parent] == NONE:
+            self.first_child[parent] = node
+        else:
+            self.next_sibling[self.last_child[parent]] = node
+        self.last_child[parent] = node
+        self.child_counts[parent] += 1
+
+        if layer is not None:
+            self._set_layer(node, layer)
+        return node
+
+    def _set_layer(self, node, layer):
+        self.layers[node] = layer
+
+        code = self._type_ids.get(layer.type)
+        if code is None:
+            code = self._type_ids[layer.type] = len(self.types)
+            self.types.append(layer.type)
+            self._type_members[code] = array("i")
+        self.type_codes[node] = code
+        self._type_members[code].append(node)
+
+        shape = layer.shape
+        if shape is not None:
+            self.shape_starts[node] = len(self.shape_dims)
+            self.shape_lens[node] = len(shape)
+            self.shape_dims.extend(shape)
+
+        delta = layer.params - self.params[node]
+        self.params[node] = layer.params
+        # Layer params already cover their subtree, so only implicit ancestors need the delta
+        parent = self.parents[node]
+        while parent != NONE and self.layers[parent] is None:
+            self.params[parent] += delta
+            parent = self.parents[parent]
+
+    def lookup(self, name):
+        return self._ids.get(name)
+
+    def segment(self, node):
+        return self.names[node].rpartition(".")[2]
+
+    def type_name(self, node):
+        code = self.type_codes[node]
+        return self.types[code] if code != NONE else None
+
+    def shape(self, node):
+        length = self.shape_lens[node]
+        if length == NONE:
+            return None
+        start = self.shape_starts[node]
+        return self.shape_dims[start:start + length].tolist()
+
+    def subtree_params(self, node=ROOT):
+        return self.params[node]
+
+    def children(self, node=ROOT):
+        child = self.first_child[node]
+        while child != NONE:
+            yield child
+            child = self.next_sibling[child]
+
+    def descendants(self, node=ROOT):
+        stack = list(self.children(node))
+        stack.reverse()
+        while stack:
+            child = stack.pop()
+            yield child
+            grandchildren = list(self.children(child))
+            grandchildren.reverse()
+            stack.extend(grandchildren)
+
+    def _columns(self, leaves_only):
+        # Zero-copy numpy views of the type and params columns, restricted to nodes with a layer.
+        # numpy is imported here because the index is built while the window opens
+        import numpy as np
+        codes = np.frombuffer(self.type_codes, dtype=np.intc)
+        params = np.frombuffer(self.params, dtype=np.int64)
+        mask = codes != NONE
+        if leaves_only:
+            # Layer params already include their subtree, so only leaves sum without double counting
+            mask &= np.frombuffer(self.child_counts, dtype=np.intc) == 0
+        return np, codes[mask], params[mask]
+
+    def count_by_type(self, leaves_only=False):
+        np, codes, _ = self._columns(leaves_only)
+        counts = np.bincount(codes, minlength=len(self.types))
+        return {type_name: int(n) for type_name, n in zip(self.types, counts) if n}
+
+    def params_by_type(self, leaves_only=True):
+        np, codes, params = self._columns(leaves_only)
+        # Float weights are exact up to 2**53 params
+        totals = np.bincount(codes, weights=params, minlength=len(self.types))
+        return {type_name: int(total) for type_name, total in zip(self.types, totals) if total}
+
+    def of_type(self, type_name):
+        code = self._type_ids.get(type_name)
+        return list(self._type_members[code]) if code is not None else []
+
+    def with_prefix(self, prefix):
+        if self._sorted_names is None:
+            order = sorted(range(1, len(self.names)), key=self.names.__getitem__)
+            self._sorted_names = [self.names[node] for node in order]
+            self._sorted_ids = order
+        lo = bisect.bisect_left(self._sorted_names, prefix)
+        hi = bisect.bisect_left(self._sorted_names, prefix + "\U0010ffff", lo)
+        return self._sorted_ids[lo:hi]
+
+    def search(self, text):
+        text = text.lower()
+        matching_types = {code for code, type_name in enumerate(self.types) if text in type_name.lower()}
+        return [
+            node for node in range(1, len(self.names))
+            if text in self.names[node].lower() or self.type_codes[node] in matching_types
+        ]
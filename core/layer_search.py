@@ -0,0 +1,207 @@
+import bisect
+import fnmatch
+import re
+from array import array
+from core.layer_index import ROOT, NONE
+
+NAME_SEPARATORS = re.compile(r"[._/-]+")
+PARAM_FILTER = re.compile(r"^params(<=|>=|<|>|=|:)(.+)$")
+COUNT = re.compile(r"^(\d+(?:\.\d+)?(?:e\d+)?)([kmbg]?)$")
+COUNT_UNITS = {"": 1, "k": 10 ** 3, "m": 10 ** 6, "b": 10 ** 9, "g": 10 ** 9}
+GLOB_CHARS = "*?["
+
+# Indexing state per node
+UNINDEXED = 0
+NAMED = 1
+DESCRIBED = 2
+
+
+class QueryError(ValueError):
+    pass
+
+
+def parse_count(text):
+    match = COUNT.match(text.strip().lower())
+    if match is None:
+        raise QueryError(f"Expected a count like 10M or 2.5e6, got {text!r}")
+    return int(float(match.group(1)) * COUNT_UNITS[match.group(2)])
+
+
+def name_tokens(name):
+    return {token for token in NAME_SEPARATORS.split(name.lower()) if token}
+
+
+class LayerSearchIndex:
+    # Inverted index over a LayerIndex. Name tokens, activations, single dims and full shapes map
+    # to node id arrays, types reuse the LayerIndex type lists, and param ranges bisect a sorted
+    # copy of the params array. update() takes the nodes LayerIndex.extend returned, so a
+    # streaming load is indexed batch by batch
+    def __init__(self, layer_index):
+        self.layer_index = layer_index
+        self.tokens = {}
+        self.activations = {}
+        self.dims = {}
+        self.shapes = {}
+        self.state = bytearray(1)
+        self._params_sorted = None
+        self._params_order = None
+        self.update(range(1, len(layer_index.names)))
+
+    def export_state(self):
+        # Posting lists by kind (dims are keyed by int, the rest by string) and the per-node state
+        postings = {"tokens": self.tokens, "activations": self.activations, "dims": self.dims, "shapes": self.shapes}
+        return postings, self.state
+
+    @classmethod
+    def from_state(cls, layer_index, postings, state):
+        # Skips re-tokenizing every name; layer_index must be the one the state was exported with
+        index = cls.__new__(cls)
+        index.layer_index = layer_index
+        index.tokens = postings["tokens"]
+        index.activations = postings["activations"]
+        index.dims = postings["dims"]
+        index.shapes = postings["shapes"]
+        index.state = state
+        index._params_sorted = None
+        index._params_order = None
+        return index
+
+    def update(self, nodes):
+        index = self.layer_index
+        self.state.extend(bytes(len(index.names) - len(self.state)))
+        for node in nodes:
+            if self.state[node] == UNINDEXED:
+                for token in name_tokens(index.names[node]):
+                    self.tokens.setdefault(token, array("i")).append(node)
+                self.state[node] = NAMED
+
+            layer = index.layers[node]
+            if layer is None or self.state[node] == DESCRIBED:
+                continue
+            self.state[node] = DESCRIBED
+            if layer.activation:
+                self.activations.setdefault(layer.activation.lower(), array("i")).append(node)
+            shape = layer.shape
+            if shape:
+                self.shapes.setdefault("x".join(map(str, shape)), array("i")).append(node)
+                for dim in set(shape):
+                    self.dims.setdefault(dim, array("i")).append(node)
+        # New layers also change the params of their implicit ancestors
+        self._params_sorted = None
+
+    def _by_params(self):
+        if self._params_sorted is None:
+            params = self.layer_index.params
+            self._params_order = sorted(range(1, len(params)), key=params.__getitem__)
+            self._params_sorted = [params[node] for node in self._params_order]
+        return self._params_sorted, self._params_order
+
+    def params_between(self, low=None, high=None):
+        # Inclusive bounds; None leaves that side open
+        values, order = self._by_params()
+        lo = 0 if low is None else bisect.bisect_left(values, low)
+        hi = len(values) if high is None else bisect.bisect_right(values, high)
+        return order[lo:hi]
+
+    def _params_term(self, op, value):
+        if op == ":" and ".." in value:
+            low, _, high = value.partition("..")
+            return self.params_between(parse_count(low) if low else None, parse_count(high) if high else None)
+        count = parse_count(value)
+        if op == ">":
+            return self.params_between(count + 1, None)
+        if op == ">=":
+            return self.params_between(count, None)
+        if op == "<":
+            return self.params_between(None, count - 1)
+        if op == "<=":
+            return self.params_between(None, count)
+        return self.params_between(count, count)
+
+    def _type_term(self, pattern):
+        pattern = pattern.lower()
+        nodes = []
+        for type_name in self.layer_index.types:
+            if fnmatch.fnmatchcase(type_name.lower(), pattern):
+                nodes.extend(self.layer_index.of_type(type_name))
+        return nodes
+
+    def _name_term(self, pattern):
+        index = self.layer_index
+        prefix = pattern.rstrip("*")
+        if not any(char in prefix for char in GLOB_CHARS):
+            if prefix != pattern:
+                # "encoder.*" is a prefix lookup on the sorted names
+                return index.with_prefix(prefix)
+            # A plain dotted name means that module and everything under it
+            node = index.lookup(pattern)
+            return ([node] if node is not None else []) + index.with_prefix(pattern + ".")
+        # Only names sharing the literal start of the pattern are matched against it
+        literal = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+        candidates = index.with_prefix(literal) if literal else range(1, len(index.names))
+        match = re.compile(fnmatch.translate(pattern)).match
+        return [node for node in candidates if match(index.names[node])]
+
+    def _shape_term(self, value):
+        value = value.lower()
+        if "x" in value:
+            return self.shapes.get(value, ())
+        try:
+            return self.dims.get(int(value), ())
+        except ValueError:
+            raise QueryError(f"Expected a dimension or a shape like 768x3072, got {value!r}")
+
+    def _term(self, term):
+        key, sep, value = term.partition(":")
+        params = PARAM_FILTER.match(term.lower())
+        if params is not None:
+            return self._params_term(params.group(1), params.group(2))
+        if sep and key.lower() == "type":
+            return self._type_term(value)
+        if sep and key.lower() in ("act", "activation"):
+            return self.activations.get(value.lower(), ())
+        if sep and key.lower() == "shape":
+            return self._shape_term(value)
+        if sep and key.lower() == "name":
+            return self._name_term(value)
+        if sep:
+            raise QueryError(f"Unknown filter {key!r}; use name:, type:, shape:, act: or params")
+        if "." in term or any(char in term for char in GLOB_CHARS):
+            return self._name_term(term)
+        # A bare word is a name token or a layer type, whichever matches
+        return list(self.tokens.get(term.lower(), ())) + self._type_term(term)
+
+    def query(self, text):
+        # Space-separated terms are ANDed; a leading "-" excludes a term's matches.
+        # Returns matching node ids in ascending order, or None for an empty query
+        include = []
+        exclude = []
+        for term in text.split():
+            if term.startswith("-") and len(term) > 1:
+                exclude.append(set(self._term(term[1:])))
+            else:
+                include.append(set(self._term(term)))
+        if not include and not exclude:
+            return None
+
+        if include:
+            include.sort(key=len)
+            result = include[0]
+            for other in include[1:]:
+                result = result & other
+        else:
+            result = set(range(1, len(self.layer_index.names)))
+        for other in exclude:
+            result -= other
+        return sorted(result)
+
+    def ancestors(self, nodes):
+        # Every group above a match, so a filtered tree still has a path down to each one
+        parents = self.layer_index.parents
+        seen = set()
+        for node in nodes:
+            parent = parents[node]
+            while parent not in (ROOT, NONE) and parent not in seen:
+                seen.add(parent)
+                parent = parents[parent]
+        return seen
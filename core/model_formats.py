@@ -0,0 +1,400 @@
+import functools
+import json
+import mmap
+import os
+import struct
+import sys
+import numpy as np
+import torch
+import torch.nn as nn
+from core.model_info import ModelInfo
+from core.weight_stats import WeightRef
+from core.checkpoint_reader import build_layers_from_headers
+from core.model_loader import PYTORCH_EXTENSIONS, load_pytorch_model, _collect_batches
+from core.instrumentation import span
+
+# Extension -> loader(path, structure_only, cache, on_progress, should_cancel, batch_size) returning ModelInfo
+LOADERS = {}
+
+SAFETENSORS_DTYPES = {
+    "F64": ("float64", 8), "F32": ("float32", 4), "F16": ("float16", 2), "BF16": ("bfloat16", 2),
+    "I64": ("int64", 8), "I32": ("int32", 4), "I16": ("int16", 2), "I8": ("int8", 1),
+    "U8": ("uint8", 1), "BOOL": ("bool", 1), "F8_E4M3": ("float8_e4m3fn", 1), "F8_E5M2": ("float8_e5m2", 1),
+}
+
+# TensorProto.DataType codes
+ONNX_DTYPES = {
+    1: ("float32", 4), 2: ("uint8", 1), 3: ("int8", 1), 4: ("uint16", 2), 5: ("int16", 2), 6: ("int32", 4),
+    7: ("int64", 8), 9: ("bool", 1), 10: ("float16", 2), 11: ("float64", 8), 12: ("uint32", 4),
+    13: ("uint64", 8), 16: ("bfloat16", 2),
+}
+ONNX_INPUT_ROLES = {1: "weight", 2: "bias"}
+# Protobuf field numbers: ModelProto.graph, GraphProto.node/initializer, NodeProto.input/name/op_type,
+# TensorProto.dims/data_type/name/raw_data/data_location
+ONNX_MODEL_GRAPH = 7
+ONNX_GRAPH_NODE, ONNX_GRAPH_INITIALIZER = 1, 5
+ONNX_NODE_INPUT, ONNX_NODE_NAME, ONNX_NODE_OP_TYPE = 1, 3, 4
+ONNX_TENSOR_DIMS, ONNX_TENSOR_DATA_TYPE, ONNX_TENSOR_NAME, ONNX_TENSOR_RAW_DATA = 1, 2, 8, 9
+ONNX_TENSOR_DATA_LOCATION = 14
+ONNX_EXTERNAL = 1
+
+# Keras names for the tensors build_layers_from_headers knows as weight/bias/running stats
+KERAS_TENSOR_NAMES = {
+    "kernel": "weight",
+    "depthwise_kernel": "weight",
+    "embeddings": "weight",
+    "gamma": "weight",
+    "beta": "bias",
+    "moving_mean": "running_mean",
+    "moving_variance": "running_var",
+}
+
+
+def register_loader(*extensions):
+    def register(loader):
+        for ext in extensions:
+            LOADERS[ext.lower()] = loader
+        return loader
+    return register
+
+
+def supported_extensions():
+    return sorted(LOADERS)
+
+
+def load_model(model_or_path, **kwargs):
+    if isinstance(model_or_path, nn.Module):
+        return load_pytorch_model(model_or_path, **kwargs)
+    ext = os.path.splitext(str(model_or_path))[1].lower()
+    # Anything unregistered is handed to torch.load, which reads pickles whatever they are named
+    loader = LOADERS.get(ext, load_pytorch_model)
+    with span("load_model", path=str(model_or_path), format=ext):
+        return loader(model_or_path, **kwargs)
+
+
+register_loader(*PYTORCH_EXTENSIONS)(load_pytorch_model)
+
+
+def _require(module_name, message):
+    try:
+        return __import__(module_name)
+    except ImportError:
+        raise ImportError(message)
+
+
+def _header_model_info(path, source_format, headers, resolvers, types, on_progress, should_cancel, batch_size):
+    # Layer records come from tensor names and shapes alone; weights are read only when a
+    # weight ref is resolved for stats
+    layers, accounting = build_layers_from_headers(headers)
+    for layer in layers:
+        resolve = resolvers.get(f"{layer.name}.weight")
+        if resolve is not None:
+            layer.weight_ref = WeightRef(resolve)
+        if layer.name in types:
+            layer.type = sys.intern(types[layer.name])
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    modules = _collect_batches(layers, lambda layer: layer, name, on_progress, should_cancel, batch_size)
+    return ModelInfo(name, modules, source_path=os.path.abspath(path), accounting=accounting,
+                     source_format=source_format)
+
+
+def read_safetensors_header(path):
+    with open(path, "rb") as f:
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    header.pop("__metadata__", None)
+    return header, 8 + length
+
+
+def _mapped_resolver(path, start, end, dtype, shape):
+    def resolve():
+        if end == start:
+            return torch.empty(shape, dtype=getattr(torch, dtype))
+        # Copy-on-write mapping gives torch a writable buffer without touching the file
+        data = np.memmap(path, dtype=np.uint8, mode="c", offset=start, shape=(end - start,))
+        return torch.frombuffer(data, dtype=getattr(torch, dtype)).reshape(shape)
+    return resolve
+
+
+def _read_safetensors(path):
+    header, data_start = read_safetensors_header(path)
+
+    headers = []
+    resolvers = {}
+    for name, entry in header.items():
+        if entry["dtype"] not in SAFETENSORS_DTYPES:
+            raise ValueError(f"Unsupported safetensors dtype {entry['dtype']} for {name}")
+        dtype, _ = SAFETENSORS_DTYPES[entry["dtype"]]
+        begin, end = entry["data_offsets"]
+        headers.append({
+            "name": name,
+            "dtype": dtype,
+            "shape": entry["shape"],
+            "offset": data_start + begin,
+            "nbytes": end - begin,
+        })
+        if name.endswith(".weight"):
+            resolvers[name] = _mapped_resolver(path, data_start + begin, data_start + end, dtype, entry["shape"])
+
+    return headers, resolvers, {}
+
+
+@register_loader(".safetensors")
+def load_safetensors_model(path, structure_only=False, cache=None, on_progress=None, should_cancel=None, batch_size=64):
+    headers, resolvers, types = _read_safetensors(path)
+    return _header_model_info(path, "safetensors", headers, resolvers, types, on_progress, should_cancel, batch_size)
+
+
+def _varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _proto_fields(buf, start, end):
+    # Walks protobuf wire format between two offsets. Length-delimited fields yield their
+    # (start, end) span rather than a copy, so large payloads are skipped without being read
+    pos = start
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _varint(buf, pos)
+        elif wire_type == 2:
+            length, pos = _varint(buf, pos)
+            value = (pos, pos + length)
+            pos += length
+        elif wire_type == 1:
+            value = None
+            pos += 8
+        elif wire_type == 5:
+            value = None
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type} at offset {pos}")
+        yield field, wire_type, value
+
+
+def _proto_string(buf, span):
+    return bytes(buf[span[0]:span[1]]).decode()
+
+
+def _read_onnx_node(buf, start, end):
+    inputs = []
+    name = op_type = ""
+    for field, _, value in _proto_fields(buf, start, end):
+        if field == ONNX_NODE_INPUT:
+            inputs.append(_proto_string(buf, value))
+        elif field == ONNX_NODE_NAME:
+            name = _proto_string(buf, value)
+        elif field == ONNX_NODE_OP_TYPE:
+            op_type = _proto_string(buf, value)
+    return inputs, name, op_type
+
+
+def _read_onnx_tensor(buf, start, end):
+    # Dims, type and name only; raw_data is located, not read
+    tensor = {"dims": [], "data_type": 0, "name": "", "raw_data": None, "external": False, "span": (start, end)}
+    for field, wire_type, value in _proto_fields(buf, start, end):
+        if field == ONNX_TENSOR_DIMS:
+            if wire_type == 2:
+                pos, stop = value
+                while pos < stop:
+                    dim, pos = _varint(buf, pos)
+                    tensor["dims"].append(dim)
+            else:
+                tensor["dims"].append(value)
+        elif field == ONNX_TENSOR_DATA_TYPE:
+            tensor["data_type"] = value
+        elif field == ONNX_TENSOR_NAME:
+            tensor["name"] = _proto_string(buf, value)
+        elif field == ONNX_TENSOR_RAW_DATA:
+            tensor["raw_data"] = value
+        elif field == ONNX_TENSOR_DATA_LOCATION:
+            tensor["external"] = value == ONNX_EXTERNAL
+    return tensor
+
+
+def read_onnx_graph(path):
+    # The top-level graph's nodes as (inputs, name, op_type) and its initializers' descriptions,
+    # scanned from a read-only mapping so embedded weights are never copied into memory
+    nodes = []
+    tensors = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        for field, _, value in _proto_fields(buf, 0, len(buf)):
+            if field != ONNX_MODEL_GRAPH:
+                continue
+            for graph_field, _, span in _proto_fields(buf, *value):
+                if graph_field == ONNX_GRAPH_NODE:
+                    nodes.append(_read_onnx_node(buf, *span))
+                elif graph_field == ONNX_GRAPH_INITIALIZER:
+                    tensors.append(_read_onnx_tensor(buf, *span))
+    return nodes, tensors
+
+
+def _onnx_resolver(path, start, end, base_dir):
+    # Tensors kept in typed fields or external files are decoded by onnx itself
+    def resolve():
+        onnx = _require("onnx", "Reading this ONNX tensor needs the onnx package: pip install onnx")
+        from onnx import numpy_helper
+        with open(path, "rb") as f:
+            f.seek(start)
+            tensor = onnx.TensorProto.FromString(f.read(end - start))
+        return torch.from_numpy(numpy_helper.to_array(tensor, base_dir=base_dir).copy())
+    return resolve
+
+
+def _onnx_module_name(node_name, op_type, index):
+    # Exporters name nodes like "/layer1/layer1.0/conv1/Conv"; dots inside a segment would
+    # read as extra nesting, so they are flattened first
+    segments = [segment.replace(".", "_") for segment in node_name.strip("/").split("/") if segment]
+    return ".".join(segments) or f"{op_type}_{index}"
+
+
+def _read_onnx(path):
+    # The protobuf is scanned rather than parsed with onnx.load, which would copy every
+    # embedded initializer's raw_data into memory just to read its shape
+    nodes, tensors = read_onnx_graph(path)
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    initializers = {tensor["name"] for tensor in tensors}
+    names = {}
+    types = {}
+    for index, (inputs, node_name, op_type) in enumerate(nodes):
+        for position, input_name in enumerate(inputs):
+            if input_name not in initializers:
+                continue
+            if "." in input_name:
+                module_name = input_name.rpartition(".")[0]
+            else:
+                # Constant-folded exports lose parameter names, so the consuming node names them
+                module_name = _onnx_module_name(node_name, op_type, index)
+                names.setdefault(input_name, f"{module_name}.{ONNX_INPUT_ROLES.get(position, f'input{position}')}")
+            types.setdefault(module_name, op_type)
+
+    headers = []
+    resolvers = {}
+    for tensor in tensors:
+        dtype, itemsize = ONNX_DTYPES.get(tensor["data_type"], (str(tensor["data_type"]), 0))
+        shape = tensor["dims"]
+        name = names.get(tensor["name"], tensor["name"])
+        raw_data = tensor["raw_data"]
+        mapped = raw_data is not None and not tensor["external"] and tensor["data_type"] in ONNX_DTYPES
+        headers.append({
+            "name": name,
+            "dtype": dtype,
+            "shape": shape,
+            "offset": raw_data[0] if mapped else None,
+            "nbytes": int(np.prod(shape, dtype=np.int64)) * itemsize,
+        })
+        if not name.endswith(".weight"):
+            continue
+        if mapped:
+            # raw_data is little-endian, like safetensors, so it maps straight into a tensor
+            resolvers[name] = _mapped_resolver(path, raw_data[0], raw_data[1], dtype, shape)
+        else:
+            resolvers[name] = _onnx_resolver(path, *tensor["span"], base_dir)
+
+    return headers, resolvers, types
+
+
+@register_loader(".onnx")
+def load_onnx_model(path, structure_only=False, cache=None, on_progress=None, should_cancel=None, batch_size=64):
+    headers, resolvers, types = _read_onnx(path)
+    return _header_model_info(path, "onnx", headers, resolvers, types, on_progress, should_cancel, batch_size)
+
+
+def _hdf5_resolver(path, dataset_name):
+    def resolve():
+        import h5py
+        with h5py.File(path, "r") as f:
+            return torch.from_numpy(f[dataset_name][()])
+    return resolve
+
+
+def _keras_layer_types(config, types):
+    if isinstance(config, dict):
+        layer_config = config.get("config")
+        if "class_name" in config and isinstance(layer_config, dict) and "name" in layer_config:
+            types.setdefault(layer_config["name"], config["class_name"])
+        for value in config.values():
+            _keras_layer_types(value, types)
+    elif isinstance(config, list):
+        for value in config:
+            _keras_layer_types(value, types)
+    return types
+
+
+def _keras_tensor_name(dataset_name):
+    # "dense/dense/kernel:0" -> "dense.weight": Keras repeats the layer name as a group
+    segments = []
+    for segment in dataset_name.split("/"):
+        segment = segment.split(":")[0].replace(".", "_")
+        if not segments or segments[-1] != segment:
+            segments.append(segment)
+    segments[-1] = KERAS_TENSOR_NAMES.get(segments[-1], segments[-1])
+    return ".".join(segments)
+
+
+def _read_hdf5(path):
+    h5py = _require("h5py", "HDF5 models need the h5py package: pip install h5py")
+
+    headers = []
+    resolvers = {}
+    types = {}
+    with h5py.File(path, "r") as f:
+        root = f["model_weights"] if "model_weights" in f else f
+        config = f.attrs.get("model_config")
+        if config is not None:
+            _keras_layer_types(json.loads(config.decode() if isinstance(config, bytes) else config), types)
+
+        def visit(dataset_name, obj):
+            # Dataset shape and dtype come from the object header; no data is read
+            if not isinstance(obj, h5py.Dataset):
+                return
+            name = _keras_tensor_name(dataset_name)
+            headers.append({
+                "name": name,
+                "dtype": str(obj.dtype),
+                "shape": list(obj.shape),
+                "offset": None,
+                "nbytes": obj.size * obj.dtype.itemsize,
+            })
+            if name.endswith(".weight"):
+                resolvers[name] = _hdf5_resolver(path, f"{root.name.rstrip('/')}/{dataset_name}")
+
+        root.visititems(visit)
+
+    return headers, resolvers, types
+
+
+@register_loader(".h5", ".hdf5")
+def load_hdf5_model(path, structure_only=False, cache=None, on_progress=None, should_cancel=None, batch_size=64):
+    headers, resolvers, types = _read_hdf5(path)
+    return _header_model_info(path, "hdf5", headers, resolvers, types, on_progress, should_cancel, batch_size)
+
+
+# source_format -> reader(path) returning (tensor headers, weight resolvers by "<layer>.weight", layer types)
+FORMAT_READERS = {"safetensors": _read_safetensors, "onnx": _read_onnx, "hdf5": _read_hdf5}
+
+
+def open_weight_resolvers(path, source_format):
+    # Weight resolvers for a file read from metadata, e.g. to reattach weight refs to layers
+    # restored from a session; the file's size and mtime key the cache so a rewrite is re-read
+    stat = os.stat(path)
+    return _open_weight_resolvers(os.path.abspath(path), source_format, stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=4)
+def _open_weight_resolvers(path, source_format, size, mtime_ns):
+    if source_format not in FORMAT_READERS:
+        raise ValueError(f"No weight reader for {source_format} files")
+    _, resolvers, _ = FORMAT_READERS[source_format](path)
+    return resolvers
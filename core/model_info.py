@@ -0,0 +1,77 @@
+import sys
+
+
+def _intern(value):
+    return sys.intern(value) if value is not None else None
+
+
+class LayerRecord:
+    # One module's description. Slots instead of a per-layer dict keep a 100k-module model
+    # affordable; type, dtype and activation strings are interned so records share them, and
+    # shapes are tuples. The analysis fields stay None until the matching dashboard action runs
+    __slots__ = (
+        "name", "type", "shape", "dtype", "activation", "weight_stats", "weight_ref",
+        "params", "trainable_params", "param_bytes", "buffer_bytes", "error",
+        "profile", "activation_stats", "diff", "quant",
+    )
+
+    def __init__(self, name, type, shape=None, dtype=None, activation=None, weight_stats=None, weight_ref=None,
+                 params=0, trainable_params=0, param_bytes=0, buffer_bytes=0, error=None):
+        self.name = name
+        self.type = _intern(type)
+        self.shape = tuple(shape) if shape is not None else None
+        self.dtype = _intern(dtype)
+        self.activation = _intern(activation)
+        self.weight_stats = weight_stats
+        self.weight_ref = weight_ref
+        self.params = params
+        self.trainable_params = trainable_params
+        self.param_bytes = param_bytes
+        self.buffer_bytes = buffer_bytes
+        self.error = error
+        self.profile = None
+        self.activation_stats = None
+        self.diff = None
+        self.quant = None
+
+    def __repr__(self):
+        return f"LayerRecord({self.name!r}, {self.type!r}, shape={self.shape}, params={self.params})"
+
+
+class DataflowGraph:
+    # Traced operator graph; core.dataflow_graph fills it in, sessions restore it without torch
+    def __init__(self, method):
+        self.method = method
+        self.nodes = []
+        self.inputs = []
+
+    def add_node(self, name, op, target, module=None, inputs=(), shape=None, dtype=None):
+        self.nodes.append({
+            "name": name,
+            "op": op,
+            "target": target,
+            "module": module,
+            "shape": shape,
+            "dtype": dtype,
+        })
+        self.inputs.append(list(dict.fromkeys(inputs)))
+        return len(self.nodes) - 1
+
+    @property
+    def edges(self):
+        return [(src, dst) for dst, srcs in enumerate(self.inputs) for src in srcs]
+
+
+class ModelInfo:
+    def __init__(self, name, layers, model=None, source_path=None, accounting=None, source_format="pytorch"):
+        self.name = name
+        # LayerRecords in module order
+        self.layers = layers
+        self.model = model
+        self.source_path = source_path
+        # Formats other than pytorch are read from tensor metadata and cannot be run
+        self.source_format = source_format
+        # Whole-model totals from core.param_accounting, each tensor counted once
+        self.accounting = accounting
+        # Traced dataflow graphs and their layouts, keyed by the input spec used for shapes
+        self.dataflow = {}
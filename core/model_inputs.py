@@ -0,0 +1,61 @@
+import torch
+import torch.nn as nn
+
+
+def parse_input_shape(text):
+    return tuple(int(dim) for dim in text.replace("x", ",").split(",") if dim.strip())
+
+
+def make_synthetic_input(model, shape):
+    # Token models start with an embedding and need integer ids rather than floats
+    first_leaf = next((m for m in model.modules() if not list(m.children())), None)
+    if isinstance(first_leaf, nn.Embedding):
+        return torch.randint(0, first_leaf.num_embeddings, shape)
+    return torch.randn(shape)
+
+
+def load_sample_input(path):
+    sample = torch.load(path, map_location=torch.device('cpu'))
+    if not isinstance(sample, torch.Tensor):
+        raise TypeError("Sample input file must contain a single tensor")
+    return sample
+
+
+def is_sample_path(input_spec):
+    return input_spec.strip().endswith((".pt", ".pth"))
+
+
+def make_input(model, input_spec):
+    if is_sample_path(input_spec):
+        return load_sample_input(input_spec.strip())
+    return make_synthetic_input(model, parse_input_shape(input_spec))
+
+
+def iter_input_batches(model, input_spec, num_batches, batch_size=32):
+    if is_sample_path(input_spec):
+        # Sample files hold many inputs along dim 0; slicing keeps a single copy in memory
+        samples = load_sample_input(input_spec.strip())
+        for start in range(0, samples.shape[0], batch_size):
+            yield samples[start:start + batch_size]
+        return
+
+    shape = parse_input_shape(input_spec)
+    for _ in range(num_batches):
+        yield make_synthetic_input(model, shape)
+
+
+def count_input_samples(input_spec, num_batches, batch_size=32):
+    if is_sample_path(input_spec):
+        # mmap so counting samples doesn't read the whole file
+        return torch.load(input_spec.strip(), map_location=torch.device('cpu'), mmap=True).shape[0]
+    return parse_input_shape(input_spec)[0] * num_batches
+
+
+def output_tensors(output):
+    if isinstance(output, torch.Tensor):
+        return [output]
+    if isinstance(output, (list, tuple)):
+        return [t for item in output for t in output_tensors(item)]
+    if isinstance(output, dict):
+        return [t for item in output.values() for t in output_tensors(item)]
+    return []
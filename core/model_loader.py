@@ -1,18 +1,24 @@
+import logging
+import os
 import torch
 import torch.nn as nn
-import numpy as np
+from core.model_info import ModelInfo, LayerRecord
+from core.weight_stats import module_weight_ref
+from core.param_accounting import TOTAL_KEYS, account_model, layer_totals, iter_named_modules
+from core.checkpoint_reader import read_checkpoint, unwrap_checkpoint, flatten_tensors, tensor_header, build_layers_from_headers
+from core.instrumentation import span, count, traced
 
-class ModelInfo:
-    def __init__(self, name, layers):
-        self.name = name
-        self.layers = layers
+logger = logging.getLogger(__name__)
 
-def count_params(module):
-    return sum(p.numel() for p in module.parameters() if p.requires_grad)
+PYTORCH_EXTENSIONS = (".pt", ".pth")
 
-def get_module_info(name, module):
+class LoadCancelled(Exception):
+    pass
+
+def get_module_info(name, module, totals=None):
     try:
-        shape = list(module.weight.shape) if hasattr(module, 'weight') else None
+        has_weight = isinstance(getattr(module, 'weight', None), torch.Tensor)
+        shape = tuple(module.weight.shape) if has_weight else None
 
         activation = None
         if isinstance(module, nn.ReLU):
@@ -24,45 +30,122 @@ def get_module_info(name, module):
         elif isinstance(module, nn.Softmax):
             activation = "Softmax"
 
-        weight_stats = None
-        if hasattr(module, 'weight'):
-            weights = module.weight.detach().numpy()
-            weight_stats = {
-                "mean": np.mean(weights),
-                "std": np.std(weights),
-                "min": np.min(weights),
-                "max": np.max(weights),
-            }
-
-        params = count_params(module)
-
-        return {
-            "name": name,
-            "type": type(module).__name__,
-            "shape": shape,
-            "activation": activation,
-            "weight_stats": weight_stats,
-            "params": params
-        }
+        # Stats are computed on demand through core.weight_stats.get_weight_stats
+        weight_ref = module_weight_ref(module) if has_weight else None
+
+        # Loaders pass precomputed subtree totals; a standalone call accounts just this module
+        if totals is None:
+            totals = account_model(module)[1]
+
+        return LayerRecord(
+            name,
+            type(module).__name__,
+            shape=shape,
+            dtype=str(module.weight.dtype).replace("torch.", "") if has_weight else None,
+            activation=activation,
+            weight_ref=weight_ref,
+            **layer_totals(totals),
+        )
     except Exception as e:
-        print(f"Error in getting module info: {e}")
-        return {}
+        # One odd module shouldn't sink the whole load; keep a placeholder so the hierarchy stays intact
+        logger.warning("Could not describe module %r (%s): %s", name, type(module).__name__, e)
+        count("get_module_info.errors")
+        return LayerRecord(
+            name,
+            type(module).__name__,
+            error=str(e),
+            **layer_totals(totals if totals is not None else dict.fromkeys(TOTAL_KEYS, 0)),
+        )
 
-def load_pytorch_model(model_or_path):
+def resolve_model(model_or_path):
     if isinstance(model_or_path, nn.Module):
         model = model_or_path
     else:
-        model = torch.load(model_or_path, map_location=torch.device('cpu'), weights_only=False)
+        with span("torch.load", path=str(model_or_path), mmap=False):
+            model = torch.load(model_or_path, map_location=torch.device('cpu'), weights_only=False)
         if isinstance(model, dict) and "model" in model:
             model = model["model"]
 
     if not isinstance(model, nn.Module):
         raise TypeError("Model must be an nn.Module")
 
+    return model
+
+def ensure_model(model_info):
+    if model_info.model is None:
+        if model_info.source_path is None:
+            raise ValueError(f"{model_info.name} has no loaded model to run")
+        if model_info.source_format != "pytorch":
+            raise ValueError(f"{model_info.name} was read from {model_info.source_format} metadata and cannot be run")
+        # Structure-only and cached summaries carry no module graph, so load the full model once
+        model_info.model = resolve_model(model_info.source_path)
+    return model_info.model
+
+@traced("load_pytorch_model")
+def load_pytorch_model(model_or_path, structure_only=False, cache=None, on_progress=None, should_cancel=None, batch_size=64):
+    if cache is not None and not isinstance(model_or_path, nn.Module):
+        variant = "structure" if structure_only else "full"
+        cached = cache.get(model_or_path, variant)
+        if cached is not None:
+            _collect_batches(cached.layers, lambda layer: layer, cached.name, on_progress, should_cancel, batch_size)
+            return cached
+
+        model_info = load_pytorch_model(model_or_path, structure_only, None, on_progress, should_cancel, batch_size)
+        cache.put(model_or_path, model_info, variant)
+        return model_info
+
+    source_path = None if isinstance(model_or_path, nn.Module) else os.path.abspath(model_or_path)
+
+    if source_path is not None:
+        if structure_only:
+            checkpoint = unwrap_checkpoint(read_checkpoint(model_or_path))
+        else:
+            with span("torch.load", path=str(model_or_path), mmap=False):
+                checkpoint = unwrap_checkpoint(
+                    torch.load(model_or_path, map_location=torch.device('cpu'), weights_only=False))
+        if isinstance(checkpoint, dict):
+            # Plain state_dict, the usual training output: there is no module graph to walk, so
+            # the layer list comes from the key hierarchy in either mode
+            tensors = flatten_tensors(checkpoint)
+            headers = [tensor_header(name, tensor) for name, tensor in tensors.items()]
+            layers, accounting = build_layers_from_headers(headers, tensors)
+            name = os.path.splitext(os.path.basename(model_or_path))[0]
+            modules = _collect_batches(layers, lambda layer: layer, name, on_progress, should_cancel, batch_size)
+            return ModelInfo(name, modules, source_path=source_path, accounting=accounting)
+        model_or_path = checkpoint
+
+    model = resolve_model(model_or_path)
+    with span("module_walk"):
+        named_modules = [(name, module) for name, module in iter_named_modules(model) if name != ""]
+    count("modules", len(named_modules))
+    # One pass over every tensor gives all subtree totals, instead of re-walking each module's subtree
+    with span("param_accounting"):
+        subtree, accounting = account_model(model)
+    with span("module_info", modules=len(named_modules)):
+        modules = _collect_batches(
+            named_modules, lambda item: get_module_info(*item, totals=subtree[item[0]]),
+            model.__class__.__name__, on_progress, should_cancel, batch_size
+        )
+    return ModelInfo(model.__class__.__name__, modules, model=model, source_path=source_path, accounting=accounting)
+
+def _collect_batches(items, make_info, model_name, on_progress, should_cancel, batch_size):
+    total = len(items)
     modules = []
-    for name, module in model.named_modules():
-        if name == "":
-            continue
-        modules.append(get_module_info(name, module))
+    batch = []
+    for item in items:
+        if should_cancel is not None and should_cancel():
+            raise LoadCancelled(f"Loading {model_name} cancelled")
+
+        batch.append(make_info(item))
+        if len(batch) >= batch_size:
+            modules.extend(batch)
+            if on_progress is not None:
+                on_progress(batch, len(modules), total)
+            batch = []
+
+    if batch:
+        modules.extend(batch)
+        if on_progress is not None:
+            on_progress(batch, len(modules), total)
 
-    return ModelInfo(model.__class__.__name__, modules)
+    return modules
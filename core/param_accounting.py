@@ -0,0 +1,109 @@
+TOTAL_KEYS = ("params", "trainable_params", "param_bytes", "buffers", "buffer_bytes")
+
+
+def dtype_name(dtype):
+    return str(dtype).replace("torch.", "")
+
+
+def storage_key(tensor):
+    # Tied weights and views share a storage; meta tensors have none, so fall back to identity
+    try:
+        ptr = tensor.untyped_storage().data_ptr()
+    except (RuntimeError, NotImplementedError):
+        ptr = 0
+    if ptr == 0:
+        return ("id", id(tensor))
+    return (ptr, tensor.storage_offset(), tuple(tensor.shape), tuple(tensor.stride()))
+
+
+def iter_named_modules(model):
+    # Same order and de-duplication as nn.Module.named_modules(), which recurses once per
+    # nesting level and overflows the stack on very deep models
+    seen = set()
+    stack = [("", model)]
+    while stack:
+        name, module = stack.pop()
+        if id(module) in seen:
+            continue
+        seen.add(id(module))
+        yield name, module
+        children = [(f"{name}.{child_name}" if name else child_name, child) for child_name, child in module.named_children()]
+        stack.extend(reversed(children))
+
+
+def _empty_totals():
+    totals = dict.fromkeys(TOTAL_KEYS, 0)
+    totals["bytes_by_dtype"] = {}
+    return totals
+
+
+def account_tensors(module_names, entries):
+    # module_names must list parents before children and include "" for the root.
+    # entries are (module_name, key, numel, nbytes, dtype, is_buffer, trainable); a tensor
+    # reachable from several modules is counted once, under the first module that holds it
+    subtree = {name: _empty_totals() for name in module_names}
+    seen = set()
+    shared_tensors = 0
+    shared_params = 0
+
+    for module_name, key, numel, nbytes, dtype, is_buffer, trainable in entries:
+        if key in seen:
+            shared_tensors += 1
+            if not is_buffer:
+                shared_params += numel
+            continue
+        seen.add(key)
+
+        totals = subtree[module_name]
+        if is_buffer:
+            totals["buffers"] += 1
+            totals["buffer_bytes"] += nbytes
+        else:
+            totals["params"] += numel
+            totals["param_bytes"] += nbytes
+            if trainable:
+                totals["trainable_params"] += numel
+        totals["bytes_by_dtype"][dtype] = totals["bytes_by_dtype"].get(dtype, 0) + nbytes
+
+    # Reversed preorder visits every module after all of its descendants
+    for name in reversed(module_names):
+        if not name:
+            continue
+        child = subtree[name]
+        parent = subtree[name.rpartition(".")[0]]
+        for key in TOTAL_KEYS:
+            parent[key] += child[key]
+        by_dtype = parent["bytes_by_dtype"]
+        for dtype, nbytes in child["bytes_by_dtype"].items():
+            by_dtype[dtype] = by_dtype.get(dtype, 0) + nbytes
+
+    summary = dict(subtree[""])
+    summary["frozen_params"] = summary["params"] - summary["trainable_params"]
+    summary["shared_tensors"] = shared_tensors
+    summary["shared_params"] = shared_params
+    return subtree, summary
+
+
+def account_model(model):
+    module_names = []
+    entries = []
+    for name, module in iter_named_modules(model):
+        module_names.append(name)
+        for tensor in module.parameters(recurse=False):
+            nbytes = tensor.numel() * tensor.element_size()
+            entries.append((name, storage_key(tensor), tensor.numel(), nbytes, dtype_name(tensor.dtype),
+                            False, tensor.requires_grad))
+        for tensor in module.buffers(recurse=False):
+            nbytes = tensor.numel() * tensor.element_size()
+            entries.append((name, storage_key(tensor), tensor.numel(), nbytes, dtype_name(tensor.dtype),
+                            True, False))
+    return account_tensors(module_names, entries)
+
+
+def layer_totals(totals):
+    return {
+        "params": totals["params"],
+        "trainable_params": totals["trainable_params"],
+        "param_bytes": totals["param_bytes"],
+        "buffer_bytes": totals["buffer_bytes"],
+    }
@@ -0,0 +1,74 @@
+import time
+import torch
+from core.model_loader import ensure_model
+from core.model_inputs import make_input, output_tensors
+
+
+def profile_model(model, example_input, warmup=2, repeats=10, should_cancel=None):
+    timings = {}
+    starts = {}
+    outputs = {}
+    recording = [False]
+    handles = []
+
+    def pre_hook(name):
+        def hook(module, inputs):
+            starts.setdefault(name, []).append(time.perf_counter())
+        return hook
+
+    def post_hook(name):
+        def hook(module, inputs, output):
+            elapsed = time.perf_counter() - starts[name].pop()
+            if not recording[0]:
+                return
+            timings[name] = timings.get(name, 0.0) + elapsed
+            if name not in outputs:
+                tensors = output_tensors(output)
+                outputs[name] = (
+                    list(tensors[0].shape) if tensors else None,
+                    sum(t.numel() * t.element_size() for t in tensors),
+                )
+        return hook
+
+    for name, module in model.named_modules():
+        if name == "":
+            continue
+        handles.append(module.register_forward_pre_hook(pre_hook(name)))
+        handles.append(module.register_forward_hook(post_hook(name)))
+
+    was_training = model.training
+    model.eval()
+    try:
+        with torch.no_grad():
+            for _ in range(warmup):
+                model(example_input)
+
+            recording[0] = True
+            completed = 0
+            for _ in range(repeats):
+                if should_cancel is not None and should_cancel():
+                    break
+                model(example_input)
+                completed += 1
+    finally:
+        for handle in handles:
+            handle.remove()
+        model.train(was_training)
+
+    results = {}
+    if completed == 0:
+        return results
+    for name, total in timings.items():
+        output_shape, activation_bytes = outputs.get(name, (None, 0))
+        results[name] = {
+            "latency_ms": total / completed * 1000.0,
+            "output_shape": output_shape,
+            "activation_bytes": activation_bytes,
+        }
+    return results
+
+
+def run_profile(model_info, input_spec, warmup=2, repeats=10, should_cancel=None):
+    model = ensure_model(model_info)
+    example_input = make_input(model, input_spec)
+    return profile_model(model, example_input, warmup=warmup, repeats=repeats, should_cancel=should_cancel)
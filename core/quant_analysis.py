@@ -0,0 +1,163 @@
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import torch
+from core.weight_stats import STATS_CHUNK_SIZE
+from core.instrumentation import traced
+
+HIST_BINS = 64
+OUTLIER_SIGMAS = 3.0
+INT8_MAX = 127
+FP8_DTYPE = getattr(torch, "float8_e4m3fn", None)
+FP8_MAX = 448.0
+# Finished layers are reported at most this often, so huge models don't flood the GUI thread
+PROGRESS_INTERVAL = 0.2
+# Bump when the result fields change so stale cached analyses are not reused
+CACHE_VARIANT = "quant-v1"
+
+
+def _quantize_int8(chunk, scale):
+    return (chunk / scale).round_().clamp_(-INT8_MAX, INT8_MAX).mul_(scale)
+
+
+def _squared_error(chunk, approx):
+    diff = chunk - approx
+    return float(torch.dot(diff.reshape(-1).double(), diff.reshape(-1).double()))
+
+
+def analyze_weight(tensor, bins=HIST_BINS, chunk_size=STATS_CHUNK_SIZE):
+    # Rows are output channels. Two passes over row chunks: the first finds the ranges that
+    # the histogram and the quantization scales need, the second measures against them
+    weight = tensor.detach()
+    if not weight.is_floating_point() or weight.numel() == 0:
+        return None
+    rows = weight.reshape(weight.shape[0], -1) if weight.dim() > 1 else weight.reshape(1, -1)
+    step = max(1, chunk_size // rows.shape[1])
+    numel = rows.numel()
+
+    channel_absmax = []
+    lo, hi = math.inf, -math.inf
+    total = 0.0
+    total_sq = 0.0
+    with torch.no_grad():
+        for start in range(0, rows.shape[0], step):
+            chunk = rows[start:start + step].float()
+            channel_absmax.append(chunk.abs().amax(dim=1))
+            chunk_min, chunk_max = torch.aminmax(chunk)
+            lo = min(lo, chunk_min.item())
+            hi = max(hi, chunk_max.item())
+            total += float(chunk.sum(dtype=torch.float64))
+            total_sq += float(torch.dot(chunk.reshape(-1).double(), chunk.reshape(-1).double()))
+
+        channel_absmax = torch.cat(channel_absmax)
+        absmax = channel_absmax.max().item()
+        mean = total / numel
+        std = math.sqrt(max(total_sq / numel - mean * mean, 0.0))
+
+        histogram = torch.zeros(bins, dtype=torch.float64)
+        outliers = 0
+        errors = {"int8_tensor": 0.0, "int8_channel": 0.0, "fp8": 0.0}
+        tensor_scale = max(absmax, 1e-12) / INT8_MAX
+        fp8_scale = max(absmax, 1e-12) / FP8_MAX
+        for start in range(0, rows.shape[0], step):
+            chunk = rows[start:start + step].float()
+            histogram += torch.histc(chunk, bins=bins, min=lo, max=hi if hi > lo else lo + 1).double()
+            outliers += int(((chunk - mean).abs() > OUTLIER_SIGMAS * std).sum())
+
+            errors["int8_tensor"] += _squared_error(chunk, _quantize_int8(chunk.clone(), tensor_scale))
+            channel_scale = channel_absmax[start:start + step].clamp(min=1e-12).div(INT8_MAX).unsqueeze(1)
+            errors["int8_channel"] += _squared_error(chunk, _quantize_int8(chunk.clone(), channel_scale))
+            if FP8_DTYPE is not None:
+                errors["fp8"] += _squared_error(chunk, (chunk / fp8_scale).to(FP8_DTYPE).float() * fp8_scale)
+
+    median_absmax = channel_absmax.median().item()
+    # Quantization noise relative to signal power; 0 means the format is lossless here
+    signal = total_sq if total_sq > 0 else 1.0
+    return {
+        "histogram": histogram.long().tolist(),
+        "hist_min": lo,
+        "hist_max": hi,
+        "mean": mean,
+        "std": std,
+        "channels": rows.shape[0],
+        "channel_absmax_min": channel_absmax.min().item(),
+        "channel_absmax_median": median_absmax,
+        "channel_absmax_max": absmax,
+        # Far above 1 means one channel sets the per-tensor scale and starves the others
+        "channel_range_ratio": absmax / median_absmax if median_absmax > 0 else None,
+        "outlier_ratio": outliers / numel,
+        "int8_tensor_error": errors["int8_tensor"] / signal,
+        "int8_channel_error": errors["int8_channel"] / signal,
+        "fp8_error": errors["fp8"] / signal if FP8_DTYPE is not None else None,
+    }
+
+
+def error_to_sqnr_db(error):
+    if error is None:
+        return None
+    return math.inf if error <= 0 else -10 * math.log10(error)
+
+
+@traced("quant.analyze_layer")
+def _analyze_layer(layer):
+    return analyze_weight(layer.weight_ref.tensor())
+
+
+def _default_cache():
+    from core.summary_cache import default_cache
+    return default_cache()
+
+
+def run_quant_analysis(model_info, workers=None, cache=None, should_cancel=None, on_progress=None):
+    # on_progress gets lists of (layer name, result) as layers finish, so views can fill in
+    # incrementally; results land on each layer record as .quant
+    cache_path = model_info.source_path
+    if cache is None and cache_path is not None:
+        cache = _default_cache()
+
+    results = {}
+    if cache is not None and cache_path is not None:
+        results = cache.get_json(cache_path, CACHE_VARIANT) or {}
+
+    pending = []
+    ready = []
+    for layer in model_info.layers:
+        if layer.name in results:
+            layer.quant = results[layer.name]
+            ready.append((layer.name, layer.quant))
+        elif layer.quant is not None:
+            results[layer.name] = layer.quant
+            ready.append((layer.name, layer.quant))
+        elif layer.weight_ref is not None:
+            pending.append(layer)
+    if ready and on_progress is not None:
+        on_progress(ready)
+
+    workers = workers or min(8, os.cpu_count() or 1)
+    completed = True
+    batch = []
+    last_report = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_analyze_layer, layer): layer for layer in pending}
+        for future in as_completed(futures):
+            if should_cancel is not None and should_cancel():
+                completed = False
+                for other in futures:
+                    other.cancel()
+                break
+            layer = futures[future]
+            result = future.result()
+            layer.quant = result
+            results[layer.name] = result
+            batch.append((layer.name, result))
+            if on_progress is not None and time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                on_progress(batch)
+                batch = []
+                last_report = time.monotonic()
+    if batch and on_progress is not None:
+        on_progress(batch)
+
+    if completed and pending and cache is not None and cache_path is not None:
+        cache.put_json(cache_path, results, CACHE_VARIANT)
+    return results
@@ -0,0 +1,261 @@
+import gc
+import hashlib
+import json
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+import numpy as np
+from core.model_info import ModelInfo, DataflowGraph
+from core.layer_index import LayerIndex
+from core.layer_search import LayerSearchIndex
+from core.summary_cache import pack_layers, unpack_layers, _pack_strings, _unpack_strings
+from core.weight_stats import peek_weight_stats
+from core.instrumentation import traced
+
+# A session is a directory: a manifest, the packed layer table, and one file per section of
+# results, each replaced atomically so a save interrupted halfway leaves the last good copy
+SESSION_VERSION = 1
+SESSION_SUFFIX = ".dlsession"
+MANIFEST_FILE = "manifest.json"
+LAYERS_FILE = "layers.npz"
+SEARCH_KINDS = ("tokens", "activations", "dims", "shapes")
+# Per-layer results, keyed by layer name; each matches a LayerRecord attribute
+RESULT_SECTIONS = ("weight_stats", "profile", "activation_stats", "diff", "quant")
+SECTIONS = RESULT_SECTIONS + ("dataflow", "ui")
+
+
+class SessionError(ValueError):
+    pass
+
+
+class Session:
+    def __init__(self, path, model_info, layer_index, search_index, ui_state):
+        self.path = path
+        self.model_info = model_info
+        self.layer_index = layer_index
+        self.search_index = search_index
+        self.ui_state = ui_state
+
+
+def _section_file(section):
+    return f"{section}.json"
+
+
+def _write_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _encode_results(model_info, section):
+    if section == "weight_stats":
+        values = {layer.name: peek_weight_stats(layer) for layer in model_info.layers}
+    else:
+        values = {layer.name: getattr(layer, section) for layer in model_info.layers}
+    return {name: value for name, value in values.items() if value is not None}
+
+
+def _encode_dataflow(model_info):
+    return {
+        spec: {"method": graph.method, "nodes": graph.nodes, "inputs": graph.inputs, "layout": layout}
+        for spec, (graph, layout) in model_info.dataflow.items()
+    }
+
+
+def _decode_dataflow(entries):
+    dataflow = {}
+    for spec, entry in entries.items():
+        graph = DataflowGraph(entry["method"])
+        graph.nodes = entry["nodes"]
+        graph.inputs = entry["inputs"]
+        dataflow[spec] = (graph, entry["layout"])
+    return dataflow
+
+
+def _column(values):
+    return np.frombuffer(values, dtype=np.dtype(values.typecode))
+
+
+def _array(typecode, values):
+    result = array(typecode)
+    result.frombytes(values.astype(np.dtype(typecode), copy=False).tobytes())
+    return result
+
+
+def _pack_index(layers):
+    # The layer table is followed by the LayerIndex columns and the search postings, so a
+    # restore reads them back instead of re-running extend() and re-tokenizing every name
+    layer_index = LayerIndex(layers)
+    search_index = LayerSearchIndex(layer_index)
+    names, types, columns = layer_index.export_state()
+    positions = {id(layer): i for i, layer in enumerate(layers)}
+
+    arrays = {f"index_{name}": _column(values) for name, values in columns.items()}
+    arrays["index_names_blob"], arrays["index_names_offsets"] = _pack_strings(names)
+    arrays["index_types_blob"], arrays["index_types_offsets"] = _pack_strings(types)
+    arrays["index_layers"] = np.array([positions[id(layer)] if layer is not None else -1
+                                       for layer in layer_index.layers], dtype=np.int64)
+
+    postings, state = search_index.export_state()
+    arrays["search_state"] = np.frombuffer(state, dtype=np.uint8)
+    for kind in SEARCH_KINDS:
+        keys = list(postings[kind])
+        if kind == "dims":
+            arrays["search_dims_keys"] = np.array(keys, dtype=np.int64)
+        else:
+            arrays[f"search_{kind}_blob"], arrays[f"search_{kind}_key_offsets"] = _pack_strings(keys)
+        lengths = np.array([len(postings[kind][key]) for key in keys], dtype=np.int64)
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        arrays[f"search_{kind}_offsets"] = offsets
+        arrays[f"search_{kind}_nodes"] = np.concatenate(
+            [_column(postings[kind][key]) for key in keys] or [np.empty(0, dtype=np.intc)])
+    return arrays
+
+
+def _unpack_index(arrays, layers):
+    # An empty index supplies each column's array typecode
+    _, _, empty = LayerIndex().export_state()
+    columns = {name: _array(values.typecode, arrays[f"index_{name}"]) for name, values in empty.items()}
+    names = _unpack_strings(arrays["index_names_blob"], arrays["index_names_offsets"])
+    types = _unpack_strings(arrays["index_types_blob"], arrays["index_types_offsets"])
+    node_layers = [layers[i] if i >= 0 else None for i in arrays["index_layers"].tolist()]
+    layer_index = LayerIndex.from_state(names, types, columns, node_layers)
+
+    postings = {}
+    for kind in SEARCH_KINDS:
+        if kind == "dims":
+            keys = arrays["search_dims_keys"].tolist()
+        else:
+            keys = _unpack_strings(arrays[f"search_{kind}_blob"], arrays[f"search_{kind}_key_offsets"])
+        offsets = arrays[f"search_{kind}_offsets"].tolist()
+        nodes = _array("i", arrays[f"search_{kind}_nodes"])
+        postings[kind] = {key: nodes[offsets[i]:offsets[i + 1]] for i, key in enumerate(keys)}
+    state = bytearray(arrays["search_state"].tobytes())
+    return layer_index, LayerSearchIndex.from_state(layer_index, postings, state)
+
+
+class SessionWriter:
+    # Writes a session directory incrementally. The layer table goes out once per model; after
+    # that each write() re-encodes only the sections it is given and skips files whose content
+    # has not changed. Meant to run on a worker thread, one write at a time. Pass the model_info
+    # a session was restored into to keep saving to it without rewriting what is on disk
+    def __init__(self, path, model_info=None):
+        self.path = path
+        self._model_info = model_info
+        self._digests = {}
+        self._lock = threading.Lock()
+        if model_info is not None:
+            for section in SECTIONS:
+                try:
+                    with open(os.path.join(path, _section_file(section)), "rb") as f:
+                        self._digests[section] = hashlib.sha1(f.read()).hexdigest()
+                except FileNotFoundError:
+                    pass
+
+    @traced("session.write")
+    def write(self, model_info, sections=SECTIONS, ui_state=None):
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            written = []
+            if model_info is not self._model_info:
+                # A different model invalidates every section written for the previous one
+                self._write_layers(model_info)
+                self._model_info = model_info
+                self._digests = {}
+                sections = SECTIONS
+                written.append("layers")
+
+            for section in sections:
+                if section == "ui":
+                    if ui_state is None:
+                        continue
+                    value = ui_state
+                elif section == "dataflow":
+                    value = _encode_dataflow(model_info)
+                else:
+                    value = _encode_results(model_info, section)
+                data = json.dumps(value).encode()
+                digest = hashlib.sha1(data).hexdigest()
+                if self._digests.get(section) == digest:
+                    continue
+                _write_atomic(os.path.join(self.path, _section_file(section)), data)
+                self._digests[section] = digest
+                written.append(section)
+
+            if written:
+                self._write_manifest(model_info)
+            return written
+
+    def _write_layers(self, model_info):
+        tmp_path = os.path.join(self.path, LAYERS_FILE + ".tmp")
+        with open(tmp_path, "wb") as f:
+            # Uncompressed, since restoring fast matters more here than the file size
+            np.savez(f, **pack_layers(model_info.layers), **_pack_index(model_info.layers))
+        os.replace(tmp_path, os.path.join(self.path, LAYERS_FILE))
+
+    def _write_manifest(self, model_info):
+        manifest = {
+            "version": SESSION_VERSION,
+            "saved_at": time.time(),
+            "name": model_info.name,
+            "source_path": model_info.source_path,
+            "source_format": model_info.source_format,
+            "accounting": model_info.accounting,
+            "num_layers": len(model_info.layers),
+            "sections": sorted(self._digests),
+        }
+        _write_atomic(os.path.join(self.path, MANIFEST_FILE), json.dumps(manifest, indent=2).encode())
+
+
+@contextmanager
+def _gc_paused():
+    # Restoring allocates a few objects per layer and none of them form cycles, yet each batch
+    # of allocations sets off a collection that walks everything built so far
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _read_json(path):
+    with open(path, "rb") as f:
+        return json.loads(f.read())
+
+
+@traced("session.load")
+def load_session(path):
+    # Rebuilds the model description, analysis results and indexes from the files alone; torch
+    # is only needed later, if an analysis has to run the model again
+    try:
+        manifest = _read_json(os.path.join(path, MANIFEST_FILE))
+    except (OSError, ValueError) as e:
+        raise SessionError(f"Not a session directory: {path} ({e})")
+    if manifest.get("version") != SESSION_VERSION:
+        raise SessionError(f"Unsupported session version: {manifest.get('version')}")
+
+    source_path = manifest["source_path"]
+    # Weights stay reachable by reference only while the checkpoint is still where it was
+    weights_path = source_path if source_path is not None and os.path.exists(source_path) else None
+    with _gc_paused(), np.load(os.path.join(path, LAYERS_FILE)) as arrays:
+        layers = unpack_layers(arrays, source_path=weights_path, source_format=manifest["source_format"])
+        layer_index, search_index = _unpack_index(arrays, layers)
+    model_info = ModelInfo(manifest["name"], layers, source_path=source_path, accounting=manifest["accounting"],
+                           source_format=manifest["source_format"])
+
+    with _gc_paused():
+        sections = {section: _read_json(os.path.join(path, _section_file(section)))
+                    for section in manifest["sections"]}
+    for section in RESULT_SECTIONS:
+        for name, value in sections.get(section, {}).items():
+            node = layer_index.lookup(name)
+            if node is not None and layer_index.layers[node] is not None:
+                setattr(layer_index.layers[node], section, value)
+    model_info.dataflow = _decode_dataflow(sections.get("dataflow", {}))
+    return Session(path, model_info, layer_index, search_index, sections.get("ui", {}))
@@ -0,0 +1,275 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+import numpy as np
+from core.model_info import ModelInfo, LayerRecord
+from core.weight_stats import WeightRef
+from core.instrumentation import traced
+
+HASH_SAMPLE_BYTES = 1 << 20
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+STAT_KEYS = ("mean", "std", "min", "max")
+TOTAL_KEYS = ("params", "trainable_params", "param_bytes", "buffer_bytes")
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "deeplens", "summaries")
+
+
+def checkpoint_fingerprint(path, variant=""):
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+
+    digest = hashlib.sha1()
+    digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0{variant}\0".encode())
+
+    # Hashing head and tail keeps fingerprinting O(1) for multi-GB checkpoints
+    with open(path, "rb") as f:
+        digest.update(f.read(HASH_SAMPLE_BYTES))
+        if stat.st_size > 2 * HASH_SAMPLE_BYTES:
+            f.seek(-HASH_SAMPLE_BYTES, os.SEEK_END)
+            digest.update(f.read(HASH_SAMPLE_BYTES))
+
+    return digest.hexdigest()
+
+
+def _pack_strings(values):
+    encoded = [v.encode() for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(v) for v in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob, offsets):
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+
+
+def _intern(values):
+    table = {}
+    codes = np.array([table.setdefault(v, len(table)) if v is not None else -1 for v in values], dtype=np.int32)
+    return list(table), codes
+
+
+def _checkpoint_weight_ref(path, tensor_name, source_format="pytorch"):
+    def resolve():
+        if source_format != "pytorch":
+            # Other formats name and locate their tensors their own way
+            from core.model_formats import open_weight_resolvers
+            return open_weight_resolvers(path, source_format)[tensor_name]()
+        from core.checkpoint_reader import open_checkpoint_tensors
+        return open_checkpoint_tensors(path)[tensor_name]
+    return WeightRef(resolve)
+
+
+def pack_layers(layers):
+    shapes = [layer.shape for layer in layers]
+    shape_lengths = np.array([len(s) if s is not None else -1 for s in shapes], dtype=np.int64)
+    shape_dims = np.array([d for s in shapes if s is not None for d in s], dtype=np.int64)
+
+    stats = np.full((len(layers), len(STAT_KEYS)), np.nan, dtype=np.float64)
+    for i, layer in enumerate(layers):
+        if layer.weight_stats:
+            stats[i] = [layer.weight_stats[k] for k in STAT_KEYS]
+
+    name_blob, name_offsets = _pack_strings([layer.name for layer in layers])
+    type_table, type_codes = _intern([layer.type for layer in layers])
+    dtype_table, dtype_codes = _intern([layer.dtype for layer in layers])
+    activation_table, activation_codes = _intern([layer.activation for layer in layers])
+    tables_blob, tables_offsets = _pack_strings(type_table + dtype_table + activation_table)
+
+    return {
+        "name_blob": name_blob,
+        "name_offsets": name_offsets,
+        "tables_blob": tables_blob,
+        "tables_offsets": tables_offsets,
+        "table_sizes": np.array([len(type_table), len(dtype_table), len(activation_table)], dtype=np.int64),
+        "type_codes": type_codes,
+        "dtype_codes": dtype_codes,
+        "activation_codes": activation_codes,
+        "shape_lengths": shape_lengths,
+        "shape_dims": shape_dims,
+        "totals": np.array([[getattr(layer, k) for k in TOTAL_KEYS] for layer in layers], dtype=np.int64).reshape(-1, len(TOTAL_KEYS)),
+        "has_weight": np.array([layer.weight_ref is not None or layer.weight_stats is not None
+                                for layer in layers], dtype=bool),
+        "weight_stats": stats,
+    }
+
+
+def unpack_layers(arrays, source_path=None, source_format="pytorch"):
+    names = _unpack_strings(arrays["name_blob"], arrays["name_offsets"])
+    tables = _unpack_strings(arrays["tables_blob"], arrays["tables_offsets"])
+    n_types, n_dtypes, _ = arrays["table_sizes"]
+    # A trailing None makes code -1 (no value) an ordinary index
+    type_table = tables[:n_types] + [None]
+    dtype_table = tables[n_types:n_types + n_dtypes] + [None]
+    activation_table = tables[n_types + n_dtypes:] + [None]
+
+    # Columns become lists up front; indexing numpy arrays element by element is far slower
+    shape_dims = arrays["shape_dims"].tolist()
+    shape_lengths = arrays["shape_lengths"].tolist()
+    totals = arrays["totals"].tolist()
+    stats = arrays["weight_stats"]
+    has_stats = (~np.isnan(stats[:, 0])).tolist()
+    stats = stats.tolist()
+    has_weight = arrays["has_weight"].tolist()
+    types = [type_table[code] for code in arrays["type_codes"].tolist()]
+    dtypes = [dtype_table[code] for code in arrays["dtype_codes"].tolist()]
+    activations = [activation_table[code] for code in arrays["activation_codes"].tolist()]
+    layers = []
+    cursor = 0
+    for i, name in enumerate(names):
+        length = shape_lengths[i]
+        shape = None
+        if length >= 0:
+            shape = shape_dims[cursor:cursor + length]
+            cursor += length
+
+        weight_stats = dict(zip(STAT_KEYS, stats[i])) if has_stats[i] else None
+
+        weight_ref = None
+        if has_weight[i] and source_path is not None:
+            weight_ref = _checkpoint_weight_ref(source_path, f"{name}.weight", source_format)
+
+        # TOTAL_KEYS follow the same order as LayerRecord's trailing arguments
+        layers.append(LayerRecord(name, types[i], shape, dtypes[i], activations[i], weight_stats, weight_ref,
+                                  *totals[i]))
+    return layers
+
+
+class SummaryCache:
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, path TEXT, model_name TEXT, nbytes INTEGER, last_access REAL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # A connection's own context manager only commits or rolls back; closing() releases the
+        # file handle too, which matters for the batch CLI and analyses that hit the cache in loops
+        with closing(sqlite3.connect(os.path.join(self.root, "index.sqlite"), timeout=30)) as db, db:
+            yield db
+
+    def _entry_file(self, key):
+        return os.path.join(self.root, f"{key}.npz")
+
+    @traced("summary_cache.get")
+    def get(self, path, variant=""):
+        try:
+            key = checkpoint_fingerprint(path, variant)
+        except OSError:
+            return None
+
+        with self._lock, self._connect() as db:
+            row = db.execute("SELECT model_name FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                with np.load(self._entry_file(key)) as arrays:
+                    layers = unpack_layers(arrays, source_path=os.path.abspath(path))
+                    accounting = json.loads(arrays["accounting"].tobytes())
+            except (OSError, ValueError, KeyError):
+                # Also drops entries written before a column was added
+                self._remove(db, key)
+                return None
+            db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+
+        return ModelInfo(row[0], layers, source_path=os.path.abspath(path), accounting=accounting)
+
+    @traced("summary_cache.put")
+    def put(self, path, model_info, variant=""):
+        accounting = np.frombuffer(json.dumps(model_info.accounting).encode(), dtype=np.uint8)
+        self._put_arrays(path, model_info.name, variant, accounting=accounting, **pack_layers(model_info.layers))
+
+    def get_json(self, path, variant):
+        # Per-checkpoint analysis results share the summary entries' fingerprinting and eviction
+        try:
+            key = checkpoint_fingerprint(path, variant)
+        except OSError:
+            return None
+
+        with self._lock, self._connect() as db:
+            if db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is None:
+                return None
+            try:
+                with np.load(self._entry_file(key)) as arrays:
+                    value = json.loads(arrays["json"].tobytes())
+            except (OSError, ValueError, KeyError):
+                self._remove(db, key)
+                return None
+            db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return value
+
+    def put_json(self, path, value, variant):
+        self._put_arrays(path, "", variant, json=np.frombuffer(json.dumps(value).encode(), dtype=np.uint8))
+
+    def _put_arrays(self, path, model_name, variant, **arrays):
+        key = checkpoint_fingerprint(path, variant)
+
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        data = buffer.getvalue()
+
+        with self._lock, self._connect() as db:
+            tmp_file = self._entry_file(key) + ".tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(data)
+            os.replace(tmp_file, self._entry_file(key))
+
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, path, model_name, nbytes, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, os.path.abspath(path), model_name, len(data), time.time()),
+            )
+            self._evict(db)
+
+    def invalidate(self, path=None):
+        with self._lock, self._connect() as db:
+            if path is None:
+                rows = db.execute("SELECT key FROM entries").fetchall()
+            else:
+                rows = db.execute("SELECT key FROM entries WHERE path = ?", (os.path.abspath(path),)).fetchall()
+            for (key,) in rows:
+                self._remove(db, key)
+
+    def total_bytes(self):
+        with self._connect() as db:
+            return db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, nbytes in db.execute("SELECT key, nbytes FROM entries ORDER BY last_access").fetchall():
+            self._remove(db, key)
+            total -= nbytes
+            if total <= self.max_bytes:
+                break
+
+    def _remove(self, db, key):
+        db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.remove(self._entry_file(key))
+        except FileNotFoundError:
+            pass
+
+
+_default_cache = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SummaryCache()
+    return _default_cache
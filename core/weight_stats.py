@@ -0,0 +1,135 @@
+import itertools
+import threading
+from collections import OrderedDict
+from core.instrumentation import instrumentation
+
+STATS_CHUNK_SIZE = 1 << 22
+
+_ref_ids = itertools.count()
+
+
+class WeightRef:
+    def __init__(self, resolve):
+        self.key = next(_ref_ids)
+        self._resolve = resolve
+
+    def tensor(self):
+        return self._resolve()
+
+
+def module_weight_ref(module):
+    return WeightRef(lambda: module.weight)
+
+
+class WeightStatsCache:
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped whenever stats are computed, so savers can tell when there is something new
+        self.version = 0
+
+    def get(self, ref):
+        with self._lock:
+            stats = self._entries.get(ref.key)
+            if stats is not None:
+                self._entries.move_to_end(ref.key)
+                return stats
+
+        stats = compute_weight_stats(ref.tensor())
+
+        with self._lock:
+            self._entries[ref.key] = stats
+            self.version += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return stats
+
+    def peek(self, ref):
+        # Stats computed earlier, without computing missing ones
+        with self._lock:
+            return self._entries.get(ref.key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = WeightStatsCache()
+
+
+def merge_moments(count, mean, m2, n, batch_mean, batch_var):
+    # Chan et al. parallel update of a running mean / sum of squared deviations
+    delta = batch_mean - mean
+    total = count + n
+    mean += delta * n / total
+    m2 += batch_var * n + delta * delta * count * n / total
+    return total, mean, m2
+
+
+def compute_weight_stats(tensor, chunk_size=STATS_CHUNK_SIZE):
+    flat = tensor.detach().reshape(-1)
+    if flat.numel() == 0:
+        return None
+    instrumentation.count("weight_stats.computed")
+    with instrumentation.span("weight_stats", numel=flat.numel()):
+        return _chunked_stats(flat, chunk_size)
+
+
+def _chunked_stats(flat, chunk_size):
+    # Imported here so summaries restored from the on-disk cache never pull in torch
+    import torch
+
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    lo = float("inf")
+    hi = float("-inf")
+
+    # One pass over the weights: per-chunk mean/var merged with Chan's formula, min/max alongside
+    with torch.no_grad():
+        for start in range(0, flat.numel(), chunk_size):
+            chunk = flat[start:start + chunk_size]
+            if chunk.dtype != torch.float64:
+                chunk = chunk.float()
+
+            n = chunk.numel()
+            chunk_var, chunk_mean = torch.var_mean(chunk, unbiased=False)
+            chunk_min, chunk_max = torch.aminmax(chunk)
+
+            count, mean, m2 = merge_moments(count, mean, m2, n, chunk_mean.item(), chunk_var.item())
+
+            lo = min(lo, chunk_min.item())
+            hi = max(hi, chunk_max.item())
+
+    return {
+        "mean": mean,
+        "std": (m2 / count) ** 0.5,
+        "min": lo,
+        "max": hi,
+    }
+
+
+def get_weight_stats(layer):
+    stats = layer.weight_stats
+    if stats is not None:
+        return stats
+
+    ref = layer.weight_ref
+    if ref is None:
+        return None
+    return _cache.get(ref)
+
+
+def peek_weight_stats(layer):
+    if layer.weight_stats is not None:
+        return layer.weight_stats
+    return _cache.peek(layer.weight_ref) if layer.weight_ref is not None else None
+
+
+def weight_stats_version():
+    return _cache.version
+
+
+def clear_weight_stats_cache():
+    _cache.clear()
@@ -3,13 +3,15 @@ import os
 from PyQt5.QtWidgets import QApplication
 from ui.main_window import MainWindow
 
-# Auto-generate project diagram
-from project_flow.generate_flowchart import generate_project_diagram
-
 
 def main():
-    current_dir = os.path.abspath(os.path.dirname(__file__))
-    generate_project_diagram(current_dir, output_filename="docs/images/project_structure")
+    if "--diagram" in sys.argv:
+        # Rendering shells out to graphviz, so it only happens when asked for and the tree has changed
+        from project_flow.generate_flowchart import generate_project_diagram
+        current_dir = os.path.abspath(os.path.dirname(__file__))
+        generate_project_diagram(current_dir, output_filename=os.path.join(current_dir, "docs", "images", "project_structure"),
+                                 force="--force" in sys.argv)
+        return
 
     app = QApplication(sys.argv)
     window = MainWindow()
@@ -1,13 +1,62 @@
+import hashlib
 import os
-from graphviz import Digraph
+import sys
 
-def generate_project_diagram(project_root, output_filename="docs/images/project_structure"):
+RELEVANT_EXTENSIONS = ('.py', '.yaml', '.yml')
+
+
+def scan_project(project_root):
+    # A single pruned walk replaces rescanning every subtree per folder; each folder holding
+    # relevant files marks its ancestors. The stamp hashes every relevant file's relative path
+    # and mtime, so renames, moves and swapping in an older file change it as well as edits
+    project_root = os.path.abspath(project_root)
+    relevant_dirs = set()
+    entries = []
+    for root, dirs, files in os.walk(project_root):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d != "__pycache__"]
+        relevant = [f for f in files if f.endswith(RELEVANT_EXTENSIONS)]
+        if not relevant:
+            continue
+        for f in relevant:
+            path = os.path.join(root, f)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            entries.append((os.path.relpath(path, project_root).replace(os.sep, "/"), mtime))
+        folder = root
+        while folder not in relevant_dirs and folder.startswith(project_root):
+            relevant_dirs.add(folder)
+            folder = os.path.dirname(folder)
+
+    digest = hashlib.sha1()
+    for path, mtime in sorted(entries):
+        digest.update(f"{path}\0{mtime}\n".encode())
+    return relevant_dirs, digest.hexdigest()
+
+
+def generate_project_diagram(project_root, output_filename="docs/images/project_structure", force=False):
     if '.' in output_filename:
         base_filename, output_format = output_filename.rsplit('.', 1)
     else:
         base_filename = output_filename
         output_format = "png"
 
+    project_root = os.path.abspath(project_root)
+    output_path = f"{base_filename}.{output_format}"
+    stamp_path = f"{base_filename}.stamp"
+    relevant_dirs, stamp = scan_project(project_root)
+
+    if not force and os.path.exists(output_path):
+        try:
+            with open(stamp_path) as f:
+                if f.read().strip() == stamp:
+                    return output_path
+        except OSError:
+            pass
+
+    from graphviz import Digraph
+
     dot = Digraph(comment="DeepLens Project Structure", format=output_format)
 
     dot.attr(rankdir="TB")
@@ -16,13 +65,6 @@ def generate_project_diagram(project_root, output_filename="docs/images/project_
     dot.attr("node", style="filled", fontname="Helvetica", fontsize="10",
              fillcolor="gray20", fontcolor="white", color="white")
 
-    def folder_contains_relevant_files(folder_path):
-        for root, dirs, files in os.walk(folder_path):
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d != '.git']
-            if any(f.endswith(('.py', '.yaml', '.yml')) for f in files):
-                return True
-        return False
-
     def add_nodes(current_path, parent_id):
         try:
             items = sorted(os.listdir(current_path))
@@ -31,20 +73,20 @@ def generate_project_diagram(project_root, output_filename="docs/images/project_
             return
 
         for item in items:
-            if item.startswith('.') or item == '.git':
+            if item.startswith('.'):
                 continue
 
             full_path = os.path.join(current_path, item)
             item_id = os.path.relpath(full_path, project_root).replace(os.sep, "_")
 
             if os.path.isdir(full_path):
-                if not folder_contains_relevant_files(full_path):
+                if full_path not in relevant_dirs:
                     continue
                 dot.node(item_id, f"📂 {item}", shape="folder", fillcolor="gray30")
                 dot.edge(parent_id, item_id, color="white")
                 add_nodes(full_path, item_id)
             else:
-                if item.endswith(('.py', '.yaml', '.yml')):
+                if item.endswith(RELEVANT_EXTENSIONS):
                     dot.node(item_id, f"📄 {item}", shape="note", fillcolor="gray10")
                     dot.edge(parent_id, item_id, color="lightgray")
 
@@ -54,8 +96,12 @@ def generate_project_diagram(project_root, output_filename="docs/images/project_
     add_nodes(project_root, root_id)
 
     dot.render(filename=base_filename, cleanup=True)
-    print(f"[📁 FLOWCHART] Diagram saved as: {base_filename}.{output_format}")
+    with open(stamp_path, "w") as f:
+        f.write(stamp)
+    print(f"[📁 FLOWCHART] Diagram saved as: {output_path}")
+    return output_path
+
 
 if __name__ == "__main__":
     current_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    generate_project_diagram(current_dir)
+    generate_project_diagram(current_dir, force="--force" in sys.argv)
@@ -0,0 +1,72 @@
+import json
+import os
+import struct
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.model_formats import load_model
+from core.session import SessionWriter, load_session
+from core.weight_stats import get_weight_stats, clear_weight_stats_cache
+
+WEIGHTS = {
+    "a.weight": np.arange(6, dtype=np.float32).reshape(2, 3),
+    "b.weight": np.linspace(-1.0, 1.0, 8, dtype=np.float32).reshape(4, 2),
+}
+
+
+def write_safetensors(path, tensors):
+    header = {}
+    offset = 0
+    for name, value in tensors.items():
+        header[name] = {"dtype": "F32", "shape": list(value.shape), "data_offsets": [offset, offset + value.nbytes]}
+        offset += value.nbytes
+    encoded = json.dumps(header).encode()
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        for value in tensors.values():
+            f.write(value.tobytes())
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats_cache():
+    clear_weight_stats_cache()
+    yield
+    clear_weight_stats_cache()
+
+
+def test_safetensors_session_resolves_weights_from_the_source_file(tmp_path):
+    source = str(tmp_path / "model.safetensors")
+    write_safetensors(source, WEIGHTS)
+    model_info = load_model(source)
+    session_path = str(tmp_path / "model.dlsession")
+    SessionWriter(session_path).write(model_info)
+
+    session = load_session(session_path)
+
+    assert session.model_info.source_format == "safetensors"
+    layers = {layer.name: layer for layer in session.model_info.layers}
+    assert layers["b"].shape == (4, 2)
+    # Stats were never computed before saving, so they come from the safetensors file itself
+    stats = get_weight_stats(layers["b"])
+    assert stats["mean"] == pytest.approx(float(WEIGHTS["b.weight"].mean()), abs=1e-6)
+    assert stats["max"] == pytest.approx(1.0)
+
+
+def test_session_keeps_saved_stats_when_the_source_file_is_gone(tmp_path):
+    source = str(tmp_path / "model.safetensors")
+    write_safetensors(source, WEIGHTS)
+    model_info = load_model(source)
+    expected = get_weight_stats(model_info.layers[0])
+    session_path = str(tmp_path / "model.dlsession")
+    SessionWriter(session_path).write(model_info)
+    os.remove(source)
+
+    session = load_session(session_path)
+
+    layer = session.model_info.layers[0]
+    assert layer.weight_ref is None
+    assert layer.weight_stats == pytest.approx(expected)
@@ -1,30 +1,131 @@
-from PyQt5.QtWidgets import QWidget, QGridLayout, QVBoxLayout, QPushButton, QLabel, QComboBox, QFileDialog
+import os
+from PyQt5.QtWidgets import QWidget, QGridLayout, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QComboBox, QFileDialog, QInputDialog, QMessageBox, QLineEdit
 from ui.dashboard.tree_view import TreeView
 from ui.dashboard.graph_view import GraphView
-from ui.dashboard.details_panel import DetailsPanel
-from core.model_loader import load_pytorch_model
-from PyQt5.QtCore import QSize
+from ui.dashboard.details_panel import DetailsPanel, format_bytes, format_count
+from ui.dashboard.feature_map_view import FeatureMapDialog
+from ui.utils.workers import ModelLoadWorker, TaskWorker, start_worker
+from core.layer_index import LayerIndex
+from core.layer_search import LayerSearchIndex, QueryError
+from core.weight_stats import weight_stats_version
+from PyQt5.QtCore import QSize, QThreadPool, QTimer, pyqtSignal
+
+# Streaming loads re-run an active search at most this often
+SEARCH_REFRESH_MS = 250
+# An attached session is brought up to date this often, by a worker writing only what changed
+SESSION_AUTOSAVE_MS = 5000
+# Layer types listed in the model summary, largest share of params first
+SUMMARY_TOP_TYPES = 5
+SEARCH_PLACEHOLDER = "Filter: type:Linear params>10M encoder.*  (name:, shape:, act:, -exclude; Enter to reveal)"
+
+# Extensions handled by core.model_formats; anything else is tried as a PyTorch pickle
+MODEL_FILE_FILTER = "Model Files (*.pt *.pth *.safetensors *.onnx *.h5 *.hdf5);;All Files (*)"
+
+def _build_resnet18():
+    from torchvision.models import resnet18
+    return resnet18(weights=None)
+
+def _build_vgg16():
+    from torchvision.models import vgg16
+    return vgg16(weights=None)
+
+# torch-backed entry points are imported on the worker thread, never while the window starts up
+def _run_profile(*args, **kwargs):
+    from core.profiler import run_profile
+    return run_profile(*args, **kwargs)
+
+def _run_capture(*args, **kwargs):
+    from core.activation_capture import run_capture
+    return run_capture(*args, **kwargs)
+
+def _build_dataflow(*args, **kwargs):
+    from core.dataflow_graph import build_dataflow
+    return build_dataflow(*args, **kwargs)
+
+def _diff_model_info(*args, **kwargs):
+    from core.checkpoint_diff import diff_model_info
+    return diff_model_info(*args, **kwargs)
+
+def _run_quant_analysis(*args, **kwargs):
+    from core.quant_analysis import run_quant_analysis
+    return run_quant_analysis(*args, **kwargs)
+
+def _load_session(path):
+    from core.session import load_session
+    return load_session(path)
+
+def _session_writer(*args, **kwargs):
+    from core.session import SessionWriter
+    return SessionWriter(*args, **kwargs)
+
+def _open_activation_store(path):
+    from core.activation_store import ActivationStore
+    return ActivationStore.open(path)
 
 class DashboardView(QWidget):
+    status_message = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
+        self.thread_pool = QThreadPool.globalInstance()
+        self.load_worker = None
+        self.profile_worker = None
+        self.capture_worker = None
+        self.dataflow_worker = None
+        self.compare_worker = None
+        self.quant_worker = None
+        # Per-layer int8 error, filled in as the analysis streams results
+        self.quant_errors = {}
+        self.activation_store = None
+        # Set by MainWindow; captures run their forward passes there instead of in this process
+        self.inference_server = None
+        self.feature_map_dialog = None
+        self.model_info = None
+        # Built once per load and shared by the tree and graph views
+        self.layer_index = LayerIndex()
+        self.search_index = LayerSearchIndex(self.layer_index)
+        self.search_matches = None
+        self.structure_only = False
+        # Session directory being kept up to date, and the result sections changed since the last write
+        self.session_writer = None
+        self.session_worker = None
+        self.session_dirty = set()
+        self.session_stats_version = None
         self.init_ui()
 
     def init_ui(self):
         layout = QGridLayout()
 
         self.tree = TreeView()
-        layout.addWidget(QLabel("Model Layers"), 0, 0)
+        self.search_bar = QLineEdit()
+        self.search_bar.setPlaceholderText(SEARCH_PLACEHOLDER)
+        self.search_bar.setClearButtonEnabled(True)
+        self.search_bar.textChanged.connect(self.apply_search)
+        self.search_bar.returnPressed.connect(self.reveal_search_match)
+        self.search_refresh_timer = QTimer(self)
+        self.search_refresh_timer.setSingleShot(True)
+        self.search_refresh_timer.setInterval(SEARCH_REFRESH_MS)
+        self.search_refresh_timer.timeout.connect(self.apply_search)
+        self.session_timer = QTimer(self)
+        self.session_timer.setInterval(SESSION_AUTOSAVE_MS)
+        self.session_timer.timeout.connect(self.save_session)
+        header = QHBoxLayout()
+        header.addWidget(QLabel("Model Layers"))
+        header.addWidget(self.search_bar, 1)
+        layout.addLayout(header, 0, 0)
         layout.addWidget(self.tree, 1, 0)
 
         self.graph = GraphView()
         layout.addWidget(QLabel("Architecture Flow"), 0, 1)
         layout.addWidget(self.graph, 1, 1, 4, 1)
 
-        self.details = DetailsPanel()
+        self.details = DetailsPanel(self.thread_pool)
         layout.addWidget(QLabel("Layer Details"), 0, 2)
         layout.addWidget(self.details, 1, 2)
 
+        self.tree.set_details_panel(self.details)
+        self.graph.set_details_panel(self.details)
+
         self.model_summary_label = QLabel("Model Summary: Loading...")
         layout.addWidget(self.model_summary_label, 2, 2)
 
@@ -34,11 +135,47 @@ class DashboardView(QWidget):
         self.model_selector.addItem("VGG16")
         self.model_selector.currentIndexChanged.connect(self.handle_model_selection)
 
-        self.upload_btn = QPushButton("Upload Custom Model (.pt)")
+        self.upload_btn = QPushButton("Upload Custom Model")
         self.upload_btn.clicked.connect(self.upload_model)
 
+        self.cancel_btn = QPushButton("Cancel Loading")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_load)
+
+        self.profile_btn = QPushButton("Profile Layers")
+        self.profile_btn.setEnabled(False)
+        self.profile_btn.clicked.connect(self.profile_model)
+
+        self.capture_btn = QPushButton("Capture Activations")
+        self.capture_btn.setEnabled(False)
+        self.capture_btn.clicked.connect(self.capture_activations)
+
+        self.dataflow_btn = QPushButton("Dataflow View")
+        self.dataflow_btn.setCheckable(True)
+        self.dataflow_btn.setEnabled(False)
+        self.dataflow_btn.toggled.connect(self.toggle_dataflow)
+
+        self.compare_btn = QPushButton("Compare With Checkpoint...")
+        self.compare_btn.setEnabled(False)
+        self.compare_btn.clicked.connect(self.compare_checkpoint)
+
+        self.quant_btn = QPushButton("Quantization Analysis")
+        self.quant_btn.setEnabled(False)
+        self.quant_btn.clicked.connect(self.analyze_quantization)
+
+        self.feature_maps_btn = QPushButton("Feature Maps")
+        self.feature_maps_btn.setEnabled(False)
+        self.feature_maps_btn.clicked.connect(self.show_feature_maps)
+
         layout.addWidget(self.model_selector, 3, 2)
         layout.addWidget(self.upload_btn, 4, 2)
+        layout.addWidget(self.cancel_btn, 5, 2)
+        layout.addWidget(self.profile_btn, 6, 2)
+        layout.addWidget(self.capture_btn, 7, 2)
+        layout.addWidget(self.dataflow_btn, 8, 2)
+        layout.addWidget(self.compare_btn, 9, 2)
+        layout.addWidget(self.quant_btn, 10, 2)
+        layout.addWidget(self.feature_maps_btn, 11, 2)
 
         layout.setRowStretch(1, 1)
         layout.setColumnStretch(1, 2)
@@ -52,30 +189,598 @@ class DashboardView(QWidget):
         self.setLayout(layout)
 
     def update_model_summary(self, model_info):
-        total_params = sum(layer['params'] for layer in model_info.layers)
+        accounting = model_info.accounting
         num_layers = len(model_info.layers)
-        self.model_summary_label.setText(f"Total Layers: {num_layers}\nTotal Params: {total_params:,}\n")
+        by_dtype = ", ".join(
+            f"{dtype} {format_bytes(nbytes)}"
+            for dtype, nbytes in sorted(accounting["bytes_by_dtype"].items(), key=lambda item: -item[1])
+        )
+        text = (
+            f"Total Layers: {num_layers}\n"
+            f"Total Params: {accounting['params']:,} "
+            f"({accounting['trainable_params']:,} trainable, {accounting['frozen_params']:,} frozen)\n"
+            f"Param Memory: {format_bytes(accounting['param_bytes'])}\n"
+            f"Buffer Memory: {format_bytes(accounting['buffer_bytes'])} in {accounting['buffers']:,} buffers\n"
+            f"By dtype: {by_dtype or 'N/A'}\n"
+        )
+        by_type = sorted(self.layer_index.params_by_type().items(), key=lambda item: -item[1])
+        if by_type:
+            text += "By type: " + ", ".join(
+                f"{type_name} {format_count(params)}" for type_name, params in by_type[:SUMMARY_TOP_TYPES]
+            ) + "\n"
+        if accounting["shared_tensors"]:
+            text += f"Shared: {accounting['shared_tensors']:,} tied tensors ({accounting['shared_params']:,} params counted once)\n"
+        self.model_summary_label.setText(text)
 
     def handle_model_selection(self, index):
         if index == 1:
-            from torchvision.models import resnet18
-            model = resnet18(weights=None)
-            model_info = load_pytorch_model(model)
-            self.tree.populate(model_info.layers)
-            self.graph.render_layers(model_info.layers, expanded_groups=self.graph.expanded_groups)
-            self.update_model_summary(model_info)
+            self.load_model_async(_build_resnet18, "ResNet18")
 
         elif index == 2:
-            from torchvision.models import vgg16
-            model = vgg16(weights=None)
-            model_info = load_pytorch_model(model)
-            self.tree.populate(model_info.layers)
-            self.graph.render_layers(model_info.layers, expanded_groups=self.graph.expanded_groups)
-            self.update_model_summary(model_info)
+            self.load_model_async(_build_vgg16, "VGG16")
 
     def upload_model(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Select .pt model", "", "PyTorch Model (*.pt)")
+        path, _ = QFileDialog.getOpenFileName(self, "Select model", "", MODEL_FILE_FILTER)
         if path:
-            model_info = load_pytorch_model(path)
-            self.tree.populate(model_info.layers)
-            self.graph.render_layers(model_info.layers, expanded_groups=self.graph.expanded_groups)
+            self.load_model_async(path)
+
+    def _reset_model(self):
+        self.cancel_load()
+        self.detach_session()
+        self.cancel_workers()
+        self.model_info = None
+        self.profile_btn.setEnabled(False)
+        self.capture_btn.setEnabled(False)
+        self.compare_btn.setEnabled(False)
+        self.quant_btn.setEnabled(False)
+        self.dataflow_btn.blockSignals(True)
+        self.dataflow_btn.setChecked(False)
+        self.dataflow_btn.blockSignals(False)
+        self.dataflow_btn.setEnabled(False)
+        self.layer_index = LayerIndex()
+        self.search_index = LayerSearchIndex(self.layer_index)
+        self.search_matches = None
+        self.tree.set_index(self.layer_index)
+        self.graph.set_index(self.layer_index)
+        self.model_summary_label.setText("Model Summary: Loading...")
+
+    def load_model_async(self, source, label=None):
+        self._reset_model()
+        worker = ModelLoadWorker(source, structure_only=self.structure_only)
+        worker.signals.progress.connect(self._on_load_progress)
+        worker.signals.finished.connect(self._on_load_finished)
+        worker.signals.failed.connect(self._on_load_failed)
+        self.load_worker = worker
+
+        self.cancel_btn.setEnabled(True)
+        self.status_message.emit(f"Loading {label or source}...")
+        start_worker(self.thread_pool, worker)
+
+    def apply_search(self):
+        try:
+            matches = self.search_index.query(self.search_bar.text())
+        except QueryError as e:
+            self.search_bar.setToolTip(str(e))
+            self.search_bar.setStyleSheet("color: #c0392b;")
+            return
+        self.search_bar.setToolTip("")
+        self.search_bar.setStyleSheet("")
+        self.search_matches = matches
+
+        if matches is None:
+            self.tree.set_filter(None)
+            self.graph.set_highlight(None)
+            return
+        ancestors = self.search_index.ancestors(matches)
+        names = self.layer_index.names
+        self.tree.set_filter(matches, ancestors)
+        self.graph.set_highlight([names[node] for node in matches], [names[node] for node in ancestors])
+        self.status_message.emit(f"{len(matches)} layers match")
+
+    def reveal_search_match(self):
+        if not self.search_matches:
+            return
+        # Enter steps through the matches, expanding the tree and graph down to each in turn
+        current = self.tree.currentIndex()
+        node = current.internalId() if current.isValid() else None
+        later = [match for match in self.search_matches if node is None or match > node]
+        target = later[0] if later else self.search_matches[0]
+        self.tree.reveal(target)
+        self.graph.reveal(target)
+
+    def set_structure_only(self, enabled):
+        self.structure_only = enabled
+
+    def cancel_load(self):
+        if self.load_worker is not None:
+            self.load_worker.cancel()
+            self.load_worker = None
+            self.cancel_btn.setEnabled(False)
+            self.model_summary_label.setText("Model Summary: Load cancelled")
+            self.status_message.emit("Model loading cancelled")
+
+    def cancel_workers(self):
+        # Analyses of the current model; results they still send are dropped by the sender checks
+        for worker in (self.profile_worker, self.capture_worker, self.dataflow_worker, self.compare_worker,
+                       self.quant_worker):
+            if worker is not None:
+                worker.cancel()
+        self.profile_worker = None
+        self.capture_worker = None
+        self.dataflow_worker = None
+        self.compare_worker = None
+        self.quant_worker = None
+
+    def _is_current_load(self):
+        # Signals from a cancelled or superseded load may still be queued
+        return self.load_worker is not None and self.sender() is self.load_worker.signals
+
+    def _on_load_progress(self, batch, done, total):
+        if not self._is_current_load():
+            return
+        nodes = self.layer_index.extend(batch)
+        self.search_index.update(nodes)
+        self.tree.append_nodes(nodes)
+        self.graph.append_nodes(nodes)
+        if self.search_bar.text().strip() and not self.search_refresh_timer.isActive():
+            self.search_refresh_timer.start()
+        self.status_message.emit(f"Loading modules {done}/{total}...")
+
+    def _on_load_finished(self, model_info):
+        if not self._is_current_load():
+            return
+        self.load_worker = None
+        self.cancel_btn.setEnabled(False)
+        self._set_model(model_info)
+        self.status_message.emit(f"Loaded {model_info.name} with {len(model_info.layers)} layers")
+        if self.search_bar.text().strip():
+            self.search_refresh_timer.stop()
+            self.apply_search()
+
+    def _set_model(self, model_info):
+        self.model_info = model_info
+        self.profile_btn.setEnabled(True)
+        self.capture_btn.setEnabled(True)
+        self.dataflow_btn.setEnabled(True)
+        self.compare_btn.setEnabled(True)
+        self.quant_btn.setEnabled(True)
+        self.update_model_summary(model_info)
+
+    def _on_load_failed(self, message):
+        if not self._is_current_load():
+            return
+        self.load_worker = None
+        self.cancel_btn.setEnabled(False)
+        self.model_summary_label.setText("Model Summary: Load failed")
+        self.status_message.emit(message)
+
+
+
+    def profile_model(self):
+        if self.model_info is None:
+            return
+
+        input_spec, ok = QInputDialog.getText(
+            self, "Profile Layers", "Input shape (e.g. 1,3,224,224) or path to a sample tensor (.pt):",
+            text="1,3,224,224"
+        )
+        if not ok or not input_spec.strip():
+            return
+
+        worker = TaskWorker(_run_profile, self.model_info, input_spec, cancellable=True)
+        worker.signals.finished.connect(self._on_profile_finished)
+        worker.signals.failed.connect(self._on_profile_failed)
+        self.profile_worker = worker
+
+        self.profile_btn.setEnabled(False)
+        self.status_message.emit("Profiling layers...")
+        start_worker(self.thread_pool, worker)
+
+    def _on_profile_finished(self, results):
+        if self.profile_worker is None or self.sender() is not self.profile_worker.signals:
+            return
+        self.profile_worker = None
+        self.profile_btn.setEnabled(True)
+
+        for layer in self.model_info.layers:
+            layer.profile = results.get(layer.name)
+        self.session_dirty.add("profile")
+        self.graph.set_heatmap({name: result["latency_ms"] for name, result in results.items()}, log_scale=True)
+        self.status_message.emit(f"Profiled {len(results)} modules")
+
+    def _on_profile_failed(self, message):
+        if self.profile_worker is None or self.sender() is not self.profile_worker.signals:
+            return
+        self.profile_worker = None
+        self.profile_btn.setEnabled(True)
+        self.status_message.emit(f"Profiling failed: {message}")
+
+    def toggle_dataflow(self, enabled):
+        if not enabled:
+            if self.dataflow_worker is not None:
+                self.dataflow_worker.cancel()
+                self.dataflow_worker = None
+            self.graph.show_hierarchy()
+            return
+        if self.model_info is None:
+            self.dataflow_btn.setChecked(False)
+            return
+
+        input_spec, ok = QInputDialog.getText(
+            self, "Dataflow View",
+            "Input shape for tensor shapes (e.g. 1,3,224,224), path to a sample tensor (.pt), or empty to skip shapes:",
+            text="1,3,224,224"
+        )
+        if not ok:
+            self.dataflow_btn.setChecked(False)
+            return
+
+        worker = TaskWorker(_build_dataflow, self.model_info, input_spec)
+        worker.signals.finished.connect(self._on_dataflow_finished)
+        worker.signals.failed.connect(self._on_dataflow_failed)
+        self.dataflow_worker = worker
+
+        self.status_message.emit("Tracing dataflow graph...")
+        start_worker(self.thread_pool, worker)
+
+    def _on_dataflow_finished(self, result):
+        if self.dataflow_worker is None or self.sender() is not self.dataflow_worker.signals:
+            return
+        self.dataflow_worker = None
+
+        graph, layout = result
+        self.graph.show_dataflow(graph, layout)
+        self.session_dirty.add("dataflow")
+        self.status_message.emit(
+            f"Dataflow graph traced with {graph.method}: {len(graph.nodes)} nodes, {len(graph.edges)} edges"
+        )
+
+    def _on_dataflow_failed(self, message):
+        if self.dataflow_worker is None or self.sender() is not self.dataflow_worker.signals:
+            return
+        self.dataflow_worker = None
+        self.dataflow_btn.setChecked(False)
+        self.status_message.emit(f"Dataflow tracing failed: {message}")
+
+    def compare_checkpoint(self):
+        if self.model_info is None:
+            return
+
+        path, _ = QFileDialog.getOpenFileName(self, "Compare With Checkpoint", "", "PyTorch Checkpoint (*.pt *.pth);;All Files (*)")
+        if not path:
+            return
+
+        worker = TaskWorker(_diff_model_info, self.model_info, path, cancellable=True, reports_progress=True)
+        worker.other_path = path
+        worker.signals.progress.connect(self._on_compare_progress)
+        worker.signals.finished.connect(self._on_compare_finished)
+        worker.signals.failed.connect(self._on_compare_failed)
+        self.compare_worker = worker
+
+        self.compare_btn.setEnabled(False)
+        self.status_message.emit(f"Comparing with {path}...")
+        start_worker(self.thread_pool, worker)
+
+    def _on_compare_progress(self, tensors_done):
+        if self.compare_worker is not None and self.sender() is self.compare_worker.signals:
+            self.status_message.emit(f"Comparing checkpoints: {tensors_done} tensors")
+
+    def _on_compare_finished(self, diff):
+        if self.compare_worker is None or self.sender() is not self.compare_worker.signals:
+            return
+        other_path = self.compare_worker.other_path
+        self.compare_worker = None
+        self.compare_btn.setEnabled(True)
+
+        for layer in self.model_info.layers:
+            layer.diff = diff["layers"].get(layer.name)
+        self.session_dirty.add("diff")
+        self.graph.set_heatmap({name: result["relative_change"] for name, result in diff["layers"].items()},
+                               log_scale=False)
+
+        changed = sum(1 for result in diff["tensors"].values() if result["changed_fraction"] > 0)
+        unmatched = len(diff["only_a"]) + len(diff["only_b"]) + len(diff["mismatched"])
+        self.status_message.emit(
+            f"Compared with {other_path}: {changed}/{len(diff['tensors'])} tensors changed, {unmatched} unmatched"
+        )
+
+    def _on_compare_failed(self, message):
+        if self.compare_worker is None or self.sender() is not self.compare_worker.signals:
+            return
+        self.compare_worker = None
+        self.compare_btn.setEnabled(True)
+        self.status_message.emit(f"Checkpoint comparison failed: {message}")
+
+    def analyze_quantization(self):
+        if self.model_info is None:
+            return
+
+        worker = TaskWorker(_run_quant_analysis, self.model_info, cancellable=True, reports_progress=True)
+        worker.signals.progress.connect(self._on_quant_progress)
+        worker.signals.finished.connect(self._on_quant_finished)
+        worker.signals.failed.connect(self._on_quant_failed)
+        self.quant_worker = worker
+        self.quant_errors = {}
+
+        self.quant_btn.setEnabled(False)
+        self.status_message.emit("Analyzing quantization readiness...")
+        start_worker(self.thread_pool, worker)
+
+    def _on_quant_progress(self, batch):
+        if self.quant_worker is None or self.sender() is not self.quant_worker.signals:
+            return
+        names = set()
+        for name, result in batch:
+            names.add(name)
+            if result is not None:
+                self.quant_errors[name] = result["int8_tensor_error"]
+        self.session_dirty.add("quant")
+        # Layers light up as their results arrive; the most error-prone end up hottest
+        self.graph.set_heatmap(self.quant_errors, log_scale=False)
+
+        current = self.details.current_layer
+        if current is not None and current.name in names:
+            self.details.update_details(current)
+        self.status_message.emit(f"Analyzing quantization readiness: {len(self.quant_errors)} layers")
+
+    def _on_quant_finished(self, results):
+        if self.quant_worker is None or self.sender() is not self.quant_worker.signals:
+            return
+        self.quant_worker = None
+        self.quant_btn.setEnabled(True)
+
+        sensitive = sorted(self.quant_errors, key=self.quant_errors.get, reverse=True)[:3]
+        self.status_message.emit(
+            f"Analyzed {len(self.quant_errors)} layers; most sensitive to int8: {', '.join(sensitive) or 'none'}"
+        )
+
+    def _on_quant_failed(self, message):
+        if self.quant_worker is None or self.sender() is not self.quant_worker.signals:
+            return
+        self.quant_worker = None
+        self.quant_btn.setEnabled(True)
+        self.status_message.emit(f"Quantization analysis failed: {message}")
+
+    def capture_activations(self):
+        if self.model_info is None:
+            return
+
+        input_spec, ok = QInputDialog.getText(
+            self, "Capture Activations", "Input shape per batch (e.g. 8,3,224,224) or path to a sample tensor (.pt):",
+            text="8,3,224,224"
+        )
+        if not ok or not input_spec.strip():
+            return
+        num_batches, ok = QInputDialog.getInt(self, "Capture Activations", "Number of synthetic batches:", 8, 1, 100000)
+        if not ok:
+            return
+
+        store_path = None
+        answer = QMessageBox.question(self, "Capture Activations", "Also store raw activations on disk?")
+        if answer == QMessageBox.Yes:
+            store_path = QFileDialog.getExistingDirectory(self, "Activation Store Directory")
+            if not store_path:
+                return
+
+        server_kwargs = {}
+        if self.inference_server is not None:
+            server_kwargs = {"server": self.inference_server, "batch_size": self.inference_server.batch_size}
+        worker = TaskWorker(_run_capture, self.model_info, input_spec, num_batches=num_batches, store_path=store_path,
+                            cancellable=True, reports_progress=True, **server_kwargs)
+        worker.store_path = store_path
+        worker.signals.progress.connect(self._on_capture_progress)
+        worker.signals.finished.connect(self._on_capture_finished)
+        worker.signals.failed.connect(self._on_capture_failed)
+        self.capture_worker = worker
+
+        self.capture_btn.setEnabled(False)
+        self.status_message.emit("Capturing activations...")
+        start_worker(self.thread_pool, worker)
+
+    def _on_capture_progress(self, batches_done):
+        if self.capture_worker is not None and self.sender() is self.capture_worker.signals:
+            self.status_message.emit(f"Capturing activations: {batches_done} batches")
+
+    def _on_capture_finished(self, summaries):
+        if self.capture_worker is None or self.sender() is not self.capture_worker.signals:
+            return
+        store_path = self.capture_worker.store_path
+        self.capture_worker = None
+        self.capture_btn.setEnabled(True)
+
+        if store_path:
+            self.set_activation_store(_open_activation_store(store_path))
+        for layer in self.model_info.layers:
+            layer.activation_stats = summaries.get(layer.name)
+        self.session_dirty.add("activation_stats")
+        self.graph.set_heatmap({name: stats["sparsity"] for name, stats in summaries.items()}, log_scale=False)
+        self.status_message.emit(f"Captured activation stats for {len(summaries)} modules")
+
+    def _on_capture_failed(self, message):
+        if self.capture_worker is None or self.sender() is not self.capture_worker.signals:
+            return
+        self.capture_worker = None
+        self.capture_btn.setEnabled(True)
+        self.status_message.emit(f"Activation capture failed: {message}")
+
+    def open_activation_store(self):
+        path = QFileDialog.getExistingDirectory(self, "Open Activation Store")
+        if not path:
+            return
+        try:
+            store = _open_activation_store(path)
+        except (OSError, ValueError) as e:
+            self.status_message.emit(f"Could not open activation store: {e}")
+            return
+        self.set_activation_store(store)
+        self.status_message.emit(f"Opened activation store with {len(store.layers)} layers, {store.written} samples")
+
+    def set_inference_server(self, server):
+        self.inference_server = server
+
+    def set_activation_store(self, store):
+        self.activation_store = store
+        self.details.set_activation_store(store)
+        self.feature_maps_btn.setEnabled(store is not None)
+
+    def show_feature_maps(self):
+        layer = self.details.current_layer
+        store = self.activation_store
+        if layer is None or store is None:
+            self.status_message.emit("Select a layer with stored activations first")
+            return
+        name = layer.name
+        if not store.has_layer(name) or len(store.shape(name)) != 4:
+            self.status_message.emit(f"No stored (C, H, W) activations for {name}")
+            return
+
+        if self.feature_map_dialog is None:
+            self.feature_map_dialog = FeatureMapDialog(self.thread_pool, self)
+        self.feature_map_dialog.show_layer(store, name)
+
+    def session_ui_state(self):
+        graph = self.graph
+        dataflow = None
+        if graph.dataflow is not None:
+            dataflow = next((spec for spec, (traced, _) in self.model_info.dataflow.items()
+                             if traced is graph.dataflow[0]), None)
+        current = self.details.current_layer
+        return {
+            "expanded_groups": sorted(graph.expanded_groups),
+            "tree_expanded": self.tree.expanded_names(),
+            "selected": current.name if current is not None else None,
+            "search": self.search_bar.text(),
+            "heatmap": graph.heatmap,
+            "heatmap_log_scale": graph.heatmap_log_scale,
+            "dataflow": dataflow,
+            "activation_store": self.activation_store.root if self.activation_store is not None else None,
+            "view": graph.view_state(),
+        }
+
+    def _take_session_sections(self):
+        # Weight stats are computed on hover and selection, so they count as changed whenever
+        # the stats cache has grown since the last write
+        version = weight_stats_version()
+        if version != self.session_stats_version:
+            self.session_dirty.add("weight_stats")
+            self.session_stats_version = version
+        sections = tuple(self.session_dirty) + ("ui",)
+        self.session_dirty = set()
+        return sections
+
+    def save_session_as(self):
+        if self.model_info is None:
+            self.status_message.emit("Load a model before saving a session")
+            return
+        from core.session import SESSION_SUFFIX
+        path, _ = QFileDialog.getSaveFileName(self, "Save Session", self.model_info.name + SESSION_SUFFIX,
+                                              f"DeepLens Session (*{SESSION_SUFFIX})")
+        if not path:
+            return
+        if not path.endswith(SESSION_SUFFIX):
+            path += SESSION_SUFFIX
+        self.detach_session()
+        self.session_writer = _session_writer(path)
+        self.session_timer.start()
+        self.save_session()
+
+    def save_session(self):
+        # Autosave tick; skipped while the previous write is still running, whose sections then
+        # simply go out with the next one
+        if self.session_writer is None or self.model_info is None or self.session_worker is not None:
+            return
+        worker = TaskWorker(self.session_writer.write, self.model_info, self._take_session_sections(),
+                            ui_state=self.session_ui_state())
+        worker.signals.finished.connect(self._on_session_saved)
+        worker.signals.failed.connect(self._on_session_failed)
+        self.session_worker = worker
+        start_worker(self.thread_pool, worker)
+
+    def _on_session_saved(self, written):
+        if self.session_worker is None or self.sender() is not self.session_worker.signals:
+            return
+        self.session_worker = None
+        if "layers" in written:
+            self.status_message.emit(f"Session saved to {self.session_writer.path}")
+
+    def _on_session_failed(self, message):
+        if self.session_worker is None or self.sender() is not self.session_worker.signals:
+            return
+        self.session_worker = None
+        self.session_timer.stop()
+        self.session_writer = None
+        self.status_message.emit(f"Session saving stopped: {message}")
+
+    def detach_session(self, wait=False):
+        # One last write of whatever changed since the previous one; on shutdown it runs here
+        # instead of on a worker, since the thread pool is no longer being waited on
+        self.session_timer.stop()
+        writer, self.session_writer = self.session_writer, None
+        self.session_worker = None
+        if writer is None or self.model_info is None:
+            return
+        args = (self.model_info, self._take_session_sections())
+        if wait:
+            writer.write(*args, ui_state=self.session_ui_state())
+        else:
+            start_worker(self.thread_pool, TaskWorker(writer.write, *args, ui_state=self.session_ui_state()))
+
+    def restore_session(self, path):
+        self._reset_model()
+        # Runs like a load, so Cancel Loading and a newer load both supersede it
+        worker = TaskWorker(_load_session, path)
+        worker.signals.finished.connect(self._on_session_restored)
+        worker.signals.failed.connect(self._on_load_failed)
+        self.load_worker = worker
+        self.cancel_btn.setEnabled(True)
+        self.status_message.emit(f"Restoring session {path}...")
+        start_worker(self.thread_pool, worker)
+
+    def _on_session_restored(self, session):
+        if not self._is_current_load():
+            return
+        self.load_worker = None
+        self.cancel_btn.setEnabled(False)
+        model_info = session.model_info
+        state = session.ui_state
+
+        self.layer_index = session.layer_index
+        self.search_index = session.search_index
+        self.graph.expanded_groups = set(state.get("expanded_groups", ()))
+        self.tree.set_index(self.layer_index)
+        self.graph.set_index(self.layer_index)
+        self._set_model(model_info)
+
+        store_path = state.get("activation_store")
+        if store_path and os.path.isdir(store_path):
+            try:
+                self.set_activation_store(_open_activation_store(store_path))
+            except (OSError, ValueError) as e:
+                self.status_message.emit(f"Could not reopen activation store: {e}")
+
+        dataflow = model_info.dataflow.get(state.get("dataflow"))
+        if dataflow is not None:
+            self.dataflow_btn.blockSignals(True)
+            self.dataflow_btn.setChecked(True)
+            self.dataflow_btn.blockSignals(False)
+            self.graph.show_dataflow(*dataflow)
+        if state.get("heatmap"):
+            self.graph.set_heatmap(state["heatmap"], log_scale=state.get("heatmap_log_scale", True))
+
+        self.tree.expand_names(state.get("tree_expanded", ()))
+        self.search_bar.blockSignals(True)
+        self.search_bar.setText(state.get("search", ""))
+        self.search_bar.blockSignals(False)
+        self.apply_search()
+        selected = self.layer_index.lookup(state["selected"]) if state.get("selected") else None
+        if selected is not None and self.layer_index.layers[selected] is not None:
+            self.tree.reveal(selected)
+            self.details.update_details(self.layer_index.layers[selected])
+        if state.get("view"):
+            self.graph.set_view_state(state["view"])
+
+        # Keeps saving into the session it came from, starting from what is already on disk
+        self.session_writer = _session_writer(session.path, model_info)
+        self.session_stats_version = weight_stats_version()
+        self.session_timer.start()
+        self.status_message.emit(f"Restored {model_info.name} with {len(model_info.layers)} layers from {session.path}")
@@ -1,9 +1,44 @@
+import math
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QGroupBox
+from ui.utils.workers import TaskWorker, start_worker
+from core.weight_stats import get_weight_stats, peek_weight_stats
 
 
+def format_bytes(num_bytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+def format_count(count):
+    for unit in ("", "K", "M", "B"):
+        if abs(count) < 1000 or unit == "B":
+            return f"{count:.1f}{unit}" if unit else f"{count:,}"
+        count /= 1000
+
+def format_shape(shape):
+    return "x".join(map(str, shape)) if shape else "N/A"
+
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+
+def sparkline(counts, width=32):
+    # Re-bin the histogram down to the label width and draw it with block characters
+    step = max(1, len(counts) // width)
+    binned = [sum(counts[i:i + step]) for i in range(0, len(counts), step)]
+    peak = max(binned) or 1
+    return "".join(SPARK_BLOCKS[min(len(SPARK_BLOCKS) - 1, c * len(SPARK_BLOCKS) // peak)] for c in binned)
+
+def format_sqnr(error):
+    # Quantization noise as signal-to-noise ratio, which reads more naturally than a tiny ratio
+    if error is None:
+        return "N/A"
+    return "lossless" if error <= 0 else f"{-10 * math.log10(error):.1f} dB"
+
 class DetailsPanel(QWidget):
-    def __init__(self):
+    def __init__(self, thread_pool):
         super().__init__()
+        self.thread_pool = thread_pool
+        self.stats_worker = None
 
         layout = QVBoxLayout()
 
@@ -12,6 +47,13 @@ class DetailsPanel(QWidget):
         self.activation_label = QLabel("Activation: ")
         self.param_label = QLabel("Params: ")
         self.weight_stats_label = QLabel("Weight Stats: ")
+        self.profile_label = QLabel("Profile: ")
+        self.activation_stats_label = QLabel("Activation Stats: ")
+        self.stored_label = QLabel("Stored Activations: ")
+        self.diff_label = QLabel("Checkpoint Diff: ")
+        self.quant_label = QLabel("Quantization: ")
+        self.activation_store = None
+        self.current_layer = None
 
         group = QGroupBox("Layer Details")
         group_layout = QVBoxLayout()
@@ -20,22 +62,122 @@ class DetailsPanel(QWidget):
         group_layout.addWidget(self.activation_label)
         group_layout.addWidget(self.param_label)
         group_layout.addWidget(self.weight_stats_label)
+        group_layout.addWidget(self.profile_label)
+        group_layout.addWidget(self.activation_stats_label)
+        group_layout.addWidget(self.stored_label)
+        group_layout.addWidget(self.diff_label)
+        group_layout.addWidget(self.quant_label)
         group.setLayout(group_layout)
 
         layout.addWidget(group)
         layout.addStretch()
         self.setLayout(layout)
 
+    def set_activation_store(self, store):
+        self.activation_store = store
+
     def update_details(self, layer):
-        self.type_label.setText(f"Type: {layer.get('type', 'N/A')}")
-        self.shape_label.setText(f"Shape: {layer.get('shape', 'N/A')}")
-        self.activation_label.setText(f"Activation: {layer.get('activation', 'N/A')}")
-        self.param_label.setText(f"Params: {layer.get('params', 'N/A')}")
+        self.current_layer = layer
+        self.type_label.setText(f"Type: {layer.type}")
+        self.shape_label.setText(f"Shape: {format_shape(layer.shape)}")
+        self.activation_label.setText(f"Activation: {layer.activation or 'N/A'}")
+        self.param_label.setText(
+            f"Params: {layer.params:,} ({layer.trainable_params:,} trainable), "
+            f"{format_bytes(layer.param_bytes)} + {format_bytes(layer.buffer_bytes)} buffers"
+        )
 
-        weight_stats = layer.get("weight_stats")
+        weight_stats = peek_weight_stats(layer)
+        if weight_stats is None and layer.weight_ref is not None:
+            self._compute_weight_stats(layer)
+        else:
+            self._set_weight_stats(weight_stats)
+
+        profile = layer.profile
+        if profile:
+            self.profile_label.setText(
+                f"Latency: {profile['latency_ms']:.3f} ms, Output: {profile['output_shape']}, "
+                f"Activations: {format_bytes(profile['activation_bytes'])}"
+            )
+        else:
+            self.profile_label.setText("Profile: N/A")
+
+        activation_stats = layer.activation_stats
+        if activation_stats:
+            self.activation_stats_label.setText(
+                f"Act Mean: {activation_stats['mean']:.3f}, Std: {activation_stats['std']:.3f}, "
+                f"Range: [{activation_stats['min']:.3f}, {activation_stats['max']:.3f}], "
+                f"Sparsity: {activation_stats['sparsity']:.1%}\n"
+                f"{sparkline(activation_stats['histogram'])}"
+            )
+        else:
+            self.activation_stats_label.setText("Activation Stats: N/A")
+
+        store = self.activation_store
+        if store is not None and store.has_layer(layer.name):
+            self.stored_label.setText(
+                f"Stored Activations: {store.shape(layer.name)} {store.index['dtype']}, "
+                f"{store.written} samples written"
+            )
+        else:
+            self.stored_label.setText("Stored Activations: N/A")
+
+        diff = layer.diff
+        if diff:
+            self.diff_label.setText(
+                f"Diff L2: {diff['l2']:.4g}, Cosine: {diff['cosine']:.4f}, "
+                f"Relative: {diff['relative_change']:.2%}, Changed: {diff['changed_fraction']:.1%}"
+            )
+        else:
+            self.diff_label.setText("Checkpoint Diff: N/A")
+
+        quant = layer.quant
+        if quant:
+            channel_range = f"|max| {quant['channel_absmax_min']:.4g} .. {quant['channel_absmax_max']:.4g}"
+            if quant["channel_range_ratio"] is not None:
+                channel_range += f" (max/median {quant['channel_range_ratio']:.1f}x)"
+            self.quant_label.setText(
+                f"Weights [{quant['hist_min']:.4g}, {quant['hist_max']:.4g}]\n{sparkline(quant['histogram'])}\n"
+                f"Channels: {quant['channels']}, {channel_range}\n"
+                f"Outliers (>3σ): {quant['outlier_ratio']:.2%}\n"
+                f"SQNR int8/tensor {format_sqnr(quant['int8_tensor_error'])}, "
+                f"int8/channel {format_sqnr(quant['int8_channel_error'])}, fp8 {format_sqnr(quant['fp8_error'])}"
+            )
+        else:
+            self.quant_label.setText("Quantization: N/A")
+
+    def _set_weight_stats(self, weight_stats):
         if weight_stats:
             self.weight_stats_label.setText(
-                f"Mean: {weight_stats['mean']:.2f}, Std: {weight_stats['std']:.2f}, Min: {weight_stats['min']:.2f}, Max: {weight_stats['max']:.2f}"
+                f"Mean: {weight_stats['mean']:.4g}, Std: {weight_stats['std']:.4g}, "
+                f"Min: {weight_stats['min']:.4g}, Max: {weight_stats['max']:.4g}"
             )
         else:
             self.weight_stats_label.setText("Weight Stats: N/A")
+
+    def _compute_weight_stats(self, layer):
+        # Resolving a weight may read a large tensor from disk, or fail if the checkpoint moved
+        self.weight_stats_label.setText("Weight Stats: Computing...")
+        if self.stats_worker is not None and self.stats_worker.layer is layer:
+            return
+        worker = TaskWorker(get_weight_stats, layer)
+        worker.layer = layer
+        worker.signals.finished.connect(self._on_stats_finished)
+        worker.signals.failed.connect(self._on_stats_failed)
+        self.stats_worker = worker
+        start_worker(self.thread_pool, worker)
+
+    def _on_stats_finished(self, weight_stats):
+        if self.stats_worker is None or self.sender() is not self.stats_worker.signals:
+            return
+        layer = self.stats_worker.layer
+        self.stats_worker = None
+        if layer is self.current_layer:
+            self._set_weight_stats(weight_stats)
+
+    def _on_stats_failed(self, message):
+        if self.stats_worker is None or self.sender() is not self.stats_worker.signals:
+            return
+        layer = self.stats_worker.layer
+        self.stats_worker = None
+        if layer is self.current_layer:
+            self.weight_stats_label.setText(f"Weight Stats: unavailable ({message})")
@@ -0,0 +1,224 @@
+import math
+from PyQt5.QtWidgets import (QAbstractScrollArea, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QSpinBox, QCheckBox,
+                             QToolTip)
+from PyQt5.QtGui import QPainter, QImage, QColor
+from PyQt5.QtCore import Qt, QRect, QEvent
+from ui.utils.workers import TaskWorker, start_worker
+from core.instrumentation import span
+
+DEFAULT_TILE_SIZE = 64
+MIN_TILE_SIZE = 8
+MAX_TILE_SIZE = 512
+TILE_SPACING = 4
+ZOOM_STEP = 1.25
+# Channel numbers are drawn on tiles at least this large
+LABEL_TILE_SIZE = 40
+
+
+def _load_pyramid(*args, **kwargs):
+    from core.feature_maps import load_pyramid
+    return load_pyramid(*args, **kwargs)
+
+
+class FeatureMapView(QAbstractScrollArea):
+    # Channel grid that only paints the rows in view. Tiles come from the pyramid level closest
+    # to the on-screen tile size, wrapped as QImages over the numpy buffers without copying
+    def __init__(self):
+        super().__init__()
+        self.pyramid = None
+        self.tile_size = DEFAULT_TILE_SIZE
+        self.images = {}
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.viewport().setAttribute(Qt.WA_OpaquePaintEvent)
+
+    def set_pyramid(self, pyramid):
+        # Cached images point into the old pyramid's buffers, so they go before it does
+        self.images = {}
+        self.pyramid = pyramid
+        self._update_scrollbar()
+        self.viewport().update()
+
+    def _pitch(self):
+        return self.tile_size + TILE_SPACING
+
+    def _columns(self):
+        return max(1, (self.viewport().width() - TILE_SPACING) // self._pitch())
+
+    def _update_scrollbar(self):
+        bar = self.verticalScrollBar()
+        if self.pyramid is None:
+            bar.setRange(0, 0)
+            return
+        rows = math.ceil(self.pyramid.channels / self._columns())
+        height = rows * self._pitch() + TILE_SPACING
+        bar.setRange(0, max(0, height - self.viewport().height()))
+        bar.setPageStep(self.viewport().height())
+        bar.setSingleStep(self._pitch())
+
+    def _image(self, level, channel):
+        key = (level, channel)
+        image = self.images.get(key)
+        if image is None:
+            tile = self.pyramid.tile(level, channel)
+            height, width = tile.shape[:2]
+            image = self.images[key] = QImage(tile.data, width, height, width * 4, QImage.Format_RGB32)
+        return image
+
+    def _tile_rect(self, channel, scroll):
+        row, column = divmod(channel, self._columns())
+        pitch = self._pitch()
+        height, width = self.pyramid.tile_shape
+        # Non-square maps keep their aspect ratio inside the square cell
+        scale = self.tile_size / max(height, width)
+        return QRect(TILE_SPACING + column * pitch, TILE_SPACING + row * pitch - scroll,
+                     max(1, round(width * scale)), max(1, round(height * scale)))
+
+    def channel_at(self, pos):
+        if self.pyramid is None:
+            return None
+        pitch = self._pitch()
+        column = (pos.x() - TILE_SPACING) // pitch
+        row = (pos.y() + self.verticalScrollBar().value() - TILE_SPACING) // pitch
+        if column < 0 or column >= self._columns() or row < 0:
+            return None
+        channel = row * self._columns() + column
+        if channel >= self.pyramid.channels or not self._tile_rect(channel, self.verticalScrollBar().value()).contains(pos):
+            return None
+        return channel
+
+    def paintEvent(self, event):
+        with span("feature_maps.paint"):
+            painter = QPainter(self.viewport())
+            painter.fillRect(event.rect(), self.palette().base())
+            if self.pyramid is None:
+                return
+
+            scroll = self.verticalScrollBar().value()
+            pitch = self._pitch()
+            columns = self._columns()
+            first_row = max(0, (scroll + event.rect().top() - TILE_SPACING) // pitch)
+            last_row = (scroll + event.rect().bottom()) // pitch
+            first = first_row * columns
+            last = min(self.pyramid.channels, (last_row + 1) * columns)
+
+            level = self.pyramid.level_for(self.tile_size)
+            labels = self.tile_size >= LABEL_TILE_SIZE
+            visible = {}
+            for channel in range(first, last):
+                image = self._image(level, channel)
+                visible[(level, channel)] = image
+                rect = self._tile_rect(channel, scroll)
+                painter.drawImage(rect, image)
+                if labels:
+                    painter.setPen(QColor(255, 255, 255))
+                    painter.drawText(rect.adjusted(3, 1, 0, 0), Qt.AlignLeft | Qt.AlignTop, str(channel))
+            # Wrappers for tiles that scrolled away are dropped; they cost nothing to recreate
+            self.images = visible
+
+    def viewportEvent(self, event):
+        if event.type() == QEvent.ToolTip:
+            channel = self.channel_at(event.pos())
+            if channel is None:
+                QToolTip.hideText()
+            else:
+                QToolTip.showText(
+                    event.globalPos(),
+                    f"Channel {channel}\nRange [{self.pyramid.channel_min[channel]:.4g}, "
+                    f"{self.pyramid.channel_max[channel]:.4g}]",
+                    self.viewport(),
+                )
+            return True
+        return super().viewportEvent(event)
+
+    def set_tile_size(self, size):
+        size = int(min(MAX_TILE_SIZE, max(MIN_TILE_SIZE, size)))
+        if size == self.tile_size:
+            return
+        # Keep the row at the top of the view in place while the grid reflows
+        first_channel = self.verticalScrollBar().value() // self._pitch() * self._columns()
+        self.tile_size = size
+        self._update_scrollbar()
+        self.verticalScrollBar().setValue(first_channel // self._columns() * self._pitch())
+        self.viewport().update()
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.ControlModifier:
+            factor = ZOOM_STEP if event.angleDelta().y() > 0 else 1 / ZOOM_STEP
+            self.set_tile_size(self.tile_size * factor)
+        else:
+            super().wheelEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbar()
+
+
+class FeatureMapDialog(QDialog):
+    def __init__(self, thread_pool, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Feature Maps")
+        self.resize(900, 700)
+        self.thread_pool = thread_pool
+        self.store = None
+        self.layer_name = None
+        self.worker = None
+
+        layout = QVBoxLayout()
+        controls = QHBoxLayout()
+        self.sample_box = QSpinBox()
+        self.sample_box.valueChanged.connect(self.reload)
+        self.per_channel_box = QCheckBox("Normalize each channel")
+        self.per_channel_box.setChecked(True)
+        self.per_channel_box.toggled.connect(self.reload)
+        self.status_label = QLabel()
+        controls.addWidget(QLabel("Sample:"))
+        controls.addWidget(self.sample_box)
+        controls.addWidget(self.per_channel_box)
+        controls.addStretch()
+        controls.addWidget(self.status_label)
+        layout.addLayout(controls)
+
+        self.view = FeatureMapView()
+        layout.addWidget(self.view)
+        layout.addWidget(QLabel("Ctrl+wheel resizes the tiles"))
+        self.setLayout(layout)
+
+    def show_layer(self, store, layer_name):
+        self.store = store
+        self.layer_name = layer_name
+        self.setWindowTitle(f"Feature Maps: {layer_name}")
+        self.sample_box.blockSignals(True)
+        self.sample_box.setRange(0, max(0, store.written - 1))
+        self.sample_box.setValue(min(self.sample_box.value(), max(0, store.written - 1)))
+        self.sample_box.blockSignals(False)
+        self.reload()
+        self.show()
+        self.raise_()
+
+    def reload(self):
+        if self.store is None:
+            return
+        if self.worker is not None:
+            self.worker.cancel()
+        # Pyramids for wide layers take a moment to build; the grid keeps showing the old one meanwhile
+        worker = TaskWorker(_load_pyramid, self.store, self.layer_name, sample=self.sample_box.value(),
+                            per_channel=self.per_channel_box.isChecked(), cancellable=True)
+        worker.signals.finished.connect(self._on_pyramid_finished)
+        worker.signals.failed.connect(self._on_pyramid_failed)
+        self.worker = worker
+        self.status_label.setText("Building tiles...")
+        start_worker(self.thread_pool, worker)
+
+    def _on_pyramid_finished(self, pyramid):
+        if self.worker is None or self.sender() is not self.worker.signals:
+            return
+        self.worker = None
+        self.view.set_pyramid(pyramid)
+        height, width = pyramid.tile_shape
+        self.status_label.setText(f"{pyramid.channels} channels, {height}x{width}")
+
+    def _on_pyramid_failed(self, message):
+        if self.worker is None or self.sender() is not self.worker.signals:
+            return
+        self.worker = None
+        self.status_label.setText(message)
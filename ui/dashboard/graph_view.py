@@ -1,7 +1,13 @@
-from PyQt5.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsRectItem, QGraphicsTextItem
-from PyQt5.QtGui import QPen, QBrush, QColor, QFont, QPainter
-from PyQt5.QtCore import Qt
-import time
+from PyQt5.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsItem, QGraphicsRectItem, QGraphicsTextItem
+from PyQt5.QtGui import QPen, QBrush, QColor, QFont, QPainter, QPainterPath
+from PyQt5.QtCore import Qt, QRectF, QTimer
+from core.weight_stats import peek_weight_stats
+from core.model_info import LayerRecord
+from core.layer_index import LayerIndex, ROOT, NONE
+from core.instrumentation import span, traced
+from ui.dashboard.details_panel import format_shape
+import bisect
+import math
 
 LAYER_COLORS = {
     "Conv2d": "#2d8cf0",
@@ -12,14 +18,135 @@ LAYER_COLORS = {
     "Flatten": "#f15bb5",
     "Dropout": "#ff6b6b",
     "Group": "#dcdcdc",
+    "Op": "#5c677d",
+    "IO": "#343a40",
     "Default": "#999999"
 }
 
+NODE_WIDTH = 160
+NODE_HEIGHT = 60
+SPACING_X = 220
+SPACING_Y = 100
+
+# Above this many modules only nodes near the viewport get graphics items
+VIRTUALIZE_THRESHOLD = 5000
+VIEWPORT_MARGIN = 300
+LOD_TEXT_THRESHOLD = 0.35
+ZOOM_STEP = 1.15
+
+# Edges are bundled into paths of this many so painting can skip bundles outside the exposed area
+EDGE_CHUNK = 256
+EDGE_COLOR = QColor("#8a94a6")
+
+# Search matches get a bold outline; everything off the path to a match is faded
+MATCH_PEN_COLOR = QColor("#ffb703")
+DIMMED_OPACITY = 0.25
+
+HEAT_COLD = QColor("#2d8cf0")
+HEAT_HOT = QColor("#e63946")
+
+def heat_color(t):
+    t = min(max(t, 0.0), 1.0)
+    return QColor(
+        int(HEAT_COLD.red() + (HEAT_HOT.red() - HEAT_COLD.red()) * t),
+        int(HEAT_COLD.green() + (HEAT_HOT.green() - HEAT_COLD.green()) * t),
+        int(HEAT_COLD.blue() + (HEAT_HOT.blue() - HEAT_COLD.blue()) * t),
+    )
+
+def layer_tooltip(layer):
+    tooltip = f"{layer.name}\nShape: {format_shape(layer.shape)}\nParams: {layer.params:,}"
+    # Only stats already computed; hovering never reads a weight
+    weight_stats = peek_weight_stats(layer)
+    if weight_stats:
+        tooltip += f"\nMean: {weight_stats['mean']:.4f}, Std: {weight_stats['std']:.4f}"
+    profile = layer.profile
+    if profile:
+        tooltip += f"\nLatency: {profile['latency_ms']:.3f} ms"
+    activation_stats = layer.activation_stats
+    if activation_stats:
+        tooltip += f"\nSparsity: {activation_stats['sparsity']:.1%}"
+    return tooltip
+
+class ChildContainer(QGraphicsItem):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.ItemHasNoContents)
+
+    def boundingRect(self):
+        return QRectF()
+
+    def paint(self, painter, option, widget=None):
+        pass
+
+class EdgeLayer(QGraphicsItem):
+    def __init__(self, segments):
+        super().__init__()
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.setZValue(-1)
+        self.pen = QPen(EDGE_COLOR, 1.2)
+        self.pen.setCosmetic(True)
+
+        self.chunks = []
+        self.bounds = QRectF()
+        for start in range(0, len(segments), EDGE_CHUNK):
+            path = QPainterPath()
+            for x1, y1, x2, y2 in segments[start:start + EDGE_CHUNK]:
+                middle = (y1 + y2) / 2
+                path.moveTo(x1, y1)
+                path.cubicTo(x1, middle, x2, middle, x2, y2)
+            rect = path.boundingRect()
+            self.chunks.append((rect, path))
+            self.bounds = self.bounds.united(rect)
+
+    def boundingRect(self):
+        return self.bounds
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(self.pen)
+        painter.setBrush(Qt.NoBrush)
+        exposed = option.exposedRect
+        for rect, path in self.chunks:
+            if rect.intersects(exposed):
+                painter.drawPath(path)
+
+class GraphNodeItem(QGraphicsRectItem):
+    FONT = None
+
+    def __init__(self, node, name, layer, parent=None):
+        super().__init__(0, 0, NODE_WIDTH, NODE_HEIGHT, parent)
+        self.children_container = None
+        self.setFlag(QGraphicsRectItem.ItemIsSelectable)
+        self.setAcceptHoverEvents(True)
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+
+        if GraphNodeItem.FONT is None:
+            GraphNodeItem.FONT = QFont("Arial", 9)
+        self.label = QGraphicsTextItem(self)
+        self.label.setFont(GraphNodeItem.FONT)
+        self.label.setPos(5, 5)
+        self.bind(node, name, layer)
+
+    def bind(self, node, name, layer, detail=None):
+        self.node = node
+        self.name = name
+        self.layer = layer
+        self.detail = detail
+        self.setData(0, name)
+        self.setToolTip("")
+
+    def hoverEnterEvent(self, event):
+        # Built on hover so weight stats are only computed for layers the user looks at
+        tooltip = layer_tooltip(self.layer) if self.layer else self.name
+        if self.detail:
+            tooltip += f"\n{self.detail}"
+        self.setToolTip(tooltip)
+        super().hoverEnterEvent(event)
+
 class GraphView(QGraphicsView):
     def __init__(self):
         super().__init__()
         self.setRenderHint(QPainter.Antialiasing)
-        self.scene = QGraphicsScene()
+        self.scene = QGraphicsScene(self)
         self.setScene(self.scene)
 
         self.setStyleSheet("background-color: #f5f7fa; border: none;")
@@ -27,108 +154,473 @@ class GraphView(QGraphicsView):
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
 
         self.details_panel = None
-        self.layer_tree = {}
+        self.index = LayerIndex()
+        self.dataflow = None
+        self.edge_layer = None
         self.expanded_groups = set()
+        self.heatmap = {}
+        self.heatmap_peak = 0.0
+        self.heatmap_log_scale = True
+        # Names of search matches and of the groups above them; None when no search is active
+        self.highlight = None
+        self.highlight_path = frozenset()
+        self.virtualized = False
+
+        self.relayout_timer = QTimer(self)
+        self.relayout_timer.setSingleShot(True)
+        self.relayout_timer.setInterval(100)
+        self.relayout_timer.timeout.connect(self._relayout)
+        self._reset_view()
 
     def set_details_panel(self, panel):
         self.details_panel = panel
 
-    def build_tree(self, layers):
-        tree = {}
-        for layer in layers:
-            path = layer["name"].split(".")
-            current = tree
-            for part in path[:-1]:
-                current = current.setdefault(part, {})
-            current[path[-1]] = layer
-        return tree
+    def _reset_view(self):
+        self.item_pool = []
+        self.flat_nodes = []
+        self.flat_x = []
+        self.flat_y = []
+        # Items exist only for visible nodes; rows counts how many rows each visible node spans
+        self.node_items = {}
+        self.rows = {}
+        self.content_rows = {ROOT: 0}
+        # Nodes below this id have been placed; later ones are still waiting in append_nodes
+        self.attached = 1
+        self.edge_layer = None
+        self.scene.clear()
+        self.root_container = ChildContainer()
+        self.root_container.setPos(50, 50)
+        self.scene.addItem(self.root_container)
+
+    def clear_layers(self):
+        self.set_index(LayerIndex())
+
+    def set_index(self, index):
+        self.index = index
+        self.heatmap = {}
+        self.heatmap_peak = 0.0
+        self.highlight = None
+        self.highlight_path = frozenset()
+        self.show_hierarchy()
+
+    def show_hierarchy(self):
+        self.dataflow = None
+        self._set_virtualized(len(self.index) > VIRTUALIZE_THRESHOLD)
+        self._reset_view()
+        self.append_nodes(range(1, len(self.index.names)))
+        if self.virtualized:
+            self.relayout_timer.stop()
+            self._relayout()
+
+    @traced("graph.show_dataflow")
+    def show_dataflow(self, graph, layout):
+        # The traced DAG always goes through the virtualized path: nodes sorted by layer give
+        # the same y-ordered flat arrays the viewport query bisects
+        self._set_virtualized(True)
+        self._reset_view()
+        self.dataflow = (graph, layout)
+
+        xs, layers = layout["x"], layout["layer"]
+        self.flat_nodes = sorted(range(len(graph.nodes)), key=lambda v: (layers[v], xs[v]))
+        self.flat_x = [50 + xs[v] * SPACING_X for v in self.flat_nodes]
+        self.flat_y = [50 + layers[v] * SPACING_Y for v in self.flat_nodes]
+        self.scene.setSceneRect(0, 0, 100 + layout["width"] * SPACING_X, 100 + layout["num_layers"] * SPACING_Y)
+
+        segments = []
+        for src, dst in sorted(graph.edges, key=lambda edge: layers[edge[0]]):
+            segments.append((
+                50 + xs[src] * SPACING_X + NODE_WIDTH / 2, 50 + layers[src] * SPACING_Y + NODE_HEIGHT,
+                50 + xs[dst] * SPACING_X + NODE_WIDTH / 2, 50 + layers[dst] * SPACING_Y,
+            ))
+        self.edge_layer = EdgeLayer(segments)
+        self.scene.addItem(self.edge_layer)
+        self._sync_viewport()
 
     def render_layers(self, layers, expanded_groups=None):
-        self.scene.clear()
-        self.layer_tree = self.build_tree(layers)
+        if expanded_groups is not None:
+            self.expanded_groups = expanded_groups
+        self.set_index(LayerIndex(layers))
+
+    @traced("graph.append_nodes")
+    def append_nodes(self, nodes):
+        if not self.virtualized and len(self.index) > VIRTUALIZE_THRESHOLD:
+            self._set_virtualized(True)
+            self._reset_view()
+
+        if self.virtualized:
+            self.attached = len(self.index.names)
+            # Streaming batches are coalesced into one relayout
+            if not self.relayout_timer.isActive():
+                self.relayout_timer.start()
+            return
+
+        for node in nodes:
+            if node < self.attached:
+                # An implicit group whose own layer arrived after its children
+                item = self.node_items.get(node)
+                if item is not None:
+                    item.layer = self.index.layers[node]
+                    self._style_node(item)
+                continue
+
+            self.attached = node + 1
+            parent = self.index.parents[node]
+            # Streaming loads attach nodes to whatever is already on screen
+            if parent == ROOT or (parent in self.node_items and self.index.names[parent] in self.expanded_groups):
+                self._append_visible_child(parent, node)
+            elif parent in self.node_items and self.index.first_child[parent] == node:
+                self._style_node(self.node_items[parent])
 
-        if expanded_groups is None:
-            expanded_groups = self.expanded_groups
+    def _set_virtualized(self, enabled):
+        self.virtualized = enabled
+        self.relayout_timer.stop()
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex if enabled else QGraphicsScene.BspTreeIndex)
+        if not enabled:
+            self.scene.setSceneRect(QRectF())
 
-        self._draw_tree(self.layer_tree, start_x=50, start_y=50, expanded_groups=expanded_groups)
+    def _container_for(self, parent):
+        if parent == ROOT:
+            return self.root_container
+        item = self.node_items[parent]
+        if item.children_container is None:
+            item.children_container = ChildContainer(item)
+            item.children_container.setPos(SPACING_X, 0)
+        return item.children_container
 
-        layer_times = {}
-        for layer in layers:
-            start_time = time.time()
-            time.sleep(0.01)
-            end_time = time.time()
+    def _append_visible_child(self, parent, node):
+        offset = self.content_rows.get(parent, 0)
+        self.content_rows[parent] = offset + self._materialize(node, self._container_for(parent), offset)
 
-            layer_times[layer['name']] = end_time - start_time
+        if parent == ROOT:
+            return
+        if offset == 0:
+            self._style_node(self.node_items[parent])
+        self._resize(parent, max(1, self.content_rows[parent]))
 
-        print("Layer Timing: ", layer_times)
+    def _materialize(self, node, container, row_offset):
+        item = GraphNodeItem(node, self.index.names[node], self.index.layers[node], container)
+        item.setPos(0, row_offset * SPACING_Y)
+        item.label.setVisible(self._zoom() >= LOD_TEXT_THRESHOLD)
+        self.node_items[node] = item
+        self.rows[node] = 1
+        self._style_node(item)
 
-    def _draw_tree(self, node, start_x, start_y, parent_key="root", expanded_groups=None):
-        if expanded_groups is None:
-            expanded_groups = self.expanded_groups
+        if self.index.child_counts[node] and self.index.names[node] in self.expanded_groups:
+            self._materialize_children(node)
+        return self.rows[node]
 
-        node_width = 160
-        node_height = 60
-        spacing_x = 220
-        spacing_y = 100
-        x = start_x
-        y = start_y
+    def _materialize_children(self, node):
+        row = 0
+        container = self._container_for(node)
+        for child in self.index.children(node):
+            if child >= self.attached:
+                break
+            row += self._materialize(child, container, row)
+        self.content_rows[node] = row
+        self.rows[node] = max(1, row)
 
-        for key, value in node.items():
-            full_name = f"{parent_key}.{key}" if parent_key != "root" else key
+    def _dematerialize_children(self, node):
+        item = self.node_items[node]
+        stack = list(self.index.children(node))
+        while stack:
+            child = stack.pop()
+            if self.node_items.pop(child, None) is not None:
+                self.rows.pop(child, None)
+                self.content_rows.pop(child, None)
+                stack.extend(self.index.children(child))
+        self.content_rows.pop(node, None)
+        if item.children_container is not None:
+            self.scene.removeItem(item.children_container)
+            item.children_container = None
 
-            if isinstance(value, dict) and any(isinstance(v, dict) or ("type" in v if isinstance(v, dict) else False) for v in value.values()):
-                rect = QGraphicsRectItem(x, y, node_width, node_height)
-                rect.setBrush(QBrush(QColor(LAYER_COLORS["Group"])))
-                rect.setPen(QPen(Qt.darkGray, 2, Qt.DashLine))
-                rect.setData(0, full_name)
-                rect.setFlag(QGraphicsRectItem.ItemIsSelectable)
-                rect.setAcceptHoverEvents(True)
+    def _resize(self, node, new_rows):
+        # Walk up the ancestors, shifting only the siblings that follow each changed node
+        next_sibling = self.index.next_sibling
+        while node != ROOT:
+            delta = new_rows - self.rows[node]
+            if delta == 0:
+                return
+            self.rows[node] = new_rows
 
-                text = QGraphicsTextItem(f"{key} [+]" if full_name not in expanded_groups else f"{key} [-]")
-                text.setFont(QFont("Arial", 9))
-                text.setDefaultTextColor(Qt.black)
-                text.setParentItem(rect)
-                text.setPos(rect.rect().x() + 5, rect.rect().y() + 5)
+            parent = self.index.parents[node]
+            self.content_rows[parent] += delta
+            sibling = next_sibling[node]
+            while sibling != NONE:
+                sibling_item = self.node_items.get(sibling)
+                if sibling_item is not None:
+                    sibling_item.moveBy(0, delta * SPACING_Y)
+                sibling = next_sibling[sibling]
 
-                self.scene.addItem(rect)
+            if parent == ROOT:
+                return
+            node = parent
+            new_rows = max(1, self.content_rows[parent])
 
-                if full_name in expanded_groups:
-                    self._draw_tree(value, x + spacing_x, y, full_name, expanded_groups=expanded_groups)
+    def toggle_group(self, node):
+        if self.dataflow is not None or not self.index.child_counts[node] or node not in self.node_items:
+            return
 
-                y += spacing_y
+        name = self.index.names[node]
+        if self.virtualized:
+            self.expanded_groups ^= {name}
+            self._relayout()
+            return
 
-            elif isinstance(value, dict) and "type" in value:
-                layer = value
-                color = LAYER_COLORS.get(layer["type"], LAYER_COLORS["Default"])
-                rect = QGraphicsRectItem(x, y, node_width, node_height)
-                rect.setBrush(QBrush(QColor(color)))
-                rect.setPen(QPen(Qt.black, 1))
-                rect.setData(0, full_name)
-                rect.setToolTip(f"{layer['name']}\nShape: {layer.get('shape', 'N/A')}\nParams: {layer['params']}")
+        old_rows = self.rows[node]
+        if name in self.expanded_groups:
+            self.expanded_groups.remove(name)
+            self._dematerialize_children(node)
+            self.rows[node] = 1
+        else:
+            self.expanded_groups.add(name)
+            self._materialize_children(node)
 
-                text = QGraphicsTextItem(f"{layer['name'].split('.')[-1]}\n{layer['type']}")
-                text.setFont(QFont("Arial", 9))
-                text.setDefaultTextColor(Qt.white)
-                text.setParentItem(rect)
-                text.setPos(rect.rect().x() + 5, rect.rect().y() + 5)
+        new_rows = self.rows[node]
+        self.rows[node] = old_rows
+        self._resize(node, new_rows)
 
-                rect.setFlag(QGraphicsRectItem.ItemIsSelectable)
-                rect.setAcceptHoverEvents(True)
+        self._style_node(self.node_items[node])
 
-                self.scene.addItem(rect)
-                y += spacing_y
+    def _style_node(self, item):
+        if self.dataflow is not None:
+            self._style_dataflow_node(item)
+        else:
+            self._style_hierarchy_node(item)
+
+        if self.highlight is None or item.name in self.highlight_path:
+            item.setOpacity(1.0)
+        elif item.name in self.highlight:
+            item.setOpacity(1.0)
+            item.setPen(QPen(MATCH_PEN_COLOR, 4))
+        else:
+            item.setOpacity(DIMMED_OPACITY)
+
+    def _style_hierarchy_node(self, item):
+        key = self.index.segment(item.node)
+        if self.index.child_counts[item.node]:
+            item.setBrush(self._heat_brush(item.name, LAYER_COLORS["Group"]))
+            item.setPen(QPen(Qt.darkGray, 2, Qt.DashLine))
+            item.label.setPlainText(f"{key} [-]" if item.name in self.expanded_groups else f"{key} [+]")
+            item.label.setDefaultTextColor(Qt.black)
+        else:
+            layer_type = item.layer.type if item.layer else "Default"
+            color = LAYER_COLORS.get(layer_type, LAYER_COLORS["Default"])
+            item.setBrush(self._heat_brush(item.name, color))
+            item.setPen(QPen(Qt.black, 1))
+            item.label.setPlainText(f"{key}\n{layer_type}")
+            item.label.setDefaultTextColor(Qt.white)
+
+    def _style_dataflow_node(self, item):
+        entry = self.dataflow[0].nodes[item.node]
+        if entry["op"] == "call_module":
+            color = LAYER_COLORS.get(entry["target"], LAYER_COLORS["Default"])
+            text = f"{entry['module'].rpartition('.')[2]}\n{entry['target']}"
+        elif entry["op"] in ("placeholder", "output"):
+            color = LAYER_COLORS["IO"]
+            text = entry["name"]
+        else:
+            color = LAYER_COLORS["Op"]
+            text = f"{entry['name']}\n{entry['target']}"
+        if entry["shape"] is not None:
+            text += "\n" + "x".join(str(dim) for dim in entry["shape"])
+
+        item.setBrush(self._heat_brush(item.name, color))
+        item.setPen(QPen(Qt.black, 1))
+        item.label.setPlainText(text)
+        item.label.setDefaultTextColor(Qt.white)
+
+    def _node_data(self, node):
+        if self.dataflow is None:
+            return self.index.names[node], self.index.layers[node], None
+
+        entry = self.dataflow[0].nodes[node]
+        detail = f"Output: {entry['shape']} {entry['dtype']}" if entry["shape"] is not None else None
+        if entry["module"] is not None:
+            module_node = self.index.lookup(entry["module"])
+            if module_node is not None and self.index.layers[module_node] is not None:
+                return entry["module"], self.index.layers[module_node], detail
+        # Functional ops have no layer record; a minimal one keeps the details panel and tooltip working
+        layer = LayerRecord(entry["name"], entry["target"], shape=entry["shape"], dtype=entry["dtype"])
+        return entry["module"] or entry["name"], layer, detail
+
+    @traced("graph.relayout")
+    def _relayout(self):
+        # Flat preorder list of visible nodes; sorted y lets the viewport query use bisect
+        self.flat_nodes = []
+        self.flat_x = []
+        self.flat_y = []
+        index = self.index
+
+        def place(parent, x, row):
+            for child in index.children(parent):
+                self.flat_nodes.append(child)
+                self.flat_x.append(x)
+                self.flat_y.append(50 + row * SPACING_Y)
+                if index.child_counts[child] and index.names[child] in self.expanded_groups:
+                    row = place(child, x + SPACING_X, row)
+                else:
+                    row += 1
+            return row
+
+        total_rows = place(ROOT, 50, 0)
+        width = max(self.flat_x, default=0) + NODE_WIDTH + 50
+        self.scene.setSceneRect(0, 0, width, 100 + total_rows * SPACING_Y)
+
+        for node in list(self.node_items):
+            self._release(node)
+        self._sync_viewport()
+
+    @traced("graph.sync_viewport")
+    def _sync_viewport(self):
+        if not self.virtualized:
+            return
+
+        rect = self.mapToScene(self.viewport().rect()).boundingRect()
+        rect.adjust(-VIEWPORT_MARGIN, -VIEWPORT_MARGIN, VIEWPORT_MARGIN, VIEWPORT_MARGIN)
+        lo = bisect.bisect_left(self.flat_y, rect.top() - NODE_HEIGHT)
+        hi = bisect.bisect_right(self.flat_y, rect.bottom())
+
+        wanted = {}
+        for i in range(lo, hi):
+            x = self.flat_x[i]
+            if x + NODE_WIDTH >= rect.left() and x <= rect.right():
+                wanted[self.flat_nodes[i]] = (x, self.flat_y[i])
+
+        for node in list(self.node_items):
+            if node not in wanted:
+                self._release(node)
+
+        show_labels = self._zoom() >= LOD_TEXT_THRESHOLD
+        for node, (x, y) in wanted.items():
+            item = self.node_items.get(node)
+            if item is None:
+                item = self._acquire(node)
+                item.label.setVisible(show_labels)
+            item.setPos(x, y)
+
+    def _acquire(self, node):
+        name, layer, detail = self._node_data(node)
+        if self.item_pool:
+            item = self.item_pool.pop()
+            item.bind(node, name, layer, detail)
+            item.show()
+        else:
+            item = GraphNodeItem(node, name, layer)
+            item.detail = detail
+            self.scene.addItem(item)
+        self.node_items[node] = item
+        self._style_node(item)
+        return item
+
+    def _release(self, node):
+        item = self.node_items.pop(node)
+        item.hide()
+        self.item_pool.append(item)
+
+    def _zoom(self):
+        return self.transform().m11()
+
+    def _apply_lod(self):
+        # Far zoomed out, nodes render as plain boxes without text or antialiasing
+        detailed = self._zoom() >= LOD_TEXT_THRESHOLD
+        self.setRenderHint(QPainter.Antialiasing, detailed)
+        for item in self.node_items.values():
+            item.label.setVisible(detailed)
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.ControlModifier:
+            factor = ZOOM_STEP if event.angleDelta().y() > 0 else 1 / ZOOM_STEP
+            self.scale(factor, factor)
+            self._apply_lod()
+            self._sync_viewport()
+        else:
+            super().wheelEvent(event)
+
+    def paintEvent(self, event):
+        with span("graph.paint"):
+            super().paintEvent(event)
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self._sync_viewport()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._sync_viewport()
+
+    def set_heatmap(self, values, log_scale=True):
+        self.heatmap = dict(values)
+        self.heatmap_peak = max(self.heatmap.values(), default=0.0)
+        self.heatmap_log_scale = log_scale
+        for item in self.node_items.values():
+            self._style_node(item)
+
+    @traced("graph.set_highlight")
+    def set_highlight(self, names, path_names=frozenset()):
+        # Only items that exist are restyled, so this stays cheap however many layers match
+        self.highlight = None if names is None else frozenset(names)
+        self.highlight_path = frozenset(path_names) if names is not None else frozenset()
+        for item in self.node_items.values():
+            self._style_node(item)
+
+    def reveal(self, node):
+        if self.dataflow is not None:
+            return
+        path = []
+        parent = self.index.parents[node]
+        while parent != ROOT:
+            path.append(parent)
+            parent = self.index.parents[parent]
+        path.reverse()
+
+        if self.virtualized:
+            self.expanded_groups.update(self.index.names[step] for step in path)
+            self._relayout()
+            if node in self.flat_nodes:
+                i = self.flat_nodes.index(node)
+                self.centerOn(self.flat_x[i] + NODE_WIDTH / 2, self.flat_y[i] + NODE_HEIGHT / 2)
+            return
+
+        for step in path:
+            if self.index.names[step] not in self.expanded_groups:
+                self.toggle_group(step)
+        item = self.node_items.get(node)
+        if item is not None:
+            self.centerOn(item)
+
+    def view_state(self):
+        center = self.mapToScene(self.viewport().rect().center())
+        return {"zoom": self._zoom(), "center": [center.x(), center.y()]}
+
+    def set_view_state(self, state):
+        self.resetTransform()
+        self.scale(state["zoom"], state["zoom"])
+        self._apply_lod()
+        self.centerOn(*state["center"])
+        self._sync_viewport()
+
+    def _heat_brush(self, full_name, default_color):
+        value = self.heatmap.get(full_name)
+        if value is None:
+            return QBrush(QColor(default_color))
+        peak = self.heatmap_peak
+        if peak <= 0:
+            t = 0.0
+        elif self.heatmap_log_scale:
+            # Log scale so a few slow blocks don't wash out everything else
+            t = math.log1p(value) / math.log1p(peak)
+        else:
+            t = value / peak
+        return QBrush(heat_color(t))
 
     def mousePressEvent(self, event):
         item = self.itemAt(event.pos())
-        if isinstance(item, QGraphicsRectItem):
-            key = item.data(0)
-
-            if key in self.expanded_groups:
-                self.expanded_groups.remove(key)
-            else:
-                self.expanded_groups.add(key)
+        while item is not None and not isinstance(item, GraphNodeItem):
+            item = item.parentItem()
 
-            self.scene.clear()
-            self._draw_tree(self.layer_tree, start_x=50, start_y=50, expanded_groups=self.expanded_groups)
+        if item is not None:
+            if item.layer is not None and self.details_panel is not None:
+                self.details_panel.update_details(item.layer)
+            self.toggle_group(item.node)
 
         super().mousePressEvent(event)
@@ -0,0 +1,98 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QFileDialog)
+from PyQt5.QtCore import Qt, QTimer
+from core.instrumentation import instrumentation
+
+SPAN_COLUMNS = ("Span", "Calls", "Total ms", "Mean ms", "Max ms")
+REFRESH_INTERVAL_MS = 1000
+
+
+def _number_item(value, fmt):
+    item = QTableWidgetItem(format(value, fmt))
+    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+    return item
+
+
+class PerformancePanel(QDialog):
+    # Non-modal window over the global instrumentation recorder; refreshes itself while shown
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Performance")
+        self.resize(640, 480)
+
+        layout = QVBoxLayout()
+
+        self.enable_box = QCheckBox("Record spans and counters")
+        self.enable_box.setChecked(instrumentation.enabled)
+        self.enable_box.toggled.connect(instrumentation.enable)
+        layout.addWidget(self.enable_box)
+
+        self.span_table = QTableWidget(0, len(SPAN_COLUMNS))
+        self.span_table.setHorizontalHeaderLabels(SPAN_COLUMNS)
+        self.span_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.span_table.verticalHeader().setVisible(False)
+        self.span_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.span_table)
+
+        self.counter_label = QLabel()
+        self.counter_label.setWordWrap(True)
+        layout.addWidget(self.counter_label)
+
+        buttons = QHBoxLayout()
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(self.clear)
+        export_button = QPushButton("Export Chrome Trace...")
+        export_button.clicked.connect(self.export_trace)
+        buttons.addWidget(refresh_button)
+        buttons.addWidget(clear_button)
+        buttons.addStretch()
+        buttons.addWidget(export_button)
+        layout.addLayout(buttons)
+
+        self.setLayout(layout)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_INTERVAL_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.enable_box.setChecked(instrumentation.enabled)
+        self.refresh()
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        summary = instrumentation.summary()
+        spans = summary["spans"]
+
+        self.span_table.setSortingEnabled(False)
+        self.span_table.setRowCount(len(spans))
+        for row, span in enumerate(spans):
+            self.span_table.setItem(row, 0, QTableWidgetItem(span["name"]))
+            self.span_table.setItem(row, 1, _number_item(span["calls"], "d"))
+            self.span_table.setItem(row, 2, _number_item(span["total_ms"], ".1f"))
+            self.span_table.setItem(row, 3, _number_item(span["mean_ms"], ".2f"))
+            self.span_table.setItem(row, 4, _number_item(span["max_ms"], ".1f"))
+
+        lines = []
+        if summary["peak_rss_kb"] is not None:
+            lines.append(f"Peak RSS: {summary['peak_rss_kb'] / 1024:.1f} MB")
+        lines += [f"{name}: {value}" for name, value in sorted(summary["counters"].items())]
+        if summary["dropped_events"]:
+            lines.append(f"Trace full: {summary['dropped_events']} events not kept for export")
+        self.counter_label.setText("\n".join(lines))
+
+    def clear(self):
+        instrumentation.clear()
+        self.refresh()
+
+    def export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Chrome Trace", "deeplens_trace.json", "JSON Files (*.json)")
+        if path:
+            instrumentation.export_chrome_trace(path)
@@ -1,34 +1,261 @@
-from PyQt5.QtWidgets import QTreeWidget, QTreeWidgetItem
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QTreeView
+from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex
+from core.layer_index import LayerIndex, ROOT, NONE
+from core.instrumentation import span, traced
 
-class TreeView(QTreeWidget):
+FETCH_BATCH = 1000
+MATCH_BACKGROUND = QColor("#fff3b0")
+
+class LayerTreeModel(QAbstractItemModel):
+    # Reads everything from the shared LayerIndex; the only per-node state is the list of
+    # child ids for groups that have been expanded, filled FETCH_BATCH rows at a time
+    def __init__(self, index=None):
+        super().__init__()
+        self.layer_index = index if index is not None else LayerIndex()
+        self.fetched = {ROOT: []}
+        self._clear_filter()
+
+    def _clear_filter(self):
+        # With a filter, only matches and their ancestors are rows; rows are then numbered as
+        # they are fetched instead of coming from the index
+        self.visible = None
+        self.matches = frozenset()
+        self.visible_counts = {}
+        self.filtered_rows = {}
+
+    def set_index(self, index):
+        self.beginResetModel()
+        self.layer_index = index
+        self.fetched = {ROOT: []}
+        self._clear_filter()
+        self.endResetModel()
+
+    def set_filter(self, matches, ancestors):
+        self.beginResetModel()
+        self.fetched = {ROOT: []}
+        self._clear_filter()
+        if matches is not None:
+            self.matches = frozenset(matches)
+            self.visible = self.matches | ancestors
+            parents = self.layer_index.parents
+            for node in self.visible:
+                self.visible_counts[parents[node]] = self.visible_counts.get(parents[node], 0) + 1
+        self.endResetModel()
+
+    def node(self, model_index):
+        return model_index.internalId() if model_index.isValid() else ROOT
+
+    def model_index(self, node):
+        if node == ROOT:
+            return QModelIndex()
+        row = self.filtered_rows[node] if self.visible is not None else self.layer_index.rows[node]
+        return self.createIndex(row, 0, node)
+
+    def is_fetched(self, node):
+        if self.visible is not None:
+            return node in self.filtered_rows
+        return self.layer_index.rows[node] < len(self.fetched.get(self.layer_index.parents[node], ()))
+
+    def index(self, row, column, parent=QModelIndex()):
+        children = self.fetched.get(self.node(parent))
+        if column != 0 or children is None or not 0 <= row < len(children):
+            return QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, child):
+        if not child.isValid():
+            return QModelIndex()
+        return self.model_index(self.layer_index.parents[child.internalId()])
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.fetched.get(self.node(parent), ()))
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def _child_count(self, node):
+        if self.visible is not None:
+            return self.visible_counts.get(node, 0)
+        return self.layer_index.child_counts[node]
+
+    def hasChildren(self, parent=QModelIndex()):
+        return self._child_count(self.node(parent)) > 0
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        return len(self.fetched.get(node, ())) < self._child_count(node)
+
+    @traced("tree.fetch_more")
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        children = self.fetched.setdefault(node, [])
+        child = self.layer_index.next_sibling[children[-1]] if children else self.layer_index.first_child[node]
+
+        batch = []
+        visible = self.visible
+        while child != NONE and len(batch) < FETCH_BATCH:
+            if visible is None:
+                batch.append(child)
+            elif child in visible:
+                self.filtered_rows[child] = len(children) + len(batch)
+                batch.append(child)
+            child = self.layer_index.next_sibling[child]
+        if not batch:
+            return
+
+        self.beginInsertRows(parent, len(children), len(children) + len(batch) - 1)
+        children.extend(batch)
+        self.endInsertRows()
+
+    def append_nodes(self, nodes):
+        # New rows are inserted only under groups whose rows are all fetched already;
+        # anything else shows up through canFetchMore when the group is expanded or scrolled.
+        # A filtered tree is rebuilt by the next set_filter instead
+        if self.visible is not None:
+            return
+        pending = {}
+        for node in nodes:
+            parent = self.layer_index.parents[node]
+            children = self.fetched.get(parent)
+            if children is None:
+                continue
+            queued = pending.setdefault(parent, [])
+            if len(children) + len(queued) == self.layer_index.rows[node]:
+                queued.append(node)
+
+        for parent, queued in pending.items():
+            if not queued:
+                continue
+            children = self.fetched[parent]
+            self.beginInsertRows(self.model_index(parent), len(children), len(children) + len(queued) - 1)
+            children.extend(queued)
+            self.endInsertRows()
+
+    def data(self, model_index, role=Qt.DisplayRole):
+        if not model_index.isValid():
+            return None
+        node = model_index.internalId()
+        if role == Qt.DisplayRole:
+            return self.layer_index.segment(node)
+        if role == Qt.UserRole:
+            return node
+        if role == Qt.ToolTipRole:
+            index = self.layer_index
+            return f"{index.type_name(node) or 'Group'}\n{index.params[node]:,} params"
+        if node in self.matches:
+            if role == Qt.BackgroundRole:
+                return MATCH_BACKGROUND
+            if role == Qt.FontRole:
+                font = QFont()
+                font.setBold(True)
+                return font
+        return None
+
+class TreeView(QTreeView):
     def __init__(self):
         super().__init__()
         self.setHeaderHidden(True)
-        self.item_cache = {}
+        self.setUniformRowHeights(True)
+        self.layer_model = LayerTreeModel()
+        self.setModel(self.layer_model)
+        self.details_panel = None
+        self.selectionModel().currentChanged.connect(self._on_current_changed)
+
+    @property
+    def layer_index(self):
+        return self.layer_model.layer_index
+
+    def set_details_panel(self, panel):
+        self.details_panel = panel
+
+    def _on_current_changed(self, current, previous):
+        if not current.isValid() or self.details_panel is None:
+            return
+        layer = self.layer_index.layers[current.internalId()]
+        if layer:
+            self.details_panel.update_details(layer)
 
     def populate(self, layers):
-        self.clear()
-        self.item_cache.clear()
-
-        for layer in layers:
-            self._add_layer_to_tree(layer["name"].split("."), layer)
-
-    def _add_layer_to_tree(self, path_parts, layer, parent_key=""):
-        current_key = f"{parent_key}.{path_parts[0]}" if parent_key else path_parts[0]
-
-        if current_key in self.item_cache:
-            item = self.item_cache[current_key]
-        else:
-            item = QTreeWidgetItem([path_parts[0]])
-            if parent_key:
-                parent_item = self.item_cache[parent_key]
-                parent_item.addChild(item)
-            else:
-                self.addTopLevelItem(item)
-            self.item_cache[current_key] = item
-
-        if len(path_parts) > 1:
-            self._add_layer_to_tree(path_parts[1:], layer, current_key)
-        else:
-            item.setData(0, Qt.UserRole, layer)
+        self.set_index(LayerIndex(layers))
+
+    @traced("tree.set_index")
+    def set_index(self, index):
+        self.layer_model.set_index(index)
+
+    @traced("tree.append_nodes")
+    def append_nodes(self, nodes):
+        self.layer_model.append_nodes(nodes)
+        # Collapsed groups that just got their first child need their expand arrow laid out
+        if any(self.layer_index.rows[node] == 0 and self.layer_index.parents[node] != ROOT for node in nodes):
+            self.scheduleDelayedItemsLayout()
+
+    @traced("tree.set_filter")
+    def set_filter(self, matches, ancestors=frozenset()):
+        self.layer_model.set_filter(matches, ancestors)
+
+    def _expand_to(self, node):
+        # Fetches and expands the rows down to node; False if node is filtered out
+        path = []
+        parent = self.layer_index.parents[node]
+        while parent != ROOT:
+            path.append(parent)
+            parent = self.layer_index.parents[parent]
+        path.reverse()
+
+        model = self.layer_model
+        for step in path + [node]:
+            parent_index = model.model_index(self.layer_index.parents[step])
+            while not model.is_fetched(step) and model.canFetchMore(parent_index):
+                model.fetchMore(parent_index)
+            if not model.is_fetched(step):
+                return False
+            if step != node:
+                self.expand(model.model_index(step))
+        return True
+
+    def reveal(self, node):
+        if self._expand_to(node):
+            target = self.layer_model.model_index(node)
+            self.setCurrentIndex(target)
+            self.scrollTo(target)
+
+    def expanded_names(self):
+        # Only groups whose children were fetched can be expanded, so those are all that is checked
+        model = self.layer_model
+        return [
+            self.layer_index.names[node] for node in model.fetched
+            if node != ROOT and model.is_fetched(node) and self.isExpanded(model.model_index(node))
+        ]
+
+    def expand_names(self, names):
+        for name in names:
+            node = self.layer_index.lookup(name)
+            if node is not None and self._expand_to(node):
+                self.expand(self.layer_model.model_index(node))
+
+    def paintEvent(self, event):
+        with span("tree.paint"):
+            super().paintEvent(event)
+
+    def verticalScrollbarValueChanged(self, value):
+        super().verticalScrollbarValueChanged(value)
+        if value < self.verticalScrollBar().maximum():
+            return
+        # Qt only tops up the root when scrolled to the end, so follow the last expanded row
+        # down and fetch more for the deepest group that still has rows pending
+        parent = QModelIndex()
+        path = [parent]
+        while self.layer_model.rowCount(parent):
+            last = self.layer_model.index(self.layer_model.rowCount(parent) - 1, 0, parent)
+            if not self.isExpanded(last):
+                break
+            parent = last
+            path.append(parent)
+
+        for parent in reversed(path):
+            if self.layer_model.canFetchMore(parent):
+                self.layer_model.fetchMore(parent)
+                return
@@ -1,8 +1,18 @@
-from PyQt5.QtWidgets import QMainWindow, QWidget, QStackedLayout, QStatusBar, QAction, QFileDialog
-from PyQt5.QtCore import QPropertyAnimation, QRect, QEasingCurve
+from PyQt5.QtWidgets import QMainWindow, QWidget, QStackedLayout, QStatusBar, QAction, QFileDialog, QInputDialog
+import os
+from PyQt5.QtCore import QPropertyAnimation, QRect, QEasingCurve, QTimer
 from .landing.landing_page import LandingPage
-from .dashboard.dashboard_view import DashboardView
-from core.model_loader import load_pytorch_model
+from .dashboard.dashboard_view import DashboardView, MODEL_FILE_FILTER
+from .dashboard.performance_panel import PerformancePanel
+from .utils.workers import TaskWorker, preload_modules, start_worker
+from core.inference_server import InferenceServer
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _generate_diagram():
+    from project_flow.generate_flowchart import generate_project_diagram
+    return generate_project_diagram(PROJECT_ROOT, output_filename=os.path.join(PROJECT_ROOT, "docs", "images", "project_structure"))
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -13,9 +23,36 @@ class MainWindow(QMainWindow):
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
 
+        self.preload_worker = None
+        self.diagram_worker = None
+        self.performance_panel = None
+        # Owns a copy of the model in its own process, so forward passes never hold this one's GIL
+        self.inference_server = InferenceServer()
+
         self.init_ui()
         self.create_menu()
 
+        # Runs once the event loop is up, i.e. after the landing page is on screen and fading in
+        QTimer.singleShot(0, self.preload_heavy_modules)
+
+    def preload_heavy_modules(self):
+        self.preload_worker = TaskWorker(preload_modules)
+        # Spawned once the preload is done so the two don't fight over the CPU during startup
+        self.preload_worker.signals.finished.connect(self._on_preload_finished)
+        start_worker(self.dashboard.thread_pool, self.preload_worker)
+
+    def _on_preload_finished(self, _):
+        if self.server_action.isChecked():
+            self.start_inference_server(True)
+
+    def start_inference_server(self, enabled):
+        if enabled:
+            self.inference_server.start()
+            self.dashboard.set_inference_server(self.inference_server)
+        else:
+            self.dashboard.set_inference_server(None)
+            self.inference_server.stop()
+
     def init_ui(self):
         self.central = QWidget()
         self.layout = QStackedLayout()
@@ -30,6 +67,7 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(self.central)
 
         self.landing.continue_clicked.connect(self.show_dashboard)
+        self.dashboard.status_message.connect(self.status_bar.showMessage)
 
     def show_dashboard(self):
         old_geometry = self.central.geometry()
@@ -55,21 +93,123 @@ class MainWindow(QMainWindow):
         load_action.triggered.connect(self.load_model)
         file_menu.addAction(load_action)
 
+        structure_action = QAction("Structure-Only Loading", self)
+        structure_action.setCheckable(True)
+        structure_action.toggled.connect(self.dashboard.set_structure_only)
+        file_menu.addAction(structure_action)
+
+        cancel_action = QAction("Cancel Loading", self)
+        cancel_action.triggered.connect(self.dashboard.cancel_load)
+        file_menu.addAction(cancel_action)
+
+        open_session_action = QAction("Open Session...", self)
+        open_session_action.triggered.connect(self.open_session)
+        file_menu.addAction(open_session_action)
+
+        save_session_action = QAction("Save Session As...", self)
+        save_session_action.triggered.connect(self.dashboard.save_session_as)
+        file_menu.addAction(save_session_action)
+
+        open_store_action = QAction("Open Activation Store", self)
+        open_store_action.triggered.connect(self.dashboard.open_activation_store)
+        file_menu.addAction(open_store_action)
+
+        clear_cache_action = QAction("Clear Summary Cache", self)
+        clear_cache_action.triggered.connect(self.clear_summary_cache)
+        file_menu.addAction(clear_cache_action)
+
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
 
+        view_menu = menu.addMenu("View")
+
+        performance_action = QAction("Performance Panel", self)
+        performance_action.triggered.connect(self.show_performance_panel)
+        view_menu.addAction(performance_action)
+
+        inference_menu = menu.addMenu("Inference")
+
+        self.server_action = QAction("Run Activations In Separate Process", self)
+        self.server_action.setCheckable(True)
+        self.server_action.setChecked(True)
+        self.server_action.toggled.connect(self.start_inference_server)
+        inference_menu.addAction(self.server_action)
+
+        threads_action = QAction("Inference Threads...", self)
+        threads_action.triggered.connect(self.set_inference_threads)
+        inference_menu.addAction(threads_action)
+
+        batch_action = QAction("Inference Batch Size...", self)
+        batch_action.triggered.connect(self.set_inference_batch_size)
+        inference_menu.addAction(batch_action)
+
+        help_menu = menu.addMenu("Help")
+
+        diagram_action = QAction("Generate Project Diagram", self)
+        diagram_action.triggered.connect(self.generate_diagram)
+        help_menu.addAction(diagram_action)
+
     def load_model(self):
-        path, _ = QFileDialog.getOpenFileName(
-            self, "Load Model", "", "Model Files (*.pt *.pth *.h5 *.onnx)"
-        )
+        path, _ = QFileDialog.getOpenFileName(self, "Load Model", "", MODEL_FILE_FILTER)
+        if path:
+            self.dashboard.load_model_async(path)
+
+    def open_session(self):
+        path = QFileDialog.getExistingDirectory(self, "Open Session")
         if path:
-            try:
-                if path.endswith((".pt", ".pth")):
-                    model_info = load_pytorch_model(path)
-                    self.dashboard.tree.populate(model_info.layers)
-                    self.status_bar.showMessage(f"Loaded {model_info.name} with {len(model_info.layers)} layers")
-                else:
-                    self.status_bar.showMessage("Only PyTorch supported right now")
-            except Exception as e:
-                self.status_bar.showMessage(str(e))
+            self.dashboard.restore_session(path)
+
+    def generate_diagram(self):
+        if self.diagram_worker is not None:
+            return
+        worker = TaskWorker(_generate_diagram)
+        worker.signals.finished.connect(self._on_diagram_finished)
+        worker.signals.failed.connect(self._on_diagram_failed)
+        self.diagram_worker = worker
+        self.status_bar.showMessage("Generating project diagram...")
+        start_worker(self.dashboard.thread_pool, worker)
+
+    def _on_diagram_finished(self, path):
+        self.diagram_worker = None
+        self.status_bar.showMessage(f"Project diagram: {path}")
+
+    def _on_diagram_failed(self, message):
+        self.diagram_worker = None
+        self.status_bar.showMessage(f"Diagram generation failed: {message}")
+
+    def show_performance_panel(self):
+        if self.performance_panel is None:
+            self.performance_panel = PerformancePanel(self)
+        self.performance_panel.show()
+        self.performance_panel.raise_()
+
+    def set_inference_threads(self):
+        threads, ok = QInputDialog.getInt(self, "Inference Threads", "Intra-op threads for the inference process:",
+                                          self.inference_server.threads, 1, os.cpu_count() or 1)
+        if not ok:
+            return
+        worker = TaskWorker(self.inference_server.set_threads, threads)
+        worker.signals.failed.connect(self.status_bar.showMessage)
+        start_worker(self.dashboard.thread_pool, worker)
+        self.status_bar.showMessage(f"Inference threads: {threads}")
+
+    def set_inference_batch_size(self):
+        batch_size, ok = QInputDialog.getInt(self, "Inference Batch Size", "Samples per forward pass:",
+                                             self.inference_server.batch_size, 1, 65536)
+        if ok:
+            self.inference_server.batch_size = batch_size
+            self.status_bar.showMessage(f"Inference batch size: {batch_size}")
+
+    def clear_summary_cache(self):
+        from core.summary_cache import default_cache
+        default_cache().invalidate()
+        self.status_bar.showMessage("Summary cache cleared")
+
+    def closeEvent(self, event):
+        self.dashboard.cancel_load()
+        self.dashboard.cancel_workers()
+        self.dashboard.thread_pool.waitForDone()
+        self.dashboard.detach_session(wait=True)
+        self.inference_server.stop()
+        super().closeEvent(event)
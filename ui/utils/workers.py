@@ -0,0 +1,128 @@
+import os
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+# Views drop their reference as soon as a worker is cancelled or superseded; this keeps the
+# wrapper (and its signals) alive from the moment it is queued until run() returns so Qt
+# never touches a deleted object
+_live_workers = set()
+
+
+def start_worker(pool, worker):
+    _live_workers.add(worker)
+    pool.start(worker)
+
+
+class ModelLoadSignals(QObject):
+    progress = pyqtSignal(object, int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class ModelLoadWorker(QRunnable):
+    def __init__(self, source, structure_only=False, batch_size=64):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.source = source
+        self.structure_only = structure_only
+        self.batch_size = batch_size
+        self.signals = ModelLoadSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            _live_workers.discard(self)
+
+    def _run(self):
+        # Imported here so the window can open before torch has finished loading
+        from core.model_loader import LoadCancelled
+        from core.model_formats import load_model
+        from core.summary_cache import default_cache
+
+        try:
+            source = self.source
+            # Example models are passed as factories so they get built off the GUI thread too
+            if not isinstance(source, (str, os.PathLike)) and not hasattr(source, "named_modules"):
+                source = source()
+
+            model_info = load_model(
+                source,
+                structure_only=self.structure_only,
+                cache=default_cache(),
+                on_progress=self.signals.progress.emit,
+                should_cancel=self.is_cancelled,
+                batch_size=self.batch_size,
+            )
+        except LoadCancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+
+        if self._cancelled:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(model_info)
+
+
+def preload_modules():
+    # Warms the import cache off the GUI thread so the first load or profile doesn't stall on torch
+    import numpy
+    import torch
+    import core.model_formats
+    try:
+        import torchvision.models
+    except ImportError:
+        pass
+
+
+class TaskSignals(QObject):
+    progress = pyqtSignal(object)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class TaskWorker(QRunnable):
+    def __init__(self, fn, *args, cancellable=False, reports_progress=False, **kwargs):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+        self._cancelled = False
+        if cancellable:
+            self.kwargs["should_cancel"] = self.is_cancelled
+        if reports_progress:
+            self.kwargs["on_progress"] = self.signals.progress.emit
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            _live_workers.discard(self)
+
+    def _run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+
+        if not self._cancelled:
+            self.signals.finished.emit(result)